@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-job storage latency for the three ways a worker can run jobs:
+
+    fork-per-job   RQ `Worker` (WORKER_FORK=1): each job runs in a forked child that opens
+                   the store itself and exits → the handle never survives a job
+    close-per-job  in-process, client closed after every job (QDRANT_KEEP_OPEN=0)
+    persistent     in-process SimpleWorker / pool executor, handle kept (default)
+
+Each simulated job does what `_retrieve` does against Qdrant: 5 filtered top-k queries.
+Runs on a throwaway embedded store with random vectors (no embedding model needed); the
+store is removed afterwards.
+
+    python -m scripts.bench_qdrant_session --jobs 30 --points 2000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Qdrant handle reuse across jobs.")
+    parser.add_argument("--jobs", type=int, default=30)
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries-per-job", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_qdrant_")
+    try:
+        _bench(args, tmp)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _bench(args, tmp: str) -> None:
+    os.environ["QDRANT_PATH"] = tmp
+    from src.storage import qdrant_store as qs
+
+    rng = np.random.default_rng(0)
+    coll = "bench_corpus"
+    vecs = rng.standard_normal((args.points, args.dim)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    docs = [f"doc {i}" for i in range(args.points)]
+    metas = [{"job_id": "bench", "source_type": ("jd", "rubric")[i % 2], "chunk_idx": i} for i in range(args.points)]
+    for i in range(0, args.points, 256):
+        qs.add_documents(coll, docs[i:i + 256], metas[i:i + 256],
+                         ids=[str(uuid.uuid4()) for _ in docs[i:i + 256]], embeddings=vecs[i:i + 256])
+    qs.close_client()
+
+    queries = rng.standard_normal((args.queries_per_job, args.dim)).astype(np.float32)
+
+    def one_job():
+        for q in queries:
+            qs.query_topk(coll, q, where={"job_id": "bench", "source_type": "jd"}, n_results=8)
+
+    def run(mode: str):
+        lat = []
+        for _ in range(args.jobs):
+            t0 = time.perf_counter()
+            if mode == "fork-per-job":
+                pid = os.fork()
+                if pid == 0:
+                    code = 0
+                    try:
+                        one_job()        # child mewarisi state parent (tanpa client terbuka)
+                    except BaseException:
+                        code = 1
+                    os._exit(code)       # seperti RQ work-horse: tidak ada cleanup/atexit
+                _, status = os.waitpid(pid, 0)
+                if os.waitstatus_to_exitcode(status) != 0:
+                    raise RuntimeError("forked job failed")
+            else:
+                one_job()
+                if mode == "close-per-job":
+                    qs.close_client()
+            lat.append((time.perf_counter() - t0) * 1000.0)
+        qs.close_client()
+        return lat
+
+    modes = ["close-per-job", "persistent"]
+    if hasattr(os, "fork"):
+        modes.insert(0, "fork-per-job")
+    for mode in modes:
+        run(mode)  # warm OS cache
+        lat = run(mode)
+        lat_sorted = sorted(lat)
+        p95 = lat_sorted[min(len(lat_sorted) - 1, int(0.95 * len(lat_sorted)))]
+        print(f"{mode:>14}: mean={statistics.mean(lat):8.2f} ms  "
+              f"p50={statistics.median(lat):8.2f} ms  p95={p95:8.2f} ms  (jobs={args.jobs})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark `/result/{id}` polling throughput: new Redis client per request (REDIS_POOL_SIZE=0,
+old behaviour) vs the app-lifetime connection pool.
+
+Each mode runs in its own process with the API app served in-process (ASGI transport, lifespan
+included), so only the Redis handling differs. Needs a reachable Redis (REDIS_URL); the polled
+job is enqueued on a throwaway queue that no worker listens to and deleted afterwards.
+
+    python -m scripts.bench_result_polling --requests 3000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _percentile(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+async def _run_mode(n_requests: int, concurrency: int) -> dict:
+    import httpx
+    from redis import Redis
+    from rq import Queue
+    from src.api.app import app
+    from src.config import REDIS_URL
+    from src.queue.results import result_key, set_status
+
+    setup = Redis.from_url(REDIS_URL)
+    q = Queue("bench-result-polling", connection=setup)
+    job = q.enqueue("builtins.len", "x")        # tidak pernah dijalankan; status tetap queued
+    set_status(setup, job.id, "queued")         # sama seperti /evaluate
+    url = f"/result/{job.id}"
+
+    conns_before = int(setup.info("stats")["total_connections_received"])
+    lat = []
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for _ in range(min(50, n_requests)):     # warmup
+                    await client.get(url)
+                sem = asyncio.Semaphore(concurrency)
+
+                async def one():
+                    async with sem:
+                        t0 = time.perf_counter()
+                        r = await client.get(url)
+                        lat.append((time.perf_counter() - t0) * 1000.0)
+                        r.raise_for_status()
+
+                t0 = time.perf_counter()
+                await asyncio.gather(*(one() for _ in range(n_requests)))
+                wall = time.perf_counter() - t0
+    finally:
+        job.delete()
+        setup.delete(result_key(job.id))
+        q.delete(delete_jobs=True)
+
+    conns = int(setup.info("stats")["total_connections_received"]) - conns_before
+    return {
+        "rps": round(n_requests / wall, 1),
+        "p50_ms": round(statistics.median(lat), 2),
+        "p95_ms": round(_percentile(lat, 95), 2),
+        "p99_ms": round(_percentile(lat, 99), 2),
+        "redis_connections_opened": conns,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /result polling with and without the Redis pool.")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--pool-size", type=int, default=int(os.getenv("REDIS_POOL_SIZE", "50")))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_run_mode(args.requests, args.concurrency))))
+        return
+
+    results = {}
+    for label, pool_size in (("per-request client", 0), ("pooled", args.pool_size)):
+        env = {**os.environ, "REDIS_POOL_SIZE": str(pool_size)}
+        out = subprocess.run(
+            [sys.executable, "-m", "scripts.bench_result_polling", "--child",
+             "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+            env=env, check=True, capture_output=True, text=True,
+        )
+        results[label] = json.loads(out.stdout.strip().splitlines()[-1])
+        r = results[label]
+        print(f"{label:>20}: {r['rps']:>8} req/s  p50={r['p50_ms']}ms  p95={r['p95_ms']}ms  "
+              f"p99={r['p99_ms']}ms  (redis connections opened: {r['redis_connections_opened']})")
+
+    before, after = results["per-request client"]["rps"], results["pooled"]["rps"]
+    if before:
+        print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
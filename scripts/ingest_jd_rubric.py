@@ -1,28 +1,117 @@
 #!/usr/bin/env python3
 import argparse
-from src.config import JOB_ID_DEFAULT, COLL_JOBS_CORPUS
+import os
+from tqdm import tqdm
+from src.config import JOB_ID_DEFAULT, COLL_JOBS_CORPUS, DOC_CACHE
 from src.pipeline.ingest import ingest_batch
-from src.storage.qdrant_store import close_client
+from src.storage.qdrant_store import QdrantLocked, close_client, get_client
+
+def _publish_snapshot(args, res):
+    """Refresh the mmap snapshot of jobs_corpus so workers read the new JD/rubric without the Qdrant lock."""
+    from src.storage.corpus_snapshot import current_version, is_snapshot_stale
+    if args.no_snapshot:
+        if is_snapshot_stale(COLL_JOBS_CORPUS):
+            print("Snapshot: STALE (workers keep reading the old corpus until the next export)")
+        return
+    changed = res.get("updated") or res.get("removed") or is_snapshot_stale(COLL_JOBS_CORPUS)
+    if not changed and current_version(COLL_JOBS_CORPUS):
+        print("Snapshot: unchanged")
+        return
+    from src.storage.corpus_snapshot import export_snapshot
+    print("Snapshot:", export_snapshot(COLL_JOBS_CORPUS))
+
+def _print_ingest_result(res):
+    print("Ingest result:", {k: v for k, v in res.items() if k != "ids"})
+    print(f"chunks: {res.get('skipped', 0)} skipped (unchanged), {res.get('updated', 0)} updated "
+          f"({res.get('embedded', 0)} re-embedded), {res.get('removed', 0)} removed (stale)")
+
+def _print_doc_cache_stats():
+    if DOC_CACHE:
+        from src.io.doc_cache import get_doc_cache
+        print("Doc cache:", get_doc_cache().stats())
+
+def _run_bulk(args, parser):
+    import hashlib
+    from src.pipeline.bulk_ingest import (
+        BULK_PARSE_WORKERS, IngestCheckpoint, bulk_ingest, default_checkpoint_path, discover_tasks,
+    )
+    tasks = discover_tasks(
+        args.bulk,
+        job_id=args.job_id,
+        section=args.section,
+        auto_section=args.auto_section,
+    )
+    if not tasks:
+        parser.error(f"no pdf/docx/txt/md files matched {args.bulk}")
+
+    ckpt_path = args.checkpoint
+    if not ckpt_path:
+        ckpt_path = "bulk-" + hashlib.sha256("\0".join(sorted(args.bulk)).encode("utf-8")).hexdigest()[:12]
+    if not ckpt_path.endswith(".json"):
+        ckpt_path = default_checkpoint_path(ckpt_path)
+    if args.no_resume and os.path.exists(ckpt_path):
+        os.remove(ckpt_path)
+    checkpoint = IngestCheckpoint(ckpt_path)
+    print(f"Bulk ingest: {len(tasks)} tasks over {len({t['job_id'] for t in tasks})} jobs "
+          f"(checkpoint {ckpt_path}, {len(checkpoint.done)} already done)")
+
+    bar = tqdm(total=len(tasks), desc="Bulk ingest", unit="file")
+    def _progress(stats):
+        bar.n = stats["files_done"]
+        bar.set_postfix(chunks=stats["chunks"], embedded=stats["embedded"])
+        bar.refresh()
+
+    res = bulk_ingest(
+        tasks,
+        mask_pii=not args.no_pii_mask,
+        checkpoint=checkpoint,
+        workers=args.workers or BULK_PARSE_WORKERS,
+        progress=_progress,
+    )
+    bar.n = res["files"]
+    bar.close()
+    _print_ingest_result(res)
+    print(f"throughput: {res['files_per_sec']} files/sec, {res['chunks_per_sec']} chunks/sec "
+          f"({res['embedded_per_sec']} embedded/sec) in {res['seconds']}s")
+    _print_doc_cache_stats()
+    _publish_snapshot(args, res)
 
 def main():
     parser = argparse.ArgumentParser(
         description="Ingest JD / Rubric into vector DB (Qdrant local mode, Qwen embeddings)."
     )
     parser.add_argument(
-        "--job-id", default=JOB_ID_DEFAULT,
-        help="Slug job id, e.g., peb-2025"
+        "--job-id", default=None,
+        help=f"Slug job id, e.g., peb-2025 (default: {JOB_ID_DEFAULT}; in --bulk mode: parent directory name)"
     )
     parser.add_argument(
-        "--source-type", required=True, choices=["jd", "rubric"],
-        help="Type of source"
+        "--source-type", choices=["jd", "rubric"],
+        help="Type of source (required unless --bulk)"
     )
     parser.add_argument(
         "--section", default=None,
         help="Section tag (e.g., overview, about_the_job, rubric_cv, rubric_project). Ignored if --auto-section is used."
     )
     parser.add_argument(
-        "--paths", nargs="+", required=True,
-        help="File paths (pdf/docx/txt)"
+        "--paths", nargs="+",
+        help="File paths (pdf/docx/txt) (required unless --bulk)"
+    )
+    parser.add_argument(
+        "--bulk", nargs="+", metavar="DIR_OR_GLOB",
+        help="Bulk mode: directories/globs laid out as <root>/<job_id>/<jd|rubric*>.(pdf|docx|txt). "
+             "job_id comes from the parent directory unless --job-id is passed explicitly"
+    )
+    parser.add_argument(
+        "--checkpoint", default=None,
+        help="Bulk mode: checkpoint name or .json path (default: derived from the --bulk arguments)"
+    )
+    parser.add_argument(
+        "--no-resume", action="store_true",
+        help="Bulk mode: ignore an existing checkpoint and start over"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Bulk mode: parallel parse processes"
     )
     parser.add_argument(
         "--no-pii-mask", action="store_true",
@@ -30,29 +119,44 @@ def main():
     )
     parser.add_argument(
         "--auto-section", action="store_true",
-        help="Auto-split JD by headings into sections (ignored for source-type=rubric)"
+        help="Auto-split JD by headings into sections (ignored for source-type=rubric). "
+             "Points from explicit --section runs of the same file are kept"
+    )
+    parser.add_argument(
+        "--no-snapshot", action="store_true",
+        help="Skip publishing the read-only corpus snapshot used by workers"
     )
 
     args = parser.parse_args()
+    if not args.bulk and (not args.source_type or not args.paths):
+        parser.error("--source-type and --paths are required unless --bulk is used")
+
+    # ambil lock Qdrant di awal: gagal cepat sebelum parsing / embedding kalau worker masih memegangnya
+    try:
+        get_client()
+    except QdrantLocked as e:
+        parser.exit(2, f"error: {e}\n")
 
     try:
+        if args.bulk:
+            _run_bulk(args, parser)
+            return
+        args.job_id = args.job_id or JOB_ID_DEFAULT
+
         # JD dengan auto-section: pecah per heading, set metadata section otomatis
         if args.source_type == "jd" and args.auto_section:
-            from src.pipeline.ingest import ingest_jd_auto_sections  # diimport saat diperlukan
-            total_chunks, all_ids = 0, []
+            from src.pipeline.ingest import ingest_jd_auto_sections, merge_ingest_counts  # diimport saat diperlukan
+            total = {}
             for p in args.paths:
-                n, ids = ingest_jd_auto_sections(
+                res = ingest_jd_auto_sections(
                     file_path=p,
                     job_id=args.job_id,
                     mask_pii=not args.no_pii_mask,
                 )
-                total_chunks += n
-                all_ids.extend(ids)
-            print("Ingest result:", {
-                "chunks": total_chunks,
-                "ids": all_ids,
-                "collection": COLL_JOBS_CORPUS
-            })
+                merge_ingest_counts(total, res)
+            _print_ingest_result({**total, "collection": COLL_JOBS_CORPUS})
+            _print_doc_cache_stats()
+            _publish_snapshot(args, total)
             return
 
         # Jalur umum (JD satu section manual / Rubric naratif)
@@ -63,7 +167,9 @@ def main():
             section=args.section,
             mask_pii=not args.no_pii_mask,
         )
-        print("Ingest result:", ok)
+        _print_ingest_result(ok)
+        _print_doc_cache_stats()
+        _publish_snapshot(args, ok)
 
     finally:
         close_client()
@@ -1,33 +1,91 @@
 # src/api/app.py
-from typing import List, Dict, Any
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
-from redis import Redis
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from redis import Redis, BlockingConnectionPool
+from redis import asyncio as aioredis
 from rq import Queue
 from rq.job import Job
 
-from src.config import REDIS_URL, QUEUE_NAME, JOB_ID_DEFAULT, UPLOAD_DIR
-from src.utils.uploads import save_uploads, new_batch_id, list_batch_paths
-from src.queue.jobs import run_eval_upload_job
+from src.config import REDIS_URL, REDIS_POOL_SIZE, REDIS_POOL_TIMEOUT, QUEUE_NAME, JOB_ID_DEFAULT, UPLOAD_DIR, UPLOAD_MAX_BATCH_MB
+from src.utils.uploads import (
+    save_uploads_streaming, new_batch_id, list_batch_paths, batch_file_hashes, UploadBudget, UploadTooLarge,
+)
+from src.queue.jobs import run_eval_upload_job, run_eval_bulk_job, cleanup_batch
+from src.queue.results import (
+    RESULT_TTL, public_result_view, result_key,
+    set_status, summary_from_hash, get_bulk_items,
+)
+from src.queue.scheduler import submit, scheduler_stats
+from src.queue.dedupe import EVAL_DEDUPE, evaluation_fingerprint, single_flight, task_status
+from src.queue.events import events_channel, events_log_key, is_terminal, publish_queued
 
-app = FastAPI(title="AI Screening API", version="0.4.0")
+# ---------- redis (satu pool + Queue selama umur proses API) ----------
+_redis: Optional[Redis] = None
+_queue: Optional[Queue] = None
+_aredis: Optional[aioredis.Redis] = None      # pub/sub untuk /events (satu koneksi per stream)
+_redis_lock = threading.Lock()
 
-# ---------- helpers ----------
-PUBLIC_RESULT_KEYS = [
-    "cv_match_rate", "cv_feedback",
-    "project_score", "project_feedback",
-    "overall_summary",
-]
+def _open_redis() -> None:
+    global _redis, _queue
+    with _redis_lock:
+        if _redis is None:
+            pool = BlockingConnectionPool.from_url(
+                REDIS_URL, max_connections=REDIS_POOL_SIZE, timeout=REDIS_POOL_TIMEOUT,
+            )
+            _redis = Redis(connection_pool=pool)
+            _queue = Queue(QUEUE_NAME, connection=_redis)
+
+def _close_redis() -> None:
+    global _redis, _queue
+    with _redis_lock:
+        if _redis is not None:
+            _redis.connection_pool.disconnect()
+        _redis, _queue = None, None
+
+def get_async_redis() -> aioredis.Redis:
+    global _aredis
+    if _aredis is None:
+        _aredis = aioredis.Redis.from_url(REDIS_URL)
+    return _aredis
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _aredis
+    if REDIS_POOL_SIZE > 0:
+        _open_redis()
+    try:
+        yield
+    finally:
+        _close_redis()
+        if _aredis is not None:
+            await _aredis.aclose()
+            _aredis = None
 
-def public_result_view(res: Dict[str, Any]) -> Dict[str, Any]:
-    return {k: res.get(k) for k in PUBLIC_RESULT_KEYS if k in res}
+app = FastAPI(title="AI Screening API", version="0.4.0", lifespan=lifespan)
 
+# ---------- helpers ----------
 def get_redis() -> Redis:
-    return Redis.from_url(REDIS_URL)
+    if REDIS_POOL_SIZE <= 0:
+        return Redis.from_url(REDIS_URL)
+    if _redis is None:
+        _open_redis()   # app dipakai tanpa lifespan (mis. TestClient tanpa context manager)
+    return _redis
 
 def get_queue(redis_conn: Redis | None = None) -> Queue:
     if redis_conn is None:
+        if REDIS_POOL_SIZE > 0:
+            if _queue is None:
+                _open_redis()
+            return _queue
         redis_conn = get_redis()
     return Queue(QUEUE_NAME, connection=redis_conn)
 
@@ -41,6 +99,49 @@ def health():
     return {"ok": True, "redis": ok}
 
 # ---------- 1) POST /upload ----------
+# header multipart + boundary per file; toleransi di atas batas batch
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_ROUTES = ("/upload",)
+
+class UploadSizeLimit:
+    """
+    Pure ASGI middleware: rejects an oversized body on the upload routes before Starlette
+    spools the multipart form (Content-Length up front, byte count for chunked bodies).
+    Every other route, SSE included, is passed through untouched.
+    """
+    def __init__(self, app, paths=UPLOAD_ROUTES, max_bytes: int = UPLOAD_MAX_BATCH_MB * 1024 * 1024 + UPLOAD_OVERHEAD_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    def _error(self) -> str:
+        return f"upload exceeds the {UPLOAD_MAX_BATCH_MB:g} MB per-batch limit"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            await JSONResponse({"detail": self._error()}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # diteruskan FastAPI apa adanya (bukan 400 "error parsing the body")
+                    raise HTTPException(status_code=413, detail=self._error())
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadSizeLimit)
+
 @app.post("/upload")
 async def upload_files(
     cv_files: List[UploadFile] = File(default=[]),
@@ -49,21 +150,40 @@ async def upload_files(
     if not cv_files and not project_files:
         raise HTTPException(status_code=400, detail="Upload at least one CV or Project file")
     batch_id = new_batch_id()
-    saved_cv = save_uploads(cv_files, batch_id, "cv") if cv_files else []
-    saved_pr = save_uploads(project_files, batch_id, "project") if project_files else []
+    budget = UploadBudget()
+    try:
+        saved_cv = await save_uploads_streaming(cv_files, batch_id, "cv", budget) if cv_files else []
+        saved_pr = await save_uploads_streaming(project_files, batch_id, "project", budget) if project_files else []
+    except UploadTooLarge as e:
+        await run_in_threadpool(shutil.rmtree, os.path.join(UPLOAD_DIR, batch_id), True)
+        raise HTTPException(status_code=413, detail=str(e))
     return JSONResponse({
         "batch_id": batch_id,
-        "files": {"cv": [str(p) for p in saved_cv], "project": [str(p) for p in saved_pr]}
+        "files": {"cv": [it["path"] for it in saved_cv], "project": [it["path"] for it in saved_pr]},
+        "sha256": {it["path"]: it["sha256"] for it in saved_cv + saved_pr},
+        "bytes": budget.used,
     })
 
 # ---------- 2) POST /evaluate (async via RQ) ----------
+# Tenant (batas job berjalan per tenant, SCHED_TENANT_CAPS) TIDAK diambil dari body:
+# API ini tanpa auth, jadi header ini harus diisi gateway/proxy tepercaya yang sudah
+# mengautentikasi klien dan membuang header yang sama dari request klien.
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant")
+
+def request_tenant(request: Request) -> Optional[str]:
+    """Tenant set by the trusted gateway in TENANT_HEADER; None (no per-tenant cap) if absent."""
+    return (request.headers.get(TENANT_HEADER) or "").strip() or None
+
 class EvaluateRequest(BaseModel):
     job_id: str = JOB_ID_DEFAULT
     batch_id: str
+    bypass_cache: bool = False   # paksa panggilan LLM baru (abaikan cache respons)
+    priority: str = "normal"     # high | normal | low
 
 @app.post("/evaluate")
-def evaluate(req: EvaluateRequest):
+def evaluate(req: EvaluateRequest, request: Request):
     import os
+    tenant = request_tenant(request)
     cv_paths, pr_paths = list_batch_paths(req.batch_id)
     # debug ringan
     print(f"[api] evaluate batch={req.batch_id}")
@@ -75,41 +195,246 @@ def evaluate(req: EvaluateRequest):
         raise HTTPException(status_code=404, detail="No uploaded files found for batch_id")
 
     q = get_queue()
-    job = q.enqueue(
-        run_eval_upload_job,
-        req.job_id, cv_paths, pr_paths, req.batch_id,
-        job_timeout=1800,   # 30 menit aman utk cold start
-    )
-    print(f"[api] enqueue -> id={job.get_id()}")
-    return JSONResponse({"id": job.get_id(), "status": "queued"})
+
+    def _enqueue() -> str:
+        job = submit(
+            q.connection, run_eval_upload_job,
+            (req.job_id, cv_paths, pr_paths, req.batch_id, req.bypass_cache),
+            job_id=req.job_id, tenant=tenant, priority=req.priority,
+            job_timeout=1800,   # 30 menit aman utk cold start
+            result_ttl=RESULT_TTL, failure_ttl=RESULT_TTL,
+        )
+        set_status(q.connection, job.id, "queued", if_missing=True)
+        publish_queued(q.connection, job.id)
+        return job.id
+
+    try:
+        if not EVAL_DEDUPE:
+            task_id, created = _enqueue(), True
+        else:
+            fp = evaluation_fingerprint(req.job_id, cv_paths, pr_paths, batch_file_hashes(req.batch_id), tenant,
+                                        redis_conn=q.connection)
+            # bypass_cache: boleh gabung ke job yang masih jalan, tapi jangan pakai hasil lama
+            task_id, created = single_flight(q.connection, fp, _enqueue, reuse_finished=not req.bypass_cache)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if created:
+        print(f"[api] enqueue -> id={task_id} priority={req.priority}")
+        return JSONResponse({"id": task_id, "status": "queued", "priority": req.priority})
+
+    status = task_status(q.connection, task_id) or "queued"
+    if _job_batch_id(q.connection, task_id) not in (None, req.batch_id):
+        cleanup_batch(req.batch_id)     # upload duplikat tidak dipakai job mana pun
+    print(f"[api] duplicate of id={task_id} ({status}) batch={req.batch_id}")
+    return JSONResponse({"id": task_id, "status": status, "deduplicated": True})
+
+def _job_batch_id(redis_conn, task_id: str) -> Optional[str]:
+    try:
+        return Job.fetch(task_id, connection=redis_conn).args[3]
+    except Exception:
+        return None
+
+# ---------- 2b) POST /evaluate/bulk ----------
+class BulkEvaluateRequest(BaseModel):
+    job_id: str = JOB_ID_DEFAULT
+    batch_ids: List[str]          # satu batch_id = satu kandidat
+    bypass_cache: bool = False
+    priority: str = "low"         # bulk default di lane low supaya evaluasi tunggal tidak tertahan
+
+@app.post("/evaluate/bulk")
+def evaluate_bulk(req: BulkEvaluateRequest, request: Request):
+    if not req.batch_ids:
+        raise HTTPException(status_code=400, detail="batch_ids is empty")
+    candidates, missing = [], []
+    for batch_id in dict.fromkeys(req.batch_ids):
+        cv_paths, pr_paths = list_batch_paths(batch_id)
+        if not cv_paths and not pr_paths:
+            missing.append(batch_id)
+            continue
+        candidates.append({"batch_id": batch_id, "cv_paths": cv_paths, "project_paths": pr_paths})
+    if missing:
+        raise HTTPException(status_code=404, detail=f"No uploaded files found for batch_id(s): {missing}")
+
+    q = get_queue()
+    try:
+        job = submit(
+            q.connection, run_eval_bulk_job,
+            (req.job_id, candidates, req.bypass_cache),
+            job_id=req.job_id, tenant=request_tenant(request), priority=req.priority,
+            job_timeout=1800 + 120 * len(candidates),
+            result_ttl=RESULT_TTL, failure_ttl=RESULT_TTL,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_status(q.connection, job.id, "queued", if_missing=True, candidates=len(candidates))
+    publish_queued(q.connection, job.id)
+    print(f"[api] enqueue bulk -> id={job.id} candidates={len(candidates)} priority={req.priority}")
+    return JSONResponse({"id": job.id, "status": "queued", "candidates": len(candidates), "priority": req.priority})
 
 # ---------- 3) GET /result/{id} ----------
-@app.get("/result/{task_id}")
-def get_result(task_id: str):
-    redis_conn = get_redis()
+STATUS_MAP = {
+    "queued": "queued",
+    "started": "processing",
+    "deferred": "queued",
+    "finished": "completed",
+    "failed": "failed",
+    None: "unknown",
+}
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+def _task_state(redis_conn, task_id: str, summary: bool = True):
+    """
+    (stored summary or None, RQ status or None) in one round trip. Only the small
+    `result:<id>` hash and the RQ status field are read; no pickled job payload.
+    """
+    pipe = redis_conn.pipeline(transaction=False)
+    if summary:
+        pipe.hgetall(result_key(task_id))
+    else:
+        pipe.hget(result_key(task_id), "status")
+    pipe.hget(Job.key_for(task_id), "status")
+    stored, rq_raw = pipe.execute()
+    if summary:
+        view = summary_from_hash(stored)
+    else:
+        view = {"status": stored.decode()} if stored else None
+    rq_status = STATUS_MAP.get(rq_raw.decode(), "unknown") if rq_raw else None
+    return view, rq_status
+
+def _needs_job_fetch(view: Optional[Dict[str, Any]], rq_status: Optional[str]) -> bool:
+    # job lama (hasil di-pickle RQ) atau worker mati sebelum sempat menulis status akhir
+    if view is None:
+        return True
+    return view["status"] not in TERMINAL_STATUSES and rq_status in TERMINAL_STATUSES
+
+def _job_payload(redis_conn, task_id: str) -> Dict[str, Any]:
+    """Fallback: read the RQ job itself (unpickles job.result)."""
     try:
         job = Job.fetch(task_id, connection=redis_conn)
     except Exception:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    status_map = {
-        "queued": "queued",
-        "started": "processing",
-        "deferred": "queued",
-        "finished": "completed",
-        "failed": "failed",
-        None: "unknown",
-    }
-    status = status_map.get(job.get_status(), "unknown")
+    status = STATUS_MAP.get(job.get_status(), "unknown")
     payload: Dict[str, Any] = {"id": task_id, "status": status}
-
     if status == "completed":
         res = job.result
-        if isinstance(res, dict) and "result" in res and isinstance(res["result"], dict):
+        if isinstance(res, dict) and isinstance(res.get("result"), dict):
             payload["result"] = public_result_view(res["result"])
-        else:
+        elif not (isinstance(res, dict) and ("result_key" in res or "results_key" in res)):
             payload["result"] = res
     elif status == "failed":
         payload["error"] = str(job.exc_info or "")[:2000]
+    return payload
+
+@app.get("/result/{task_id}")
+def get_result(task_id: str):
+    redis_conn = get_redis()
+    view, rq_status = _task_state(redis_conn, task_id)
+    if view is None and rq_status is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if _needs_job_fetch(view, rq_status):
+        return JSONResponse(_job_payload(redis_conn, task_id))
+    return JSONResponse({"id": task_id, **view})
 
+@app.get("/result/{task_id}/status")
+def get_result_status(task_id: str):
+    """Status only (two HGETs in one round trip); never loads the result."""
+    redis_conn = get_redis()
+    view, rq_status = _task_state(redis_conn, task_id, summary=False)
+    if view is None and rq_status is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    status = rq_status if _needs_job_fetch(view, rq_status) else view["status"]
+    return JSONResponse({"id": task_id, "status": status})
+
+# ---------- 3b) GET /result/bulk/{id} (partial results while running) ----------
+@app.get("/result/bulk/{task_id}")
+def get_bulk_result(task_id: str):
+    redis_conn = get_redis()
+    view, rq_status = _task_state(redis_conn, task_id)
+    if view is None and rq_status is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    results = get_bulk_items(redis_conn, task_id)
+    for item in results.values():
+        if isinstance(item.get("result"), dict):
+            item["result"] = public_result_view(item["result"])    # item format lama (hasil lengkap)
+
+    if _needs_job_fetch(view, rq_status):
+        job_view = _job_payload(redis_conn, task_id)
+        status, error = job_view["status"], job_view.get("error")
+    else:
+        status, error = view["status"], view.get("error")
+    payload: Dict[str, Any] = {"id": task_id, "status": status, "done": len(results), "results": results}
+    if status == "failed":
+        payload["error"] = error or ""
     return JSONResponse(payload)
+
+# ---------- 3c) GET /queue/stats ----------
+@app.get("/queue/stats")
+def queue_stats():
+    """Per-lane pending / ready / started counts, time-to-start percentiles, tenant usage."""
+    return JSONResponse(scheduler_stats(get_redis()))
+
+# ---------- 4) GET /events/{id} (SSE push; polling /result jadi opsional) ----------
+SSE_KEEPALIVE_SEC = float(os.getenv("SSE_KEEPALIVE_SEC", "15"))
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+@app.get("/events/{task_id}")
+async def stream_events(task_id: str, request: Request):
+    """
+    Server-Sent Events for one task: replays past events, then pushes live ones
+    (status, per-stage progress, bulk candidates) until a completed/failed status event.
+    """
+    r = get_async_redis()
+    job_key = Job.key_for(task_id)
+    if not await r.exists(job_key, events_log_key(task_id), result_key(task_id)):
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    async def _gen():
+        pubsub = r.pubsub()
+        # subscribe dulu, baru baca log → tidak ada event yang jatuh di celah antara keduanya
+        await pubsub.subscribe(events_channel(task_id))
+        try:
+            last = -1
+            backlog = [json.loads(x) for x in await r.lrange(events_log_key(task_id), 0, -1)]
+            for ev in sorted(backlog, key=lambda e: e["seq"]):
+                if ev["seq"] <= last:
+                    continue
+                last = ev["seq"]
+                yield _sse(ev)
+                if is_terminal(ev):
+                    return
+            while not await request.is_disconnected():
+                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=SSE_KEEPALIVE_SEC)
+                if msg is None:
+                    # sepi: cek status tersimpan / RQ langsung (worker mati / job tanpa event)
+                    stored = await r.hget(result_key(task_id), "status")
+                    status = stored.decode() if stored else None
+                    if status not in TERMINAL_STATUSES:
+                        raw = await r.hget(job_key, "status")
+                        status = STATUS_MAP.get(raw.decode() if raw else None, "unknown")
+                    if status in TERMINAL_STATUSES:
+                        yield _sse({"seq": last + 1, "type": "status", "status": status,
+                                    "ts": round(time.time(), 3), "poll": f"/result/{task_id}"})
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                ev = json.loads(msg["data"])
+                if ev["seq"] <= last:
+                    continue
+                last = ev["seq"]
+                yield _sse(ev)
+                if is_terminal(ev):
+                    return
+        finally:
+            await pubsub.unsubscribe(events_channel(task_id))
+            await pubsub.aclose()
+
+    return StreamingResponse(
+        _gen(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -21,6 +21,30 @@ EMBEDDING_MODEL = "Qwen/Qwen3-Embedding-0.6B"
 CHUNK_WORDS = 320
 CHUNK_OVERLAP_WORDS = 60
 
+# Embedding cache (content-addressed, shared antar proses worker)
+EMBED_CACHE = os.getenv("EMBED_CACHE", "1") == "1"
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", str(PROJECT_ROOT / "data" / "embed_cache" / "embeddings.sqlite"))
+EMBED_CACHE_MAX_MB = int(os.getenv("EMBED_CACHE_MAX_MB", "512"))
+# embedding chunk upload kandidat kedaluwarsa setelah N detik (0 = tidak disimpan); JD/rubric permanen
+EMBED_CACHE_CANDIDATE_TTL = int(os.getenv("EMBED_CACHE_CANDIDATE_TTL", str(24 * 3600)))
+EMBED_CACHE_TOUCH_SEC = int(os.getenv("EMBED_CACHE_TOUCH_SEC", "3600"))   # resolusi last_used (LRU)
+
+DOC_CACHE = os.getenv("DOC_CACHE", "1") == "1"
+DOC_CACHE_PATH = os.getenv("DOC_CACHE_PATH", str(PROJECT_ROOT / "data" / "doc_cache" / "documents.sqlite"))
+DOC_CACHE_MAX_MB = int(os.getenv("DOC_CACHE_MAX_MB", "256"))
+DOC_CACHE_TTL = int(os.getenv("DOC_CACHE_TTL", str(24 * 3600)))          # detik sejak disimpan
+# upload kandidat: simpan teks ter-normalisasi + PII-masked (0 = jangan pernah simpan ke disk)
+DOC_CACHE_CANDIDATES = os.getenv("DOC_CACHE_CANDIDATES", "1") == "1"
+
+QDRANT_PATH = os.getenv("QDRANT_PATH", "data/qdrant")
+# Worker: biarkan client Qdrant terbuka sepanjang umur proses (0 = tutup setelah tiap job)
+QDRANT_KEEP_OPEN = os.getenv("QDRANT_KEEP_OPEN", "1") == "1"
+
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "50"))        # koneksi per proses API; 0 = client baru per request
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))  # detik menunggu koneksi bebas saat pool penuh
 QUEUE_NAME = os.getenv("QUEUE_NAME", "eval")
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./data/uploads")
+UPLOAD_MAX_FILE_MB = float(os.getenv("UPLOAD_MAX_FILE_MB", "20"))
+UPLOAD_MAX_BATCH_MB = float(os.getenv("UPLOAD_MAX_BATCH_MB", "50"))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
@@ -4,16 +4,29 @@ from __future__ import annotations
 import os
 import json
 import logging
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from pydantic import BaseModel, Field, ValidationError
 
-from src.config import COLL_JOBS_CORPUS
-from src.llm.groq_client import call_groq
-from src.models.embedder import embed_texts
+from src.config import COLL_JOBS_CORPUS, DOC_CACHE, EMBED_CACHE_CANDIDATE_TTL
+from src.llm.groq_client import call_groq, GROQ_MODEL
+from src.llm.response_cache import LLM_CACHE, get_response_cache, llm_cache_key
+from src.llm.json_repair import recover_model, record_recovery, build_repair_messages
+from src.eval.prompt_budget import assemble_user_payload, EVIDENCE_SNIPPET_CHARS
 from src.storage.qdrant_store import query_topk
-from src.retrieval.memory_index import MemoryIndex, build_index_from_files
+from src.storage.corpus_version import corpus_version
+from src.storage.corpus_snapshot import get_snapshot
+from src.io.doc_cache import get_doc_cache
+from src.retrieval.memory_index import MemoryIndex, chunks_from_files
+from src.models.embedder import embed_chunks
+from src.retrieval.context_cache import get_context_cache
+from src.retrieval.probes import (
+    get_probe_vector,
+    PROBE_JD, PROBE_RUBRIC_CV, PROBE_RUBRIC_PROJECT, PROBE_CV, PROBE_PROJECT,
+)
 from src.utils.logs import setup_logging, short, hr
+from src.utils.timing import StageTimer, StageListener
 
 
 # =======================
@@ -25,6 +38,9 @@ EVAL_LOG = os.getenv("EVAL_LOG", "0") == "1"          # log retrieval context +
 LOG_LLM_RAW = os.getenv("LOG_LLM_RAW", "0") == "1"    # log raw LLM responses (beware of PII)
 LOG_SNIPPET_CHARS = int(os.getenv("LOG_SNIPPET_CHARS", "240"))
 LOG_RETRIEVAL_TOPK = int(os.getenv("LOG_RETRIEVAL_TOPK", "3"))
+CONTEXT_CACHE = os.getenv("CONTEXT_CACHE", "1") == "1"  # cache JD/rubric context per job_id
+CORPUS_SNAPSHOT = os.getenv("CORPUS_SNAPSHOT", "auto")  # auto|1|0: read jobs_corpus from the mmap snapshot
+BULK_LLM_CONCURRENCY = int(os.getenv("BULK_LLM_CONCURRENCY", "4"))
 
 
 # =======================
@@ -65,76 +81,125 @@ def _hits_to_evidence(hits: Dict[str, Any]) -> List[Dict[str, Any]]:
     docs = hits["documents"][0]
     mds = hits["metadatas"][0]
     ids = hits.get("ids", [[]])[0] if hits.get("ids") else [None] * len(docs)
+    dists = hits.get("distances", [[]])[0] if hits.get("distances") else []
     for i, d in enumerate(docs):
         md = mds[i] if i < len(mds) else {}
         ev.append(
             {
                 "chunk_id": str(ids[i]) if ids and i < len(ids) else None,
                 "filename": md.get("filename"),
-                "snippet": (d or "")[:400],
+                "snippet": (d or "")[:EVIDENCE_SNIPPET_CHARS],
+                "text": d or "",        # chunk utuh untuk dedup; tidak masuk prompt
+                # retrieval similarity; used for ranking/trimming, stripped from the prompt
+                "score": round(1.0 - float(dists[i]), 4) if i < len(dists) else 0.0,
             }
         )
     return ev
 
 
-def _retrieve(
-    job_id: str,
-    candidate_id: Optional[str],
-    *,
-    k_final: int = 8,
-    cv_index: Optional[MemoryIndex] = None,
-    project_index: Optional[MemoryIndex] = None,
-) -> Dict[str, Any]:
-    """Retrieve JD, rubric (from Qdrant), and CV/Project evidence (from Qdrant OR in-memory)."""
+def _corpus_snapshot():
+    """Read-only snapshot of jobs_corpus (no Qdrant lock), if enabled and published."""
+    if CORPUS_SNAPSHOT == "0":
+        return None
+    snap = get_snapshot(COLL_JOBS_CORPUS)
+    if snap is None and CORPUS_SNAPSHOT == "1":
+        raise RuntimeError("CORPUS_SNAPSHOT=1 but no snapshot exported; run scripts.ingest_jd_rubric first")
+    return snap
+
+
+def _q(where: Dict[str, Any], query: str, k: int) -> Dict[str, Any]:
+    snap = _corpus_snapshot()
+    if snap is not None:
+        return snap.query_topk(get_probe_vector(query), where=where, n_results=k)
+    return query_topk(
+        collection_name=COLL_JOBS_CORPUS,
+        query_vector=get_probe_vector(query),
+        where=where,
+        n_results=k,
+    )
 
-    def _q(where: Dict[str, Any], query: str) -> Dict[str, Any]:
-        qvec = embed_texts([query])[0]
-        return query_topk(
-            collection_name=COLL_JOBS_CORPUS,
-            query_vector=qvec,
-            where=where,
-            n_results=k_final,
-        )
 
-    # Persisted context
+def _retrieve_job_context(job_id: str, k_final: int = 8) -> Dict[str, str]:
+    """JD + rubric text for a job (identical for every candidate, so cached per job_id + corpus version)."""
+    fingerprint = None
+    if CONTEXT_CACHE:
+        fingerprint = corpus_version(COLL_JOBS_CORPUS, job_id)
+        if fingerprint is None:
+            # Redis tidak terjangkau: snapshot masih memberi versi murah; tanpa keduanya cache dilewati
+            snap = _corpus_snapshot()
+            fingerprint = snap.fingerprint(job_id) if snap is not None else None
+    if fingerprint is not None:
+        cached = get_context_cache().get(job_id, COLL_JOBS_CORPUS, k_final, fingerprint)
+        if cached is not None:
+            if EVAL_LOG:
+                LOGGER.info("job context cache hit job_id=%s stats=%s", job_id, get_context_cache().stats())
+            return cached
+
     jd_hits = _q(
         {"job_id": job_id, "source_type": "jd"},
-        "backend responsibilities llm rag chaining async reliability safeguards",
+        PROBE_JD,
+        k_final,
     )
     rub_cv_hits = _q(
         {"job_id": job_id, "source_type": "rubric", "section": "rubric_cv"},
-        "cv match technical skills experience achievements culture collaboration",
+        PROBE_RUBRIC_CV,
+        k_final,
     )
     rub_prj_hits = _q(
         {"job_id": job_id, "source_type": "rubric", "section": "rubric_project"},
-        "project correctness code quality resilience error handling documentation creativity",
+        PROBE_RUBRIC_PROJECT,
+        k_final,
     )
 
+    job_ctx = {
+        "job_text": "\n\n".join(jd_hits["documents"][0])[:6000] if jd_hits["documents"][0] else "",
+        "rubric_cv": "\n\n".join(rub_cv_hits["documents"][0])[:4000] if rub_cv_hits["documents"][0] else "",
+        "rubric_project": "\n\n".join(rub_prj_hits["documents"][0])[:4000] if rub_prj_hits["documents"][0] else "",
+    }
+    if fingerprint is not None:
+        get_context_cache().put(job_id, COLL_JOBS_CORPUS, k_final, fingerprint, job_ctx)
+    return job_ctx
+
+
+def _retrieve(
+    job_id: str,
+    candidate_id: Optional[str],
+    *,
+    k_final: int = 8,
+    cv_index: Optional[MemoryIndex] = None,
+    project_index: Optional[MemoryIndex] = None,
+    job_ctx: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Retrieve JD, rubric (from Qdrant), and CV/Project evidence (from Qdrant OR in-memory)."""
+
+    # Persisted context (pass `job_ctx` to reuse one already fetched for this job)
+    if job_ctx is None:
+        job_ctx = _retrieve_job_context(job_id, k_final=k_final)
+
     # Candidate evidence (either ephemeral memory index or persisted)
     if cv_index is not None:
-        cv_hits = cv_index.search("skills experience backend databases apis cloud ai llm", k=k_final)
+        cv_hits = cv_index.search_many([PROBE_CV], k=k_final)[0]
     else:
         assert candidate_id, "candidate_id is required when cv_index is None"
         cv_hits = _q(
             {"job_id": job_id, "source_type": "cv", "candidate_id": candidate_id},
-            "skills experience backend databases apis cloud ai llm",
+            PROBE_CV,
+            k_final,
         )
 
     if project_index is not None:
-        prj_hits = project_index.search(
-            "prompt design chaining rag retrieval error handling retries randomness readme tests",
-            k=k_final,
-        )
+        prj_hits = project_index.search_many([PROBE_PROJECT], k=k_final)[0]
     else:
         assert candidate_id, "candidate_id is required when project_index is None"
         prj_hits = _q(
             {"job_id": job_id, "source_type": "project", "candidate_id": candidate_id},
-            "prompt design chaining rag retrieval error handling retries randomness readme tests",
+            PROBE_PROJECT,
+            k_final,
         )
 
-    job_text = "\n\n".join(jd_hits["documents"][0])[:6000] if jd_hits["documents"][0] else ""
-    rubric_cv_text = "\n\n".join(rub_cv_hits["documents"][0])[:4000] if rub_cv_hits["documents"][0] else ""
-    rubric_prj_text = "\n\n".join(rub_prj_hits["documents"][0])[:4000] if rub_prj_hits["documents"][0] else ""
+    job_text = job_ctx["job_text"]
+    rubric_cv_text = job_ctx["rubric_cv"]
+    rubric_prj_text = job_ctx["rubric_project"]
 
     cv_evidence = _hits_to_evidence(cv_hits)
     project_evidence = _hits_to_evidence(prj_hits)
@@ -170,59 +235,65 @@ def _retrieve(
 # Prompting
 # =======================
 
-def _build_messages(ctx: Dict[str, Any]) -> List[Dict[str, str]]:
-    SYSTEM = (
-        "You are a strict recruitment screening assistant.\n"
-        "Use ONLY the provided evidence (Job Description, rubric, candidate CV & project snippets).\n"
-        "Score strictly according to the rubric; if evidence is missing/unclear, score conservatively.\n"
-        "Return ONLY valid JSON according to the requested schema; do not include any text outside JSON."
+# Schema hint to guide the LLM to produce consistent JSON
+OUTPUT_SCHEMA_HINT: Dict[str, Any] = {
+    "cv": {
+        "match_rate": "0..1 (weighted from 1..5 rubric dimensions below)",
+        "feedback": "2-4 sentences, concise and evidence-based",
+        "dimensions": [
+            {"name": "Technical Skills Match", "weight": 0.40, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
+            {"name": "Experience Level",        "weight": 0.25, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
+            {"name": "Relevant Achievements",   "weight": 0.20, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
+            {"name": "Cultural / Collaboration Fit","weight": 0.15, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
+        ],
+    },
+    "project": {
+        "feedback": "2-4 sentences, concise and evidence-based",
+        "dimensions": [
+            {"name": "Correctness (Prompt & Chaining)", "weight": 0.30, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
+            {"name": "Code Quality & Structure",        "weight": 0.25, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
+            {"name": "Resilience & Error Handling",     "weight": 0.20, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
+            {"name": "Documentation & Explanation",     "weight": 0.15, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
+            {"name": "Creativity / Bonus",              "weight": 0.10, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
+        ],
+    },
+    "overall_summary": "3-5 sentences; brief, neutral, grounded in evidence",
+    "risks": [],
+}
+
+
+SYSTEM_PROMPT = (
+    "You are a strict recruitment screening assistant.\n"
+    "Use ONLY the provided evidence (Job Description, rubric, candidate CV & project snippets).\n"
+    "Score strictly according to the rubric; if evidence is missing/unclear, score conservatively.\n"
+    "Return ONLY valid JSON according to the requested schema; do not include any text outside JSON."
+)
+
+USER_INSTRUCTIONS = (
+    "Evaluate the candidate strictly against the rubric using ONLY the supplied evidence.\n"
+    "For each dimension, produce a score (1..5), a short rationale, and 1-3 evidence snippets.\n"
+    "If relevant evidence is missing, assign a lower score and state that clearly.\n"
+    "Output VALID JSON matching the schema; no extra prose."
+)
+
+
+def _build_prompt(ctx: Dict[str, Any]) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+    """Messages under PROMPT_TOKEN_BUDGET + estimated tokens per prompt section."""
+    USER, token_report = assemble_user_payload(
+        ctx,
+        system=SYSTEM_PROMPT,
+        instructions=USER_INSTRUCTIONS,
+        schema_hint=OUTPUT_SCHEMA_HINT,
     )
-
-    # Schema hint to guide the LLM to produce consistent JSON
-    schema_hint = {
-        "cv": {
-            "match_rate": "0..1 (weighted from 1..5 rubric dimensions below)",
-            "feedback": "2-4 sentences, concise and evidence-based",
-            "dimensions": [
-                {"name": "Technical Skills Match", "weight": 0.40, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
-                {"name": "Experience Level",        "weight": 0.25, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
-                {"name": "Relevant Achievements",   "weight": 0.20, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
-                {"name": "Cultural / Collaboration Fit","weight": 0.15, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
-            ],
-        },
-        "project": {
-            "feedback": "2-4 sentences, concise and evidence-based",
-            "dimensions": [
-                {"name": "Correctness (Prompt & Chaining)", "weight": 0.30, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
-                {"name": "Code Quality & Structure",        "weight": 0.25, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
-                {"name": "Resilience & Error Handling",     "weight": 0.20, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
-                {"name": "Documentation & Explanation",     "weight": 0.15, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
-                {"name": "Creativity / Bonus",              "weight": 0.10, "score": "1..5", "rationale": "1-2 sentences", "evidence": []},
-            ],
-        },
-        "overall_summary": "3-5 sentences; brief, neutral, grounded in evidence",
-        "risks": [],
-    }
-
-    USER = {
-        "instructions": (
-            "Evaluate the candidate strictly against the rubric using ONLY the supplied evidence.\n"
-            "For each dimension, produce a score (1..5), a short rationale, and 1-3 evidence snippets.\n"
-            "If relevant evidence is missing, assign a lower score and state that clearly.\n"
-            "Output VALID JSON matching the schema; no extra prose."
-        ),
-        "job_description": ctx.get("job_text", ""),
-        "rubric_cv": ctx.get("rubric_cv", ""),
-        "rubric_project": ctx.get("rubric_project", ""),
-        "cv_evidence": ctx.get("cv_evidence", []),
-        "project_evidence": ctx.get("project_evidence", []),
-        "output_schema": schema_hint,
-    }
-
-    return [
-        {"role": "system", "content": SYSTEM},
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": json.dumps(USER, ensure_ascii=False)},
     ]
+    return messages, token_report
+
+
+def _build_messages(ctx: Dict[str, Any]) -> List[Dict[str, str]]:
+    return _build_prompt(ctx)[0]
 
 
 # =======================
@@ -235,23 +306,58 @@ def _weighted_avg(items: List[Dict[str, Any]]) -> float:
     return num / den
 
 
-def _eval_with_ctx(ctx: Dict[str, Any]) -> Dict[str, Any]:
-    messages = _build_messages(ctx)
-
-    # Call Groq in JSON mode, fallback once without strict JSON mode if validation fails
-    raw = call_groq(messages, json_mode=True, temperature=0.1)
-    if LOG_LLM_RAW:
-        LOGGER.info(hr("LLM RAW (attempt #1, json_mode=True)"))
-        LOGGER.info("%s", short(raw, 1200))
-
-    try:
-        obj = LLMResult.model_validate_json(raw)
-    except ValidationError:
-        raw2 = call_groq(messages, json_mode=False, temperature=0.0)
-        if LOG_LLM_RAW:
-            LOGGER.info(hr("LLM RAW (attempt #2, json_mode=False)"))
-            LOGGER.info("%s", short(raw2, 1200))
-        obj = LLMResult.model_validate_json(raw2)
+def _eval_with_ctx(
+    ctx: Dict[str, Any],
+    *,
+    bypass_cache: bool = False,
+    timer: Optional[StageTimer] = None,
+) -> Dict[str, Any]:
+    timer = timer or StageTimer()
+    with timer.stage("prompt"):
+        messages, token_report = _build_prompt(ctx)
+    if EVAL_LOG:
+        LOGGER.info("prompt tokens (est.) %s", token_report)
+
+    with timer.stage("llm"):
+        # Identical prompt evaluated before (re-submit / RQ retry) → reuse the validated response
+        use_cache = LLM_CACHE and not bypass_cache
+        cache_key = llm_cache_key(GROQ_MODEL, 0.1, True, messages)
+        obj: Optional[LLMResult] = None
+        path = "cache"          # jalur recovery yang menghasilkan obj (lihat json_repair.RECOVERY_PATHS)
+        if use_cache:
+            cached = get_response_cache().get(cache_key)
+            if cached is not None:
+                try:
+                    obj = LLMResult.model_validate_json(cached)
+                    if EVAL_LOG:
+                        LOGGER.info("LLM cache hit %s", get_response_cache().stats())
+                except ValidationError:
+                    obj = None
+
+        if obj is None:
+            raw = call_groq(messages, json_mode=True, temperature=0.1)
+            if LOG_LLM_RAW:
+                LOGGER.info(hr("LLM RAW (attempt #1, json_mode=True)"))
+                LOGGER.info("%s", short(raw, 1200))
+
+            # Local recovery first (fences/prefix, truncation, trailing commas, field coercion)
+            obj, path = recover_model(raw, LLMResult)
+            if obj is None:
+                # Still broken: ask for a JSON fix of the output only (no evidence payload re-sent)
+                raw2 = call_groq(build_repair_messages(raw, OUTPUT_SCHEMA_HINT), json_mode=True, temperature=0.0)
+                if LOG_LLM_RAW:
+                    LOGGER.info(hr("LLM RAW (repair prompt)"))
+                    LOGGER.info("%s", short(raw2, 1200))
+                obj, _ = recover_model(raw2, LLMResult)
+                path = "repair_prompt" if obj is not None else "failed"
+            record_recovery(path)
+            if obj is None:
+                raise ValueError(f"LLM output is not valid result JSON: {short(raw, 300)}")
+            if EVAL_LOG and path != "direct":
+                LOGGER.info("LLM output recovered via %s", path)
+
+            if use_cache:
+                get_response_cache().put(cache_key, obj.model_dump_json())
 
     cv_dims = obj.cv.get("dimensions", []) if isinstance(obj.cv, dict) else []
     prj_dims = obj.project.get("dimensions", []) if isinstance(obj.project, dict) else []
@@ -280,6 +386,7 @@ def _eval_with_ctx(ctx: Dict[str, Any]) -> Dict[str, Any]:
             "risks": obj.risks,
         },
         "decision": decision,
+        "meta": {"prompt_tokens": token_report, "stages": timer.as_dict(), "llm_recovery": path},
     }
 
     if EVAL_LOG:
@@ -294,14 +401,14 @@ def _eval_with_ctx(ctx: Dict[str, Any]) -> Dict[str, Any]:
 # Public API (two modes)
 # =======================
 
-def evaluate_candidate(job_id: str, candidate_id: str) -> Dict[str, Any]:
+def evaluate_candidate(job_id: str, candidate_id: str, *, bypass_cache: bool = False) -> Dict[str, Any]:
     """
     PERSISTENT mode:
     - JD & rubric from Qdrant
     - CV & Project are also expected in Qdrant under the given candidate_id
     """
     ctx = _retrieve(job_id, candidate_id, k_final=8, cv_index=None, project_index=None)
-    return _eval_with_ctx(ctx)
+    return _eval_with_ctx(ctx, bypass_cache=bypass_cache)
 
 
 def evaluate_candidate_from_files(
@@ -310,13 +417,124 @@ def evaluate_candidate_from_files(
     project_paths: List[str],
     *,
     candidate_id: str = "upload",  # label only; not persisted
+    bypass_cache: bool = False,    # force a fresh LLM call
+    on_stage: Optional[StageListener] = None,   # progress hook: (kind, stage, ms)
 ) -> Dict[str, Any]:
     """
     EPHEMERAL mode (recommended for privacy during upload):
     - JD & rubric from Qdrant
-    - CV & Project are read from files, embedded & queried in memory (NOT saved)
+    - CV & Project are read from files, embedded & queried in memory (never written to Qdrant);
+      only their normalized, PII-masked page text may stay in the local doc cache, for at most
+      DOC_CACHE_TTL seconds (DOC_CACHE_CANDIDATES=0 disables even that), and their chunk
+      embeddings for EMBED_CACHE_CANDIDATE_TTL seconds (0 = not stored)
+
+    Stage pipeline: load → normalize → chunk → embed → retrieve → prompt → llm.
+    CV and project parsing run concurrently, and the persisted JD/rubric retrieval
+    overlaps with candidate parsing + embedding. Timings land in result["meta"]["stages"] (ms).
     """
-    cv_idx = build_index_from_files(cv_paths, job_id, candidate_id, source_type="cv")
-    prj_idx = build_index_from_files(project_paths, job_id, candidate_id, source_type="project")
-    ctx = _retrieve(job_id, candidate_id=None, k_final=8, cv_index=cv_idx, project_index=prj_idx)
-    return _eval_with_ctx(ctx)
+    timer = StageTimer(on_event=on_stage)
+
+    def _job_context() -> Dict[str, str]:
+        with timer.stage("retrieve.job_context"):
+            return _retrieve_job_context(job_id, k_final=8)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        fut_ctx = pool.submit(_job_context)
+        fut_cv = pool.submit(chunks_from_files, cv_paths, job_id, candidate_id, "cv", timer=timer)
+        fut_prj = pool.submit(chunks_from_files, project_paths, job_id, candidate_id, "project", timer=timer)
+        cv_docs, cv_metas = fut_cv.result()
+        prj_docs, prj_metas = fut_prj.result()
+
+        # one embedding pass for both sides (fills the batch better than two calls)
+        with timer.stage("embed"):
+            embs = embed_chunks(cv_docs + prj_docs, ttl=EMBED_CACHE_CANDIDATE_TTL)
+        n_cv = len(cv_docs)
+        cv_idx = MemoryIndex(cv_docs, cv_metas, embeddings=embs[:n_cv] if cv_docs else None)
+        prj_idx = MemoryIndex(prj_docs, prj_metas, embeddings=embs[n_cv:] if prj_docs else None)
+
+        job_ctx = fut_ctx.result()
+
+    with timer.stage("retrieve.candidate"):
+        ctx = _retrieve(
+            job_id, candidate_id=None, k_final=8,
+            cv_index=cv_idx, project_index=prj_idx, job_ctx=job_ctx,
+        )
+    result = _eval_with_ctx(ctx, bypass_cache=bypass_cache, timer=timer)
+    if EVAL_LOG:
+        LOGGER.info("stage timings (ms) %s", result["meta"]["stages"])
+        if DOC_CACHE:
+            LOGGER.info("doc cache %s", get_doc_cache().stats())
+    return result
+
+
+def evaluate_candidates_bulk(
+    job_id: str,
+    candidates: List[Dict[str, Any]],
+    *,
+    on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    max_concurrency: int = BULK_LLM_CONCURRENCY,
+    bypass_cache: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    BULK ephemeral mode: many candidates against one job_id.
+    - JD & rubric context retrieved once
+    - all candidates' CV/project chunks embedded together in large batches
+    - LLM calls run with bounded concurrency; `on_result(candidate_id, item)` fires as each finishes
+
+    candidates: [{"candidate_id": str, "cv_paths": [...], "project_paths": [...]}, ...]
+    Returns {candidate_id: {"status": "completed", "result": ...} | {"status": "failed", "error": ...}}
+    """
+    job_ctx = _retrieve_job_context(job_id, k_final=8)  # shared by every candidate; Qdrant touched once
+
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def _emit(cid: str, item: Dict[str, Any]) -> None:
+        results[cid] = item
+        if on_result is not None:
+            try:
+                on_result(cid, item)
+            except Exception:
+                LOGGER.exception("bulk on_result callback failed for %s", cid)
+
+    # 1) parse + chunk everyone, then one embedding pass over all chunks
+    parts: List[Tuple[str, str, List[str], List[Dict[str, Any]]]] = []   # (cid, source_type, docs, metas)
+    for c in candidates:
+        cid = c["candidate_id"]
+        try:
+            for source_type, key in (("cv", "cv_paths"), ("project", "project_paths")):
+                docs, metas = chunks_from_files(c.get(key) or [], job_id, cid, source_type=source_type)
+                parts.append((cid, source_type, docs, metas))
+        except Exception as e:
+            parts = [p for p in parts if p[0] != cid]
+            _emit(cid, {"status": "failed", "error": f"{type(e).__name__}: {e}"})
+
+    all_docs = [d for _, _, docs, _ in parts for d in docs]
+    all_embs = embed_chunks(all_docs, ttl=EMBED_CACHE_CANDIDATE_TTL)
+
+    indexes: Dict[str, Dict[str, MemoryIndex]] = {}
+    off = 0
+    for cid, source_type, docs, metas in parts:
+        embs = all_embs[off:off + len(docs)] if docs else None
+        off += len(docs)
+        indexes.setdefault(cid, {})[source_type] = MemoryIndex(docs, metas, embeddings=embs)
+
+    # 2) retrieval (cheap, in-memory) + LLM (bounded concurrency)
+    def _one(cid: str) -> Dict[str, Any]:
+        idx = indexes[cid]
+        ctx = _retrieve(
+            job_id, candidate_id=None, k_final=8,
+            cv_index=idx["cv"], project_index=idx["project"], job_ctx=job_ctx,
+        )
+        return _eval_with_ctx(ctx, bypass_cache=bypass_cache)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        futs = {pool.submit(_one, cid): cid for cid in indexes}
+        for fut in as_completed(futs):
+            cid = futs[fut]
+            try:
+                _emit(cid, {"status": "completed", "result": fut.result()})
+            except Exception as e:
+                LOGGER.exception("bulk evaluation failed for %s", cid)
+                _emit(cid, {"status": "failed", "error": f"{type(e).__name__}: {e}"})
+
+    return results
@@ -0,0 +1,156 @@
+# src/eval/prompt_budget.py
+"""Token-budgeted assembly of the screening prompt (local token estimate, evidence dedup + ranking)."""
+from __future__ import annotations
+
+import json
+import math
+import os
+from typing import Any, Dict, List, Tuple
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+MIN_OVERLAP_WORDS = 8          # overlap chunk (CHUNK_OVERLAP_WORDS) yang cukup panjang untuk dipangkas
+MIN_TEXT_TOKENS = 200          # JD/rubric tidak dipangkas di bawah ini
+EVIDENCE_SNIPPET_CHARS = 400   # panjang snippet di prompt (dipotong SETELAH dedup)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate (~4 chars/token for English BPE; punctuation-heavy JSON counts a bit more)."""
+    if not text:
+        return 0
+    return max(math.ceil(len(text) / 4), len(text.split()))
+
+
+def _json_tokens(obj: Any) -> int:
+    return estimate_tokens(json.dumps(obj, ensure_ascii=False))
+
+
+# =======================
+# Evidence dedup + ranking
+# =======================
+
+def _overlap(a: List[str], b: List[str]) -> int:
+    """Length of the longest suffix of `a` equal to a prefix of `b` (>= MIN_OVERLAP_WORDS, else 0)."""
+    for k in range(min(len(a), len(b)), MIN_OVERLAP_WORDS - 1, -1):
+        if a[-k:] == b[:k]:
+            return k
+    return 0
+
+
+def dedupe_evidence(items: List[Dict[str, Any]], snippet_chars: int = EVIDENCE_SNIPPET_CHARS) -> List[Dict[str, Any]]:
+    """
+    Rank by retrieval score, drop duplicate/contained chunks and trim text that
+    repeats an already-kept neighbour chunk (sliding-window overlap). Higher-scored copy wins.
+    Works on the full chunk text (`text`, falling back to `snippet`): the overlap sits at the
+    end of a chunk, so it is only visible before the snippet is cut to `snippet_chars`.
+    """
+    ranked = sorted(items, key=lambda e: -float(e.get("score") or 0.0))
+    kept: List[Dict[str, Any]] = []
+    kept_words: List[List[str]] = []
+    for ev in ranked:
+        words = (ev.get("text") or ev.get("snippet") or "").split()
+        text = " ".join(words)
+        if not words or any(text in " ".join(w) for w in kept_words):
+            continue
+        for w in kept_words:
+            k = _overlap(w, words)            # kept chunk lalu chunk ini
+            if k:
+                words = words[k:]
+            k = _overlap(words, w)            # chunk ini lalu kept chunk
+            if k:
+                words = words[:-k]
+            if not words:
+                break
+        if not words:
+            continue
+        kept_words.append(words)
+        item = {k: v for k, v in ev.items() if k != "text"}
+        item["snippet"] = " ".join(words)[:snippet_chars]
+        kept.append(item)
+    return kept
+
+
+# =======================
+# Assembly
+# =======================
+
+def _truncate_to_tokens(text: str, tokens: int) -> str:
+    est = estimate_tokens(text)
+    if est <= tokens:
+        return text
+    keep = int(len(text) * tokens / est)
+    return text[:keep].rsplit(" ", 1)[0]
+
+
+def _public_evidence(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{k: v for k, v in ev.items() if k != "score"} for ev in items]
+
+
+def assemble_user_payload(
+    ctx: Dict[str, Any],
+    *,
+    system: str,
+    instructions: str,
+    schema_hint: Dict[str, Any],
+    budget: int = PROMPT_TOKEN_BUDGET,
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Build the user JSON payload under `budget` tokens.
+    Order of sacrifice: lowest-scored evidence first (alternating CV/project), then JD/rubric text.
+    Returns (payload, tokens per section).
+    """
+    cv_ev = dedupe_evidence(ctx.get("cv_evidence", []))
+    prj_ev = dedupe_evidence(ctx.get("project_evidence", []))
+    texts = {
+        "job_description": ctx.get("job_text", "") or "",
+        "rubric_cv": ctx.get("rubric_cv", "") or "",
+        "rubric_project": ctx.get("rubric_project", "") or "",
+    }
+
+    fixed = estimate_tokens(system) + estimate_tokens(instructions) + _json_tokens(schema_hint) + 32
+
+    def _total() -> int:
+        return (
+            fixed
+            + sum(estimate_tokens(t) for t in texts.values())
+            + _json_tokens(_public_evidence(cv_ev))
+            + _json_tokens(_public_evidence(prj_ev))
+        )
+
+    # 1) buang evidence skor terendah, tapi sisakan minimal 1 per sisi
+    turn_cv = len(cv_ev) >= len(prj_ev)
+    while _total() > budget and (len(cv_ev) > 1 or len(prj_ev) > 1):
+        if (turn_cv and len(cv_ev) > 1) or len(prj_ev) <= 1:
+            cv_ev.pop()
+        else:
+            prj_ev.pop()
+        turn_cv = not turn_cv
+
+    # 2) pangkas JD/rubric proporsional
+    over = _total() - budget
+    if over > 0:
+        sizes = {k: estimate_tokens(t) for k, t in texts.items()}
+        shrinkable = sum(max(0, n - MIN_TEXT_TOKENS) for n in sizes.values()) or 1
+        for k, n in sizes.items():
+            cut = math.ceil(over * max(0, n - MIN_TEXT_TOKENS) / shrinkable)
+            texts[k] = _truncate_to_tokens(texts[k], max(MIN_TEXT_TOKENS, n - cut))
+
+    payload = {
+        "instructions": instructions,
+        **texts,
+        "cv_evidence": _public_evidence(cv_ev),
+        "project_evidence": _public_evidence(prj_ev),
+        "output_schema": schema_hint,
+    }
+    report = {
+        "system": estimate_tokens(system),
+        "instructions": estimate_tokens(instructions),
+        "job_description": estimate_tokens(texts["job_description"]),
+        "rubric_cv": estimate_tokens(texts["rubric_cv"]),
+        "rubric_project": estimate_tokens(texts["rubric_project"]),
+        "cv_evidence": _json_tokens(payload["cv_evidence"]),
+        "project_evidence": _json_tokens(payload["project_evidence"]),
+        "output_schema": _json_tokens(schema_hint),
+    }
+    report["total"] = estimate_tokens(system) + _json_tokens(payload)
+    report["budget"] = budget
+    return payload, report
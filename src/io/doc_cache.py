@@ -0,0 +1,198 @@
+# src/io/doc_cache.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.config import DOC_CACHE, DOC_CACHE_PATH, DOC_CACHE_MAX_MB, DOC_CACHE_TTL
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def doc_key(sha256: str, variant: str) -> str:
+    """Content address: file hash + variant (loader version, normalization, page cap)."""
+    return hashlib.sha256(f"{sha256}|{variant}".encode("utf-8")).hexdigest()
+
+
+class DocumentCache:
+    """
+    On-disk cache of extracted page texts (raw or normalized), keyed by file content hash.
+    SQLite (WAL) so every worker process on the host shares it; bounded by stored text bytes, LRU eviction.
+    Entries expire `ttl` seconds after they were stored (candidate text must not outlive its results).
+    Like the embedding cache, the byte total lives in `docs_meta` and is kept exact by triggers.
+    """
+    def __init__(self, path: str = DOC_CACHE_PATH, max_bytes: int = DOC_CACHE_MAX_MB * 1024 * 1024, ttl: int = DOC_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " key TEXT PRIMARY KEY, pages TEXT NOT NULL,"
+                " nbytes INTEGER NOT NULL, last_used REAL NOT NULL,"
+                " created REAL NOT NULL DEFAULT 0)"
+            )
+            cols = {r[1] for r in self._conn.execute("PRAGMA table_info(docs)")}
+            if "created" not in cols:
+                # cache lama tanpa umur: created=0 → langsung kedaluwarsa
+                self._conn.execute("ALTER TABLE docs ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS docs_last_used ON docs(last_used)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS docs_created ON docs(created)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS docs_meta (k TEXT PRIMARY KEY, v INTEGER NOT NULL)")
+            if self._conn.execute("SELECT 1 FROM docs_meta WHERE k='bytes'").fetchone() is None:
+                # sekali saja (cache lama / baru): hitung total awal, setelah itu dijaga trigger
+                self._conn.execute("INSERT INTO docs_meta(k, v) SELECT 'bytes', COALESCE(SUM(nbytes), 0) FROM docs")
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS docs_bytes_ins AFTER INSERT ON docs BEGIN"
+                " UPDATE docs_meta SET v = v + NEW.nbytes WHERE k='bytes'; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS docs_bytes_upd AFTER UPDATE OF nbytes ON docs BEGIN"
+                " UPDATE docs_meta SET v = v + NEW.nbytes - OLD.nbytes WHERE k='bytes'; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS docs_bytes_del AFTER DELETE ON docs BEGIN"
+                " UPDATE docs_meta SET v = v - OLD.nbytes WHERE k='bytes'; END"
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self._purge_expired()
+
+    def _purge_expired(self) -> int:
+        if self.ttl <= 0:
+            return 0
+        return self._conn.execute("DELETE FROM docs WHERE created < ?", (time.time() - self.ttl,)).rowcount
+
+    def get(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            row = self._conn.execute("SELECT pages, created FROM docs WHERE key=?", (key,)).fetchone()
+            if row is not None and self.ttl > 0 and row[1] < time.time() - self.ttl:
+                self._conn.execute("DELETE FROM docs WHERE key=?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE docs SET last_used=? WHERE key=?", (time.time(), key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, pages: List[str]) -> None:
+        blob = json.dumps(pages, ensure_ascii=False)
+        nbytes = len(blob.encode("utf-8"))
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # upsert, bukan INSERT OR REPLACE: REPLACE menghapus baris tanpa menjalankan trigger delete
+                self._conn.execute(
+                    "INSERT INTO docs(key, pages, nbytes, last_used, created) VALUES (?,?,?,?,?)"
+                    " ON CONFLICT(key) DO UPDATE SET pages=excluded.pages, nbytes=excluded.nbytes,"
+                    " last_used=excluded.last_used, created=excluded.created",
+                    (key, blob, nbytes, now, now),
+                )
+                self._purge_expired()
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _total_bytes(self) -> int:
+        row = self._conn.execute("SELECT v FROM docs_meta WHERE k='bytes'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _evict(self) -> None:
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        # buang LRU sampai ~90% kapasitas supaya tidak evict di setiap put
+        target = int(self.max_bytes * 0.9)
+        freed = 0
+        drop: List[str] = []
+        for key, nbytes in self._conn.execute("SELECT key, nbytes FROM docs ORDER BY last_used ASC"):
+            drop.append(key)
+            freed += nbytes
+            if total - freed <= target:
+                break
+        self._conn.executemany("DELETE FROM docs WHERE key=?", [(k,) for k in drop])
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            total = self._total_bytes()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": rows,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[DocumentCache] = None
+_cache_pid: Optional[int] = None
+
+def get_doc_cache() -> DocumentCache:
+    global _cache, _cache_pid
+    # koneksi SQLite tidak boleh dibawa lintas fork
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = DocumentCache()
+        _cache_pid = os.getpid()
+    return _cache
+
+
+def cached_pages(
+    path: str,
+    variant: str,
+    produce: Callable[[], Iterator[str]],
+    sha256: Optional[str] = None,
+    cache: bool = True,
+) -> Iterator[str]:
+    """
+    Yield the pages of `path` from the cache, or stream them from `produce()` and store
+    them once fully consumed (an abandoned stream is not cached). `cache=False` bypasses
+    the cache entirely (nothing is read or written).
+    """
+    if not DOC_CACHE or not cache:
+        yield from produce()
+        return
+    cache = get_doc_cache()
+    key = doc_key(sha256 or file_sha256(path), variant)
+    pages = cache.get(key)
+    if pages is not None:
+        yield from pages
+        return
+    pages = []
+    for page in produce():
+        pages.append(page)
+        yield page
+    cache.put(key, pages)
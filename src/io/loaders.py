@@ -1,15 +1,73 @@
 import os
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
 from pypdf import PdfReader
 from docx import Document as DocxDocument
 
-def read_pdf(path: str) -> str:
+from src.io.doc_cache import cached_pages
+from src.processing.normalizer import normalize_text
+
+# naikkan bila hasil ekstraksi/normalisasi berubah → entri doc cache lama otomatis tidak terpakai
+LOADER_VERSION = "2"
+
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))   # di bawah ini: ekstraksi serial
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_DOC_PAGES = int(os.getenv("MAX_DOC_PAGES", "0")) or None               # batas halaman per dokumen
+
+PAGE_CARRY_MAX_CHARS = 512     # baris terakhir halaman yang ditahan untuk digabung ke halaman berikutnya
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    One extraction pool per process, created on first use and reused for every later PDF.
+    Spawning it costs ~1 s, so only documents of PDF_PARALLEL_MIN_PAGES+ pages use it.
+    """
+    global _pool, _pool_pid
+    # pool milik parent tidak bisa dipakai setelah fork (mis. WORKER_FORK=1)
+    if _pool is None or _pool_pid != os.getpid():
+        # spawn: jangan fork proses worker yang sudah memuat model embedding
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        _pool_pid = os.getpid()
+    return _pool
+
+def _extract_pdf_pages(path: str, start: int, stop: int) -> List[str]:
+    """Runs in a pool process: extract pages [start, stop)."""
     with open(path, "rb") as f:
         reader = PdfReader(f)
-        texts = []
-        for p in reader.pages:
-            txt = p.extract_text() or ""
-            texts.append(txt)
-        return "\n".join(texts)
+        return [(reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+def iter_pdf_pages(path: str, max_pages: Optional[int] = None, workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield page texts in order. Large documents are split into page ranges extracted
+    in parallel by a process pool; consumers start on the first pages while the rest are parsed.
+    """
+    workers = PDF_WORKERS if workers is None else workers
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        n = len(reader.pages)
+        if max_pages:
+            n = min(n, max_pages)
+        if n < PDF_PARALLEL_MIN_PAGES or workers <= 1:
+            for i in range(n):
+                yield reader.pages[i].extract_text() or ""
+            return
+
+    pool = _get_pool()
+    size = max(1, math.ceil(n / (workers * 2)))
+    futs = [pool.submit(_extract_pdf_pages, path, s, min(n, s + size)) for s in range(0, n, size)]
+    try:
+        for fut in futs:
+            yield from fut.result()
+    finally:
+        for fut in futs:
+            fut.cancel()
+
+def read_pdf(path: str, max_pages: Optional[int] = None) -> str:
+    return "\n".join(iter_pdf_pages(path, max_pages=max_pages))
 
 def read_docx(path: str) -> str:
     doc = DocxDocument(path)
@@ -19,13 +77,69 @@ def read_txt(path: str) -> str:
     with open(path, "r", encoding="utf-8", errors="ignore") as f:
         return f.read()
 
-def load_text_from_file(path: str) -> str:
+def _iter_pages_uncached(path: str, max_pages: Optional[int]) -> Iterator[str]:
     ext = os.path.splitext(path)[1].lower()
     if ext == ".pdf":
-        return read_pdf(path)
+        yield from iter_pdf_pages(path, max_pages=max_pages)
     elif ext == ".docx":
-        return read_docx(path)
+        yield read_docx(path)
     elif ext in [".txt", ".md"]:
-        return read_txt(path)
+        yield read_txt(path)
     else:
         raise ValueError(f"Unsupported file type: {ext}")
+
+def _check_ext(path: str) -> None:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in (".pdf", ".docx", ".txt", ".md"):
+        raise ValueError(f"Unsupported file type: {ext}")
+
+def iter_text_pages(
+    path: str,
+    max_pages: Optional[int] = MAX_DOC_PAGES,
+    sha256: Optional[str] = None,
+) -> Iterator[str]:
+    """Streaming variant of `load_text_from_file`: PDFs page by page, other formats as one piece."""
+    _check_ext(path)
+    return cached_pages(
+        path, f"raw|v{LOADER_VERSION}|{max_pages or 0}",
+        lambda: _iter_pages_uncached(path, max_pages), sha256=sha256,
+    )
+
+def _normalize_pages(pages: Iterator[str], mask_pii_flag: bool) -> Iterator[str]:
+    """
+    Normalize page by page, but hold back each page's last line and prepend it to the next
+    page, so a value wrapped across a page break (e.g. a phone number) is masked on the joined
+    text. A token cut mid-word by the PDF itself (no line break) can still slip through.
+    """
+    carry = ""
+    for pg in pages:
+        text = f"{carry}\n{pg}" if carry else pg
+        head, sep, tail = text.rpartition("\n")
+        if sep and len(tail) <= PAGE_CARRY_MAX_CHARS:
+            carry = tail
+        else:
+            head, carry = text, ""
+        yield normalize_text(head, mask_pii_flag=mask_pii_flag)
+    if carry:
+        yield normalize_text(carry, mask_pii_flag=mask_pii_flag)
+
+def iter_normalized_pages(
+    path: str,
+    mask_pii_flag: bool = True,
+    max_pages: Optional[int] = MAX_DOC_PAGES,
+    sha256: Optional[str] = None,
+    cache: bool = True,
+) -> Iterator[str]:
+    """
+    Normalized page texts; cached separately from raw pages, so repeat uploads skip both steps.
+    Only the normalized output is stored (never the raw pages) unless `cache=False`.
+    """
+    _check_ext(path)
+    return cached_pages(
+        path, f"norm|v{LOADER_VERSION}|{max_pages or 0}|pii={int(mask_pii_flag)}",
+        lambda: _normalize_pages(_iter_pages_uncached(path, max_pages), mask_pii_flag),
+        sha256=sha256, cache=cache,
+    )
+
+def load_text_from_file(path: str) -> str:
+    return "\n".join(iter_text_pages(path))
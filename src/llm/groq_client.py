@@ -1,17 +1,87 @@
 # src/llm/groq_client.py
 import os
 import json
+import time
+import asyncio
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from src.utils.logs import setup_logging
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-70b-versatile")
 GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com")
 
-def call_groq(messages, json_mode=True, timeout=60, temperature=0.2, max_tokens=None):
-    """
-    Call Groq's OpenAI-compatible Chat Completions API using POST.
-    Raises with clear error if anything goes wrong.
-    """
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "4"))
+GROQ_BACKOFF_BASE = float(os.getenv("GROQ_BACKOFF_BASE", "0.5"))   # detik
+GROQ_BACKOFF_MAX = float(os.getenv("GROQ_BACKOFF_MAX", "20"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+GROQ_POOL_SIZE = int(os.getenv("GROQ_POOL_SIZE", "10"))
+GROQ_STATS_EVERY = int(os.getenv("GROQ_STATS_EVERY", "100"))   # log stats tiap N call (0 = off)
+
+LOGGER = setup_logging("groq_client")
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+# =======================
+# Stats (latency + token usage)
+# =======================
+
+class GroqStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.latency_total = 0.0
+        self.last_latency = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, latency: float, usage: Optional[Dict[str, Any]], attempts: int, ok: bool = True):
+        with self._lock:
+            self.calls += 1
+            self.retries += max(0, attempts - 1)
+            self.latency_total += latency
+            self.last_latency = latency
+            if not ok:
+                self.errors += 1
+            if usage:
+                self.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+                self.completion_tokens += int(usage.get("completion_tokens") or 0)
+            due = GROQ_STATS_EVERY > 0 and self.calls % GROQ_STATS_EVERY == 0
+        if due:
+            LOGGER.info("groq stats %s", self.snapshot())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "retries": self.retries,
+                "avg_latency_s": round(self.latency_total / self.calls, 3) if self.calls else 0.0,
+                "last_latency_s": round(self.last_latency, 3),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+_stats = GroqStats()
+
+def get_groq_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
+
+
+# =======================
+# Shared request building / retry policy
+# =======================
+
+def _build_request(messages, json_mode, temperature, max_tokens):
     if not GROQ_API_KEY:
         raise RuntimeError("GROQ_API_KEY is not set in environment")
 
@@ -30,21 +100,170 @@ def call_groq(messages, json_mode=True, timeout=60, temperature=0.2, max_tokens=
     if json_mode:
         # Many Groq models support this OpenAI-compatible field
         payload["response_format"] = {"type": "json_object"}
+    return url, headers, payload
 
-    # POST (bukan GET!)
-    resp = requests.post(url, headers=headers, json=payload, timeout=timeout)
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse header Retry-After (detik atau HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff; Retry-After dari server dihormati sebagai batas bawah."""
+    delay = random.uniform(0, min(GROQ_BACKOFF_MAX, GROQ_BACKOFF_BASE * (2 ** attempt)))
+    server = _retry_after_seconds(retry_after)
+    if server is not None:
+        delay = max(delay, min(server, GROQ_BACKOFF_MAX))
+    return delay
+
+def _retry_delay(attempt: int, status: Optional[int] = None, retry_after: Optional[str] = None) -> Optional[float]:
+    """
+    Seconds to wait before attempt `attempt + 1`, or None when the reply is final (not 429/5xx)
+    or retries are spent. status=None means the request itself failed (connection / timeout).
+    """
+    if attempt > GROQ_MAX_RETRIES:
+        return None
+    if status is not None and status not in RETRY_STATUS:
+        return None
+    return _backoff_delay(attempt - 1, retry_after)
 
-    # Debug ringan
-    method_used = getattr(resp.request, "method", "UNKNOWN")
-    if method_used != "POST":
-        raise RuntimeError(f"Expected POST, got {method_used}")
+def _give_up(t0: float, attempt: int, err: Exception) -> RuntimeError:
+    _stats.record(time.perf_counter() - t0, None, attempt, ok=False)
+    return RuntimeError(f"Groq request failed after {attempt} attempts: {err}")
 
-    # Raise jika non-2xx dan tampilkan body dari Groq
+def _parse_response(status: int, text: str, data_fn):
+    if status >= 400:
+        raise RuntimeError(f"Groq error {status}: {text}")
+    data = data_fn()
+    return data["choices"][0]["message"]["content"], data.get("usage")
+
+def _finish(t0: float, attempt: int, status: int, text: str, data_fn) -> str:
+    """Parse the final reply and record latency / tokens (sync and async share this)."""
     try:
-        resp.raise_for_status()
-    except requests.HTTPError as e:
-        detail = resp.text
-        raise RuntimeError(f"Groq error {resp.status_code}: {detail}") from e
+        content, usage = _parse_response(status, text, data_fn)
+    except Exception:
+        _stats.record(time.perf_counter() - t0, None, attempt, ok=False)
+        raise
+    _stats.record(time.perf_counter() - t0, usage, attempt)
+    return content
+
+
+# =======================
+# Sync client (pooled keep-alive session)
+# =======================
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_sync_limiter = threading.BoundedSemaphore(max(1, GROQ_MAX_CONCURRENCY))
+
+def get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=GROQ_POOL_SIZE, pool_maxsize=GROQ_POOL_SIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+    return _session
+
+def call_groq(messages, json_mode=True, timeout=60, temperature=0.2, max_tokens=None):
+    """
+    Call Groq's OpenAI-compatible Chat Completions API using POST.
+    Reuses a pooled keep-alive session, retries 429/5xx with jittered backoff
+    (honoring Retry-After) and caps concurrent calls per process.
+    Raises with clear error if anything goes wrong.
+    """
+    url, headers, payload = _build_request(messages, json_mode, temperature, max_tokens)
+    session = get_session()
+
+    t0 = time.perf_counter()
+    attempt = 0
+    with _sync_limiter:
+        while True:
+            attempt += 1
+            try:
+                resp = session.post(url, headers=headers, json=payload, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = _retry_delay(attempt)
+                if delay is None:
+                    raise _give_up(t0, attempt, e) from e
+                time.sleep(delay)
+                continue
+            delay = _retry_delay(attempt, resp.status_code, resp.headers.get("Retry-After"))
+            if delay is None:
+                break
+            time.sleep(delay)
+
+    return _finish(t0, attempt, resp.status_code, resp.text, resp.json)
+
+
+# =======================
+# Async client (httpx, per event loop)
+# =======================
+
+_async_clients: Dict[int, Any] = {}
+_async_limiters: Dict[int, asyncio.Semaphore] = {}
+
+def _get_async_client():
+    import httpx  # hanya dibutuhkan jalur async
+
+    loop_id = id(asyncio.get_running_loop())
+    client = _async_clients.get(loop_id)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=GROQ_POOL_SIZE, max_keepalive_connections=GROQ_POOL_SIZE),
+        )
+        _async_clients[loop_id] = client
+        _async_limiters[loop_id] = asyncio.Semaphore(max(1, GROQ_MAX_CONCURRENCY))
+    return client, _async_limiters[loop_id]
+
+async def acall_groq(messages, json_mode=True, timeout=60, temperature=0.2, max_tokens=None):
+    """asyncio variant of `call_groq`: same retry / backoff policy, concurrency bounded per event loop."""
+    import httpx
+
+    url, headers, payload = _build_request(messages, json_mode, temperature, max_tokens)
+    client, limiter = _get_async_client()
+
+    t0 = time.perf_counter()
+    attempt = 0
+    async with limiter:
+        while True:
+            attempt += 1
+            try:
+                resp = await client.post(url, headers=headers, json=payload, timeout=timeout)
+            except httpx.TransportError as e:   # termasuk timeout
+                delay = _retry_delay(attempt)
+                if delay is None:
+                    raise _give_up(t0, attempt, e) from e
+                await asyncio.sleep(delay)
+                continue
+            delay = _retry_delay(attempt, resp.status_code, resp.headers.get("Retry-After"))
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+
+    return _finish(t0, attempt, resp.status_code, resp.text, resp.json)
+
+async def aclose_groq():
+    """Close the async client bound to the current event loop."""
+    loop_id = id(asyncio.get_running_loop())
+    client = _async_clients.pop(loop_id, None)
+    _async_limiters.pop(loop_id, None)
+    if client is not None:
+        await client.aclose()
+
 
-    data = resp.json()
-    return data["choices"][0]["message"]["content"]
+def close_groq():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
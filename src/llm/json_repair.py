@@ -0,0 +1,237 @@
+# src/llm/json_repair.py
+"""Tolerant recovery of JSON objects from LLM output (fences, prose, truncation, trailing commas)."""
+from __future__ import annotations
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.S)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_NUM_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_FRACTION_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)")
+
+RECOVERY_PATHS = ("direct", "extracted", "repaired", "coerced", "repair_prompt", "failed")
+
+
+class RecoveryStats:
+    """Counts which recovery path produced each parsed LLM response."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {p: 0 for p in RECOVERY_PATHS}
+
+    def incr(self, path: str) -> None:
+        with self._lock:
+            self.counts[path] = self.counts.get(path, 0) + 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+_stats = RecoveryStats()
+
+def get_recovery_stats() -> Dict[str, int]:
+    return _stats.snapshot()
+
+def record_recovery(path: str) -> None:
+    _stats.incr(path)
+
+
+# =======================
+# Text-level recovery
+# =======================
+
+def extract_json_object(text: str) -> Optional[str]:
+    """Return the first top-level {...} in `text` (code fences / prefix prose removed). May be unterminated."""
+    if not text:
+        return None
+    m = _FENCE_RE.search(text)
+    if m and "{" in m.group(1):
+        text = m.group(1)
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth, in_str, esc = 0, False, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]   # terpotong (max_tokens) → diperbaiki oleh repair_json
+
+
+def repair_json(text: str) -> str:
+    """Fix trailing commas and close a truncated object (open string, dangling key, missing brackets)."""
+    stack: List[str] = []
+    in_str, esc = False, False
+    for ch in text:
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    out = text
+    if in_str:
+        out += '"'
+    if stack:
+        out = out.rstrip()
+        # buang sisa yang tidak lengkap: koma menggantung atau key tanpa value
+        out = re.sub(r",\s*$", "", out)
+        if re.search(r':\s*$', out):
+            out += " null"
+        elif stack[-1] == "}" and re.search(r'[{,]\s*"[^"]*"\s*$', out):
+            out = re.sub(r',?\s*"[^"]*"\s*$', "", out)
+        out += "".join(reversed(stack))
+    return _TRAILING_COMMA_RE.sub(r"\1", out)
+
+
+# =======================
+# Field coercion
+# =======================
+
+def _to_float(v: Any, scale: float = 1.0) -> Any:
+    """
+    Number from a drifted string ("4", "score: 3.5", "40%", "8/10"). Percentages and fractions
+    are relative, so they are mapped onto `scale` (1 for rates/weights, 5 for 1..5 rubric scores).
+    """
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return float(v)
+    if isinstance(v, str):
+        f = _FRACTION_RE.search(v)
+        if f and float(f.group(2)):
+            return float(f.group(1)) / float(f.group(2)) * scale
+        m = _NUM_RE.search(v)
+        if m:
+            x = float(m.group(0))
+            return x / 100.0 * scale if v.strip().endswith("%") else x
+    return v
+
+def _coerce_evidence(items: Any) -> List[Dict[str, Any]]:
+    if not isinstance(items, list):
+        items = [items] if items else []
+    out = []
+    for it in items:
+        if isinstance(it, str):
+            out.append({"snippet": it})
+        elif isinstance(it, dict):
+            it = dict(it)
+            it["snippet"] = str(it.get("snippet") or it.get("text") or "")
+            out.append(it)
+    return out
+
+def _coerce_dims(dims: Any) -> List[Dict[str, Any]]:
+    if isinstance(dims, dict):   # {"Technical Skills Match": {...}} → list
+        dims = [{"name": k, **(v if isinstance(v, dict) else {"score": v})} for k, v in dims.items()]
+    if not isinstance(dims, list):
+        return []
+    out = []
+    for d in dims:
+        if not isinstance(d, dict):
+            continue
+        d = dict(d)
+        d["score"] = _to_float(d.get("score", 0), scale=5.0)   # skor rubric 1..5, bukan 0..1
+        d["weight"] = _to_float(d.get("weight", 0))
+        if "evidence" in d:
+            d["evidence"] = _coerce_evidence(d["evidence"])
+        out.append(d)
+    return out
+
+def coerce_llm_payload(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize common shape drift in the screening result (string scores, dict dimensions, str risks)."""
+    obj = dict(obj)
+    for section in ("cv", "project"):
+        if section not in obj:
+            continue
+        sec = obj[section]
+        sec = dict(sec) if isinstance(sec, dict) else {}
+        if "dimensions" in sec:
+            sec["dimensions"] = _coerce_dims(sec["dimensions"])
+        if "match_rate" in sec:
+            sec["match_rate"] = _to_float(sec["match_rate"])
+        obj[section] = sec
+    risks = obj.get("risks")
+    if isinstance(risks, str):
+        obj["risks"] = [risks] if risks.strip() else []
+    elif isinstance(risks, list):
+        obj["risks"] = [r if isinstance(r, str) else json.dumps(r, ensure_ascii=False) for r in risks]
+    if "overall_summary" in obj and not isinstance(obj["overall_summary"], str):
+        obj["overall_summary"] = json.dumps(obj["overall_summary"], ensure_ascii=False)
+    return obj
+
+
+# =======================
+# Staged recovery
+# =======================
+
+def recover_model(raw: str, model_cls: Type[M]) -> Tuple[Optional[M], str]:
+    """
+    Try, in order: direct parse → extract JSON object → repair → coerce fields.
+    Dimension fields are always coerced (dict-typed sections are not checked by the model itself).
+    Returns (model or None, path name). Does not call the LLM.
+    """
+    path = "direct"
+    try:
+        data = json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        candidate = extract_json_object(raw or "")
+        if candidate is None:
+            return None, "failed"
+        try:
+            data = json.loads(candidate)
+            path = "extracted"
+        except json.JSONDecodeError:
+            try:
+                data = json.loads(repair_json(candidate))
+                path = "repaired"
+            except json.JSONDecodeError:
+                return None, "failed"
+    if not isinstance(data, dict):
+        return None, "failed"
+
+    fixed = coerce_llm_payload(data)
+    try:
+        obj = model_cls.model_validate(fixed)
+    except ValidationError:
+        return None, "failed"
+    if path == "direct" and fixed != data:
+        path = "coerced"
+    return obj, path
+
+
+def build_repair_messages(broken: str, schema_keys: Dict[str, Any], max_chars: int = 12000) -> List[Dict[str, str]]:
+    """Small 'fix this JSON' prompt: only the broken output + schema, never the evidence payload."""
+    return [
+        {"role": "system", "content": (
+            "You repair malformed JSON. Return ONLY one valid JSON object, no prose. "
+            "Keep all existing content; fix syntax, close truncated structures, "
+            "and make the object match the given schema."
+        )},
+        {"role": "user", "content": json.dumps(
+            {"schema": schema_keys, "broken_json": (broken or "")[:max_chars]}, ensure_ascii=False,
+        )},
+    ]
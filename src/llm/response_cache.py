@@ -0,0 +1,105 @@
+# src/llm/response_cache.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.config import REDIS_URL
+
+LLM_CACHE = os.getenv("LLM_CACHE", "1") == "1"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))   # detik
+LLM_CACHE_LOCAL_SIZE = int(os.getenv("LLM_CACHE_LOCAL_SIZE", "256"))
+LLM_CACHE_PREFIX = "llmcache:"
+
+
+def llm_cache_key(model: str, temperature: float, json_mode: bool, messages: List[Dict[str, str]]) -> str:
+    blob = json.dumps(
+        {"model": model, "temperature": temperature, "json_mode": bool(json_mode), "messages": messages},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return LLM_CACHE_PREFIX + hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-level cache for LLM responses: in-process LRU in front of Redis (with TTL)."""
+    def __init__(self, redis_url: str = REDIS_URL, ttl: int = LLM_CACHE_TTL, local_size: int = LLM_CACHE_LOCAL_SIZE):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.local_size = max(0, local_size)
+        self._local: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_ok = True
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def _get_redis(self):
+        if self._redis is None and self._redis_ok:
+            try:
+                from redis import Redis
+                self._redis = Redis.from_url(self.redis_url)
+            except Exception:
+                self._redis_ok = False
+        return self._redis
+
+    def _local_put(self, key: str, value: str) -> None:
+        if not self.local_size:
+            return
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            val = self._local.get(key)
+            if val is not None:
+                self._local.move_to_end(key)
+                self.local_hits += 1
+                return val
+        r = self._get_redis()
+        if r is not None:
+            try:
+                raw = r.get(key)
+            except Exception:
+                raw = None   # Redis down → cache dianggap miss, evaluasi tetap jalan
+            if raw is not None:
+                val = raw.decode("utf-8") if isinstance(raw, bytes) else str(raw)
+                self._local_put(key, val)
+                self.redis_hits += 1
+                return val
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: str) -> None:
+        self._local_put(key, value)
+        r = self._get_redis()
+        if r is not None:
+            try:
+                r.set(key, value, ex=self.ttl)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.local_hits + self.redis_hits) / total, 4) if total else 0.0,
+            "local_size": len(self._local),
+        }
+
+
+_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,322 @@
+# src/models/embed_service.py
+from __future__ import annotations
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.logs import setup_logging
+
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "8"))
+EMBED_STATS_EVERY = int(os.getenv("EMBED_STATS_EVERY", "50"))  # log stats tiap N batch (0 = off)
+EMBED_REMOTE_RETRY_SEC = float(os.getenv("EMBED_REMOTE_RETRY_SEC", "5"))  # jeda sebelum coba server lagi
+
+LOGGER = setup_logging("embed_service")
+
+_Request = Tuple[List[str], Future]
+
+
+class EmbedService:
+    """
+    Micro-batcher di depan model embedding.
+
+    Evaluasi yang berjalan bersamaan (thread) menitipkan teksnya ke satu antrean;
+    satu thread menggabungkannya menjadi batch dinamis (<= max_batch teks, menunggu
+    paling lama max_wait_ms) lalu membagi hasilnya kembali ke setiap pemanggil.
+    """
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch: int = EMBED_MAX_BATCH,
+        max_wait_ms: float = EMBED_MAX_WAIT_MS,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._q: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._active = 0             # jumlah pemanggil yang sedang menunggu hasil
+        self._active_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # stats
+        self.batches = 0
+        self.texts = 0
+        self.requests = 0
+        self._fill_sum = 0.0
+        self._latency_sum = 0.0
+        self.last_fill = 0.0
+        self.last_latency_ms = 0.0
+
+    # ---------- lifecycle ----------
+    def start(self) -> "EmbedService":
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="embed-service", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is not None:
+            self._q.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_service_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    # ---------- client API ----------
+    def submit(self, texts: List[str]) -> Future:
+        fut: Future = Future()
+        self._q.put((list(texts), fut))
+        return fut
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        with self._active_lock:
+            self._active += 1
+        try:
+            return self.submit(texts).result()
+        finally:
+            with self._active_lock:
+                self._active -= 1
+
+    # ---------- batching loop ----------
+    def _collect(self, first: _Request) -> Tuple[List[_Request], bool]:
+        batch = [first]
+        n = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while n < self.max_batch:
+            # tidak ada pemanggil lain yang mungkin mengirim → jangan menunggu sia-sia
+            if len(batch) >= self._active and self._q.empty():
+                break
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                req = self._q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if req is None:
+                return batch, True
+            batch.append(req)
+            n += len(req[0])
+        return batch, False
+
+    def _loop(self) -> None:
+        stop = False
+        while not stop:
+            first = self._q.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+            texts = [t for req, _ in batch for t in req]
+            t0 = time.perf_counter()
+            try:
+                embs = self.encode_fn(texts) if texts else np.empty((0, 0), dtype=np.float32)
+            except BaseException as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            dt = time.perf_counter() - t0
+            off = 0
+            for req, fut in batch:
+                fut.set_result(embs[off:off + len(req)])
+                off += len(req)
+            self._record(len(batch), len(texts), dt)
+
+    def _record(self, n_requests: int, n_texts: int, dt: float) -> None:
+        fill = min(1.0, n_texts / self.max_batch)
+        self.batches += 1
+        self.requests += n_requests
+        self.texts += n_texts
+        self._fill_sum += fill
+        self._latency_sum += dt
+        self.last_fill = fill
+        self.last_latency_ms = dt * 1000.0
+        if EMBED_STATS_EVERY and self.batches % EMBED_STATS_EVERY == 0:
+            LOGGER.info("[embed_service] %s", self.stats())
+
+    def stats(self) -> Dict[str, float]:
+        b = self.batches or 1
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "texts": self.texts,
+            "max_batch": self.max_batch,
+            "avg_fill_ratio": round(self._fill_sum / b, 4),
+            "avg_batch_latency_ms": round(self._latency_sum / b * 1000.0, 2),
+            "last_fill_ratio": round(self.last_fill, 4),
+            "last_batch_latency_ms": round(self.last_latency_ms, 2),
+        }
+
+
+_service: Optional[EmbedService] = None
+
+def start_embed_service(**kwargs) -> EmbedService:
+    """Start the process-wide batching service (worker startup)."""
+    global _service
+    if _service is None:
+        from src.models.embedder import encode_raw
+        _service = EmbedService(encode_raw, **kwargs)
+    return _service.start()
+
+def get_embed_service() -> Optional[EmbedService]:
+    """Running service, or None (callers then encode directly)."""
+    return _service if _service is not None and _service.running else None
+
+def stop_embed_service() -> None:
+    global _service
+    if _service is not None:
+        _service.stop()
+        _service = None
+
+
+# ---------- pool: satu server batching untuk semua executor ----------
+# Frame: 4 byte panjang (big-endian) + isi. Request JSON {"op": "embed", "texts": [...]} | {"op": "stats"};
+# balasan embed = frame JSON {"shape": [n, dim]} lalu frame float32 mentah, atau {"error": "..."}.
+
+def _send_frame(sock: socket.socket, payload: bytes) -> None:
+    sock.sendall(struct.pack(">I", len(payload)))
+    sock.sendall(payload)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:], n - got)
+        if k == 0:
+            raise ConnectionError("embed server connection closed")
+        got += k
+    return bytes(buf)
+
+
+def _recv_frame(sock: socket.socket) -> bytes:
+    (n,) = struct.unpack(">I", _recv_exact(sock, 4))
+    return _recv_exact(sock, n)
+
+
+class _EmbedHandler(socketserver.BaseRequestHandler):
+    # satu thread per koneksi executor; semuanya menitip ke EmbedService yang sama → batch lintas job
+    def handle(self) -> None:
+        svc: EmbedService = self.server.service
+        while True:
+            try:
+                req = json.loads(_recv_frame(self.request))
+            except (ConnectionError, OSError):
+                return
+            if req.get("op") == "stats":
+                _send_frame(self.request, json.dumps({"stats": svc.stats()}).encode())
+                continue
+            try:
+                embs = np.ascontiguousarray(svc.embed(req.get("texts") or []), dtype=np.float32)
+            except Exception as e:
+                _send_frame(self.request, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode())
+                continue
+            _send_frame(self.request, json.dumps({"shape": list(embs.shape)}).encode())
+            _send_frame(self.request, embs.tobytes())
+
+
+class EmbedServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Unix-socket front of an EmbedService, run by the worker pool in its own process so that
+    concurrent jobs on different executors share model batches.
+    """
+    daemon_threads = True
+
+    def __init__(self, path: str, service: EmbedService):
+        if os.path.exists(path):
+            os.unlink(path)
+        self.service = service
+        super().__init__(path, _EmbedHandler)
+
+
+class EmbedClient:
+    """
+    Executor side of EmbedServer: one connection per thread. `embed` returns None while the
+    server is unreachable (callers then encode locally) and retries after EMBED_REMOTE_RETRY_SEC.
+    """
+    def __init__(self, path: str, retry_sec: float = EMBED_REMOTE_RETRY_SEC):
+        self.path = path
+        self.retry_sec = retry_sec
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _sock(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _drop(self, err: Exception) -> None:
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._down_until = time.time() + self.retry_sec
+        LOGGER.warning("[embed_service] server %s unavailable (%s); encoding locally for %.0fs",
+                       self.path, err, self.retry_sec)
+
+    def _call(self, req: Dict) -> Optional[Tuple[Dict, socket.socket]]:
+        if time.time() < self._down_until:
+            return None
+        try:
+            sock = self._sock()
+            _send_frame(sock, json.dumps(req).encode())
+            return json.loads(_recv_frame(sock)), sock
+        except OSError as e:
+            self._drop(e)
+            return None
+
+    def embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        reply = self._call({"op": "embed", "texts": list(texts)})
+        if reply is None:
+            return None
+        head, sock = reply
+        if "error" in head:
+            raise RuntimeError(f"embed server: {head['error']}")
+        n, dim = head["shape"]
+        try:
+            buf = _recv_frame(sock)
+        except OSError as e:
+            self._drop(e)
+            return None
+        return np.frombuffer(buf, dtype=np.float32).reshape(n, dim)
+
+    def stats(self) -> Optional[Dict[str, float]]:
+        reply = self._call({"op": "stats"})
+        return reply[0].get("stats") if reply is not None else None
+
+
+_client: Optional[EmbedClient] = None
+_client_pid: Optional[int] = None
+
+def connect_embed_server(path: str) -> EmbedClient:
+    """Route this process's embeddings through the pool's EmbedServer at `path` (executor startup)."""
+    global _client, _client_pid
+    _client, _client_pid = EmbedClient(path), os.getpid()
+    return _client
+
+def get_embed_client() -> Optional[EmbedClient]:
+    # koneksi socket tidak dibawa lintas fork
+    return _client if _client is not None and _client_pid == os.getpid() else None
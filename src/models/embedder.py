@@ -1,7 +1,8 @@
 # src/models/embedder.py
-from typing import List
+from typing import Dict, List, Optional
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from src.config import EMBEDDING_MODEL, HF_CACHE_DIR
+from src.config import EMBEDDING_MODEL, HF_CACHE_DIR, EMBED_CACHE
 
 _model = None
 
@@ -15,7 +16,70 @@ def get_model() -> SentenceTransformer:
         )
     return _model
 
-def embed_texts(texts: List[str]):
+def encode_raw(texts: List[str]) -> np.ndarray:
+    """Single model forward over `texts` (float32, normalized). Used directly or by the batching service."""
     m = get_model()
-    embs = m.encode(texts, batch_size=32, normalize_embeddings=True, show_progress_bar=False)
-    return [e.tolist() if hasattr(e, "tolist") else e for e in embs]
+    if not texts:
+        return np.empty((0, m.get_sentence_embedding_dimension()), dtype=np.float32)
+    embs = m.encode(
+        texts, batch_size=32, normalize_embeddings=True,
+        show_progress_bar=False, convert_to_numpy=True,
+    )
+    return np.ascontiguousarray(embs, dtype=np.float32)
+
+def embed_array(texts: List[str], dtype=np.float32) -> np.ndarray:
+    """Normalized embeddings as one C-contiguous (n, dim) matrix (float32, or float16 to halve memory)."""
+    from src.models.embed_service import get_embed_client, get_embed_service
+
+    embs = None
+    client = get_embed_client()
+    if client is not None and texts:
+        embs = client.embed(texts)   # worker pool: digabung dengan job di executor lain
+    if embs is None:
+        svc = get_embed_service()
+        if svc is not None and texts and not svc.in_service_thread():
+            embs = svc.embed(texts)   # digabung dengan request evaluasi lain yang bersamaan
+        else:
+            embs = encode_raw(texts)
+    return np.ascontiguousarray(embs, dtype=dtype)
+
+def embed_texts(texts: List[str]):
+    """List-of-lists variant (legacy callers / JSON boundaries)."""
+    return embed_array(texts).tolist()
+
+def embed_chunks(
+    texts: List[str], dtype=np.float32, ttl: Optional[int] = None, counts: Optional[Dict[str, int]] = None,
+) -> np.ndarray:
+    """
+    embed_array with the content-addressed cache: only cache misses hit the model.
+    `ttl` (seconds) expires new entries (candidate uploads); 0 = read the cache but store nothing.
+    `counts`, if given, gets "embedded" (texts sent to the model) and "cached" added to it.
+    """
+    if not EMBED_CACHE or not texts:
+        if counts is not None:
+            counts["embedded"] = counts.get("embedded", 0) + len(texts)
+        return embed_array(texts, dtype=dtype)
+    from src.models.embedding_cache import get_embedding_cache, chunk_key
+
+    cache = get_embedding_cache()
+    keys = [chunk_key(EMBEDDING_MODEL, t) for t in texts]
+    found = cache.get_many(keys)
+    miss_idx = [i for i, k in enumerate(keys) if k not in found]
+    if miss_idx:
+        # teks identik dalam satu batch cukup di-embed sekali
+        first = {}
+        for i in miss_idx:
+            first.setdefault(keys[i], texts[i])
+        todo = list(first)
+        new = embed_array([first[k] for k in todo])
+        fresh = {k: new[j] for j, k in enumerate(todo)}
+        if ttl is None or ttl > 0:
+            cache.put_many(fresh, ttl=ttl)
+        found.update(fresh)
+    if counts is not None:
+        counts["embedded"] = counts.get("embedded", 0) + (len(todo) if miss_idx else 0)
+        counts["cached"] = counts.get("cached", 0) + len(keys) - len(miss_idx)
+    out = np.empty((len(keys), found[keys[0]].shape[-1]), dtype=dtype)
+    for i, k in enumerate(keys):
+        out[i] = found[k]
+    return out
@@ -0,0 +1,184 @@
+# src/models/embedding_cache.py
+from __future__ import annotations
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.config import EMBED_CACHE_PATH, EMBED_CACHE_MAX_MB, EMBED_CACHE_TOUCH_SEC
+
+
+def normalize_chunk(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def chunk_key(model_name: str, text: str) -> str:
+    """Content address: sha256(model name + normalized chunk text)."""
+    h = hashlib.sha256()
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(normalize_chunk(text).encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache on SQLite (WAL + mmap), shared by every worker process on the host.
+    Bounded by total vector bytes; eviction drops least-recently-used rows.
+
+    The byte total lives in `emb_meta` and is kept exact by triggers (across processes), so a
+    put reads one row instead of SUM(nbytes). `last_used` is only rewritten when it is older than
+    `touch_sec`, so hot reads stay read-only. Rows may carry `expires` (candidate uploads).
+    """
+    def __init__(
+        self,
+        path: str = EMBED_CACHE_PATH,
+        max_bytes: int = EMBED_CACHE_MAX_MB * 1024 * 1024,
+        touch_sec: float = EMBED_CACHE_TOUCH_SEC,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_sec = touch_sec
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={max(self.max_bytes * 2, 64 * 1024 * 1024)}")
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS emb ("
+                " key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vec BLOB NOT NULL,"
+                " nbytes INTEGER NOT NULL, last_used REAL NOT NULL, expires REAL)"
+            )
+            cols = {r[1] for r in self._conn.execute("PRAGMA table_info(emb)")}
+            if "expires" not in cols:
+                self._conn.execute("ALTER TABLE emb ADD COLUMN expires REAL")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS emb_last_used ON emb(last_used)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS emb_expires ON emb(expires) WHERE expires IS NOT NULL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS emb_meta (k TEXT PRIMARY KEY, v INTEGER NOT NULL)")
+            if self._conn.execute("SELECT 1 FROM emb_meta WHERE k='bytes'").fetchone() is None:
+                # sekali saja (cache lama / baru): hitung total awal, setelah itu dijaga trigger
+                self._conn.execute("INSERT INTO emb_meta(k, v) SELECT 'bytes', COALESCE(SUM(nbytes), 0) FROM emb")
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS emb_bytes_ins AFTER INSERT ON emb BEGIN"
+                " UPDATE emb_meta SET v = v + NEW.nbytes WHERE k='bytes'; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS emb_bytes_del AFTER DELETE ON emb BEGIN"
+                " UPDATE emb_meta SET v = v - OLD.nbytes WHERE k='bytes'; END"
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        uniq = list(dict.fromkeys(keys))
+        if not uniq:
+            return found
+        now = time.time()
+        stale: List[str] = []
+        with self._lock:
+            # SQLite membatasi jumlah parameter per query
+            for i in range(0, len(uniq), 500):
+                part = uniq[i:i + 500]
+                marks = ",".join("?" * len(part))
+                for key, dim, blob, last_used, expires in self._conn.execute(
+                    f"SELECT key, dim, vec, last_used, expires FROM emb WHERE key IN ({marks})", part
+                ):
+                    if expires is not None and expires <= now:
+                        continue            # dihapus oleh purge berikutnya
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+                    if last_used < now - self.touch_sec:
+                        stale.append(key)
+            if stale:
+                self._conn.executemany("UPDATE emb SET last_used=? WHERE key=?", [(now, k) for k in stale])
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += sum(1 for k in keys if k not in found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray], ttl: Optional[float] = None) -> None:
+        """Store vectors; `ttl` (seconds) makes them expire, None keeps them until evicted."""
+        if not items:
+            return
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        rows = []
+        for key, vec in items.items():
+            arr = np.ascontiguousarray(vec, dtype=np.float32)
+            rows.append((key, int(arr.shape[-1]), arr.tobytes(), arr.nbytes, now, expires))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # key = isi chunk, jadi vektor yang sudah ada tidak ditulis ulang; umur terpanjang menang
+                self._conn.executemany(
+                    "INSERT INTO emb(key, dim, vec, nbytes, last_used, expires) VALUES (?,?,?,?,?,?)"
+                    " ON CONFLICT(key) DO UPDATE SET last_used=excluded.last_used,"
+                    " expires=CASE WHEN emb.expires IS NULL OR excluded.expires IS NULL THEN NULL"
+                    " ELSE max(emb.expires, excluded.expires) END",
+                    rows,
+                )
+                self._conn.execute("DELETE FROM emb WHERE expires IS NOT NULL AND expires <= ?", (now,))
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _total_bytes(self) -> int:
+        row = self._conn.execute("SELECT v FROM emb_meta WHERE k='bytes'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _evict(self) -> None:
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        # buang LRU sampai ~90% kapasitas supaya tidak evict di setiap put
+        target = int(self.max_bytes * 0.9)
+        freed = 0
+        drop: List[str] = []
+        for key, nbytes in self._conn.execute("SELECT key, nbytes FROM emb ORDER BY last_used ASC"):
+            drop.append(key)
+            freed += nbytes
+            if total - freed <= target:
+                break
+        self._conn.executemany("DELETE FROM emb WHERE key=?", [(k,) for k in drop])
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM emb").fetchone()[0]
+            total = self._total_bytes()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": rows,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_pid: Optional[int] = None
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _cache, _cache_pid
+    # koneksi SQLite tidak boleh dibawa lintas fork
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = EmbeddingCache()
+        _cache_pid = os.getpid()
+    return _cache
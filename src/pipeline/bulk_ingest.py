@@ -0,0 +1,298 @@
+# src/pipeline/bulk_ingest.py
+"""
+Bulk JD/rubric ingest for many jobs at once.
+
+    <root>/<job_id>/jd.pdf
+    <root>/<job_id>/rubric_cv.docx        → rubric_cv
+    <root>/<job_id>/rubric_project.pdf    → rubric_project
+    <root>/<job_id>/rubric.pdf            → skipped (section is ambiguous; rename it)
+
+Only rubric files and JD-named files (BULK_JD_NAMES, e.g. jd.pdf, job_description.docx) are
+ingested; anything else in the tree (CVs, notes, ...) is skipped and logged.
+
+Files are hashed and checked against Qdrant in the main process (the only one holding the
+embedded-Qdrant lock), parsed + chunked in a process pool, embedded in large batches and
+upserted in sized batches. Finished files are recorded in a JSON checkpoint so an interrupted
+run resumes where it stopped.
+"""
+from __future__ import annotations
+import glob
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.config import PROJECT_ROOT, COLL_JOBS_CORPUS
+from src.io.doc_cache import file_sha256
+from src.models.embedder import embed_chunks
+from src.models.embedding_cache import normalize_chunk
+from src.pipeline.ingest import current_file_points, file_where, ingest_signature, plan_file_points
+from src.pipeline.parse import init_parse_worker, parse_task
+from src.retrieval.context_cache import invalidate_job_context
+from src.storage.qdrant_store import add_documents, delete_points
+from src.utils.logs import setup_logging
+
+BULK_EMBED_BATCH = int(os.getenv("BULK_EMBED_BATCH", "256"))
+BULK_UPSERT_BATCH = int(os.getenv("BULK_UPSERT_BATCH", "512"))
+BULK_PARSE_WORKERS = int(os.getenv("BULK_PARSE_WORKERS", str(os.cpu_count() or 2)))
+CHECKPOINT_DIR = os.getenv("INGEST_CHECKPOINT_DIR", str(PROJECT_ROOT / "data" / "ingest_checkpoints"))
+SUPPORTED_EXTS = (".pdf", ".docx", ".txt", ".md")
+# nama file (tanpa ekstensi) yang dianggap JD; file lain yang bukan rubric dilewati
+BULK_JD_NAMES = re.compile(
+    os.getenv("BULK_JD_NAMES", r"(jd|job[ _-]?desc(ription)?|deskripsi[ _-]?pekerjaan|lowongan)([ _.-].*)?"),
+    re.IGNORECASE,
+)
+
+LOGGER = setup_logging("bulk_ingest")
+
+
+# =======================
+# Discovery
+# =======================
+
+def _classify(path: str, section: Optional[str], auto_section: bool) -> Optional[List[Dict[str, Any]]]:
+    """
+    Infer (source_type, section) from the file name.
+    Returns [] for files that are neither a rubric nor JD-named (BULK_JD_NAMES), and None for a
+    generic rubric whose section can't be told from the name.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0].lower()
+    if "rubric" in stem or "rubrik" in stem:
+        if "cv" in stem:
+            sec = "rubric_cv"
+        elif "project" in stem or "proyek" in stem:
+            sec = "rubric_project"
+        else:
+            # satu file tidak boleh masuk dua section (skor CV & project jadi tercampur)
+            return None
+        return [{"source_type": "rubric", "section": sec, "auto_section": False}]
+    if not BULK_JD_NAMES.fullmatch(stem):
+        return []
+    if auto_section:
+        return [{"source_type": "jd", "section": None, "auto_section": True}]
+    return [{"source_type": "jd", "section": section or "overview", "auto_section": False}]
+
+
+def discover_tasks(
+    patterns: Iterable[str],
+    job_id: Optional[str] = None,
+    section: Optional[str] = None,
+    auto_section: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Expand directories / globs into ingest tasks. job_id = parent directory name
+    unless `job_id` is given (all files then belong to that job).
+    """
+    paths: List[str] = []
+    for pat in patterns:
+        if os.path.isdir(pat):
+            pat = os.path.join(pat, "**", "*")
+        paths.extend(p for p in glob.glob(pat, recursive=True) if os.path.isfile(p))
+    tasks = []
+    skipped: List[str] = []
+    for p in sorted(dict.fromkeys(os.path.abspath(p) for p in paths)):
+        classes = _classify(p, section, auto_section) if os.path.splitext(p)[1].lower() in SUPPORTED_EXTS else []
+        if classes is None:
+            LOGGER.warning("bulk ingest: skipped %s: rubric section is ambiguous, rename it rubric_cv.* or rubric_project.*", p)
+            continue
+        if not classes:
+            skipped.append(p)
+            continue
+        jid = job_id or os.path.basename(os.path.dirname(p))
+        for cls in classes:
+            tasks.append({"path": p, "job_id": jid, **cls})
+    if skipped:
+        LOGGER.warning("bulk ingest: skipped %d file(s) that are not a JD/rubric (by name/extension): %s",
+                       len(skipped), ", ".join(skipped[:20]) + (" ..." if len(skipped) > 20 else ""))
+    return tasks
+
+
+def task_key(task: Dict[str, Any]) -> str:
+    sec = "auto" if task["auto_section"] else (task["section"] or "")
+    return f"{task['job_id']}|{task['source_type']}|{sec}|{task['path']}"
+
+
+# =======================
+# Checkpoint
+# =======================
+
+class IngestCheckpoint:
+    """Finished tasks (key → file size/mtime + signature), persisted atomically as JSON."""
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.done = json.load(f).get("done", {})
+
+    @staticmethod
+    def _stat(path: str) -> Dict[str, int]:
+        st = os.stat(path)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def is_done(self, task: Dict[str, Any], mask_pii: bool) -> bool:
+        entry = self.done.get(task_key(task))
+        if entry is None or entry.get("mask_pii") != mask_pii:
+            return False
+        try:
+            return {k: entry.get(k) for k in ("size", "mtime_ns")} == self._stat(task["path"])
+        except FileNotFoundError:
+            return False
+
+    def mark(self, task: Dict[str, Any], sig: str, mask_pii: bool) -> None:
+        self.done[task_key(task)] = {**self._stat(task["path"]), "sig": sig, "mask_pii": mask_pii}
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"done": self.done}, f)
+        os.replace(tmp, self.path)
+
+
+def default_checkpoint_path(name: str) -> str:
+    return os.path.join(CHECKPOINT_DIR, f"{name}.json")
+
+
+# =======================
+# Bulk run
+# =======================
+
+def bulk_ingest(
+    tasks: List[Dict[str, Any]],
+    *,
+    collection_name: str = COLL_JOBS_CORPUS,
+    mask_pii: bool = True,
+    checkpoint: Optional[IngestCheckpoint] = None,
+    embed_batch: int = BULK_EMBED_BATCH,
+    upsert_batch: int = BULK_UPSERT_BATCH,
+    workers: int = BULK_PARSE_WORKERS,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Ingest `tasks` (from `discover_tasks`) incrementally. Returns counts + throughput:
+    {"files", "files_skipped", "chunks", "skipped", "updated", "removed", "embedded" (model calls,
+     cache misses only), "cached", "jobs_changed", "seconds", "files_per_sec", "chunks_per_sec", "embedded_per_sec"}
+    """
+    t0 = time.perf_counter()
+    stats = {"files": 0, "files_done": 0, "files_skipped": 0, "chunks": 0, "skipped": 0, "updated": 0, "removed": 0, "embedded": 0, "cached": 0}
+    changed_jobs = set()
+
+    pending: List[Dict[str, Any]] = []     # points waiting for an embedding
+    ready: List[Dict[str, Any]] = []       # points with a vector, waiting for upsert
+    open_files: Dict[str, Dict[str, Any]] = {}   # task key → {"task", "sig", "left", "stale"}
+
+    def _done(task: Dict[str, Any], sig: Optional[str]) -> None:
+        stats["files_done"] += 1
+        if checkpoint is not None and sig is not None:
+            checkpoint.mark(task, sig, mask_pii)
+        if progress is not None:
+            progress(stats)
+
+    def _finish(key: str) -> None:
+        st = open_files.pop(key)
+        stats["removed"] += delete_points(collection_name, st["stale"])
+        _done(st["task"], st["sig"])
+
+    def _flush_upserts(force: bool = False) -> None:
+        while ready and (force or len(ready) >= upsert_batch):
+            batch, ready[:] = ready[:upsert_batch], ready[upsert_batch:]
+            add_documents(
+                collection_name,
+                [p["doc"] for p in batch], [p["meta"] for p in batch],
+                ids=[p["id"] for p in batch],
+                embeddings=np.vstack([p["vec"] for p in batch]),
+            )
+            for p in batch:
+                st = open_files[p["key"]]
+                st["left"] -= 1
+                if st["left"] == 0:
+                    _finish(p["key"])
+        if force and checkpoint is not None:
+            checkpoint.save()
+
+    def _flush_embeds(force: bool = False) -> None:
+        while pending and (force or len(pending) >= embed_batch):
+            batch, pending[:] = pending[:embed_batch], pending[embed_batch:]
+            # hanya miss cache yang dihitung "embedded"
+            embs = embed_chunks([p["doc"] for p in batch], counts=stats)
+            for p, v in zip(batch, embs):
+                p["vec"] = v
+                ready.append(p)
+            _flush_upserts()
+            if checkpoint is not None:
+                checkpoint.save()
+
+    def _queue_plan(task: Dict[str, Any], sig: str, plan: Dict[str, Any]) -> None:
+        key = task_key(task)
+        stats["chunks"] += len(plan["ids"])
+        stats["skipped"] += len(plan["ids"]) - len(plan["docs"])
+        stats["updated"] += len(plan["docs"])
+        if plan["docs"] or plan["stale"]:
+            changed_jobs.add(task["job_id"])
+        open_files[key] = {"task": task, "sig": sig, "left": len(plan["docs"]), "stale": plan["stale"]}
+        reuse = plan["reuse"]
+        for doc, meta, pid in zip(plan["docs"], plan["metas"], plan["write_ids"]):
+            item = {"key": key, "doc": doc, "meta": meta, "id": pid}
+            vec = reuse.get(normalize_chunk(doc))
+            if vec is not None:
+                item["vec"] = np.asarray(vec, dtype=np.float32)
+                ready.append(item)
+            else:
+                pending.append(item)
+        if not plan["docs"]:
+            _finish(key)
+        _flush_embeds()
+        _flush_upserts()
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=ctx, initializer=init_parse_worker) as pool:
+        futs = {}
+        for task in tasks:
+            stats["files"] += 1
+            if checkpoint is not None and checkpoint.is_done(task, mask_pii):
+                stats["files_skipped"] += 1
+                _done(task, None)
+                continue
+            sha = file_sha256(task["path"])
+            sig = ingest_signature(sha, mask_pii, auto_section=task["auto_section"])
+            where = file_where(task["job_id"], task["source_type"], task["path"], task["section"])
+            existing, current = current_file_points(collection_name, where, sig)
+            if current is not None:
+                stats["files_skipped"] += 1
+                stats["chunks"] += len(current)
+                stats["skipped"] += len(current)
+                _done(task, sig)
+                continue
+            fut = pool.submit(parse_task, task, sha, mask_pii)
+            futs[fut] = (task, sha, sig, where, bool(existing))
+
+        for fut in as_completed(futs):
+            task, sha, sig, where, had_points = futs[fut]
+            plan = plan_file_points(
+                collection_name, task["path"], task["job_id"], task["source_type"],
+                where, sha, sig, fut.result(), had_points=had_points,
+            )
+            _queue_plan(task, sig, plan)
+
+    _flush_embeds(force=True)
+    _flush_upserts(force=True)
+    if checkpoint is not None:
+        checkpoint.save()
+    for jid in changed_jobs:
+        invalidate_job_context(jid, collection_name)
+
+    secs = time.perf_counter() - t0
+    return {
+        **stats,
+        "jobs_changed": sorted(changed_jobs),
+        "seconds": round(secs, 2),
+        "files_per_sec": round(stats["files"] / secs, 2) if secs else 0.0,
+        "chunks_per_sec": round(stats["chunks"] / secs, 2) if secs else 0.0,
+        "embedded_per_sec": round(stats["embedded"] / secs, 2) if secs else 0.0,
+    }
@@ -1,10 +1,9 @@
-import hashlib
 import os
 import time
 import uuid
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
+import numpy as np
 from tqdm import tqdm
-from src.processing.chunker import chunk_by_words, split_by_headings
 
 
 from src.config import (
@@ -12,17 +11,13 @@ from src.config import (
     CHUNK_WORDS,
     CHUNK_OVERLAP_WORDS,
 )
-from src.io.loaders import load_text_from_file
-from src.processing.normalizer import normalize_text
-from src.models.embedder import embed_texts
-from src.storage.qdrant_store import add_documents
-
-def file_sha256(path: str) -> str:
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
-    return h.hexdigest()
+from src.io.loaders import LOADER_VERSION
+from src.pipeline.parse import file_sections
+from src.io.doc_cache import file_sha256
+from src.models.embedder import embed_chunks
+from src.models.embedding_cache import normalize_chunk
+from src.storage.qdrant_store import add_documents, scroll_points, delete_points
+from src.retrieval.context_cache import invalidate_job_context
 
 def build_metadatas(
     job_id: str,
@@ -49,6 +44,148 @@ def build_metadatas(
         mds.append(md)
     return mds
 
+def chunk_point_id(
+    job_id: str, source_type: str, section: Optional[str], sha256: str, chunk_idx: int, auto_section: bool = False,
+) -> str:
+    """Deterministic point id: re-ingesting the same file overwrites instead of duplicating."""
+    mode = "|auto" if auto_section else ""     # section hasil auto-split tidak bentrok dengan section manual
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{job_id}|{source_type}|{section or ''}|{sha256}|{chunk_idx}{mode}"))
+
+def ingest_signature(sha: str, mask_pii: bool, auto_section: bool = False) -> str:
+    """Everything that changes the stored chunks of a file: content, loader, chunking, PII masking."""
+    sig = f"{sha}|v{LOADER_VERSION}|{CHUNK_WORDS}/{CHUNK_OVERLAP_WORDS}|pii={int(mask_pii)}"
+    return sig + "|auto" if auto_section else sig
+
+def _is_auto_sig(sig: Optional[str]) -> bool:
+    return str(sig or "").endswith("|auto")
+
+def file_where(job_id: str, source_type: str, file_path: str, section: Optional[str] = None) -> Dict:
+    """
+    Payload filter selecting the points of one ingested file (`section` narrows it to one
+    explicit section). Explicit-section and auto-section points of the same file share this
+    filter; `_owned_points` separates them by the mode recorded in `ingest_sig`.
+    """
+    where = {"job_id": job_id, "source_type": source_type, "filename": os.path.basename(file_path)}
+    if section:
+        where["section"] = section
+    return where
+
+def _owned_points(points: list, sig: str) -> list:
+    """Keep the points written by the same section mode as `sig` (auto vs explicit), so one mode never deletes the other's."""
+    auto = _is_auto_sig(sig)
+    return [p for p in points if _is_auto_sig((p.payload or {}).get("ingest_sig")) == auto]
+
+def current_file_points(collection_name: str, where: Dict, sig: str) -> Tuple[list, Optional[List[str]]]:
+    """(existing points, their ids if the file is already ingested with signature `sig` else None)."""
+    existing = _owned_points(scroll_points(collection_name, where, with_payload=["ingest_sig", "file_chunks"]), sig)
+    if existing and all(
+        (p.payload or {}).get("ingest_sig") == sig and (p.payload or {}).get("file_chunks") == len(existing)
+        for p in existing
+    ):
+        return existing, [str(p.id) for p in existing]
+    return existing, None
+
+def plan_file_points(
+    collection_name: str,
+    file_path: str,
+    job_id: str,
+    source_type: str,
+    where: Dict,
+    sha: str,
+    sig: str,
+    sections: List[Tuple[Optional[str], List[str]]],
+    had_points: bool,
+) -> Dict:
+    """
+    Diff the new chunks of a file against its stored points.
+    Returns {"ids", "docs", "metas", "write_ids", "reuse", "stale"}: only docs/metas/write_ids
+    need writing; `reuse` maps normalized chunk text → stored vector (unchanged text is not re-embedded).
+    """
+    n_total = sum(len(chunks) for _, chunks in sections)
+
+    # vektor lama dipakai ulang untuk chunk yang teksnya tidak berubah
+    old = {str(p.id): p for p in _owned_points(scroll_points(collection_name, where, with_vectors=True), sig)} if had_points else {}
+    reuse = {
+        normalize_chunk((p.payload or {}).get("document") or ""): p.vector
+        for p in old.values() if p.vector is not None
+    }
+
+    ids: List[str] = []
+    docs: List[str] = []
+    metas: List[Dict] = []
+    write_ids: List[str] = []
+    for section, chunks in sections:
+        mds = build_metadatas(
+            job_id=job_id,
+            source_type=source_type,
+            filename=file_path,
+            section=section,
+            chunk_count=len(chunks),
+            extra={"sha256": sha, "lang": "en", "ingest_sig": sig, "file_chunks": n_total},  # JD kamu english; ubah kalau perlu
+        )
+        for i, (ch, md) in enumerate(zip(chunks, mds)):
+            pid = chunk_point_id(job_id, source_type, section, sha, i, auto_section=_is_auto_sig(sig))
+            ids.append(pid)
+            prev = (old[pid].payload or {}) if pid in old else None
+            if prev is not None and prev.get("document") == ch and all(
+                prev.get(k) == md[k] for k in ("ingest_sig", "file_chunks")
+            ):
+                continue
+            docs.append(ch)
+            metas.append(md)
+            write_ids.append(pid)
+
+    keep = set(ids)
+    return {
+        "ids": ids,
+        "docs": docs,
+        "metas": metas,
+        "write_ids": write_ids,
+        "reuse": reuse,
+        "stale": [pid for pid in old if pid not in keep],
+    }
+
+def _sync_file(
+    collection_name: str,
+    file_path: str,
+    job_id: str,
+    source_type: str,
+    where: Dict,
+    sha: str,
+    sig: str,
+    make_sections: Callable[[], List[Tuple[Optional[str], List[str]]]],
+) -> Dict:
+    """
+    Make the points stored for one file (selected by `where`) match its current chunks:
+    skip the file when its signature is unchanged, reuse vectors of unchanged chunk texts,
+    upsert new/changed chunks and delete stale points.
+    """
+    existing, current = current_file_points(collection_name, where, sig)
+    if current is not None:
+        return {"chunks": len(current), "ids": current, "skipped": len(current), "updated": 0, "removed": 0, "embedded": 0}
+
+    plan = plan_file_points(collection_name, file_path, job_id, source_type, where, sha, sig,
+                            make_sections(), had_points=bool(existing))
+    docs, reuse = plan["docs"], plan["reuse"]
+    embedded = 0
+    if docs:
+        missing = list(dict.fromkeys(d for d in docs if normalize_chunk(d) not in reuse))
+        if missing:
+            reuse.update(zip((normalize_chunk(d) for d in missing), embed_chunks(missing)))
+            embedded = len(missing)
+        embs = np.vstack([np.asarray(reuse[normalize_chunk(d)], dtype=np.float32) for d in docs])
+        add_documents(collection_name, docs, plan["metas"], ids=plan["write_ids"], embeddings=embs)
+
+    removed = delete_points(collection_name, plan["stale"])
+    return {
+        "chunks": len(plan["ids"]),
+        "ids": plan["ids"],
+        "skipped": len(plan["ids"]) - len(docs),
+        "updated": len(docs),
+        "removed": removed,
+        "embedded": embedded,
+    }
+
 def ingest_single_file(
     file_path: str,
     job_id: str,
@@ -56,38 +193,21 @@ def ingest_single_file(
     section: Optional[str] = None,  # e.g., "overview", "about_the_job", or "rubric_cv"
     collection_name: str = COLL_JOBS_CORPUS,
     mask_pii: bool = True,
-) -> Tuple[int, List[str]]:
+) -> Dict:
     """
-    Returns: (n_chunks, ids)
+    Incremental, idempotent ingest of one file.
+    Returns: {"chunks", "ids", "skipped", "updated", "removed", "embedded"}
     """
-    raw = load_text_from_file(file_path)
-    norm = normalize_text(raw, mask_pii_flag=mask_pii)
-
-    # chunking
-    chunks = chunk_by_words(norm, CHUNK_WORDS, CHUNK_OVERLAP_WORDS)
-    if not chunks:
-        return 0, []
-
-    # embeddings
-    embs = embed_texts(chunks)
-
-    # ids
-    ids = [str(uuid.uuid4()) for _ in range(len(chunks))]
-
-    # metadatas
     sha = file_sha256(file_path)
-    metas = build_metadatas(
-        job_id=job_id,
-        source_type=source_type,
-        filename=file_path,
-        section=section,
-        chunk_count=len(chunks),
-        extra={"sha256": sha, "lang": "en"},  # JD kamu english; ubah kalau perlu
+    res = _sync_file(
+        collection_name, file_path, job_id, source_type,
+        file_where(job_id, source_type, file_path, section), sha, ingest_signature(sha, mask_pii),
+        lambda: file_sections(file_path, sha, mask_pii, section=section),
     )
-
-    # write to chroma
-    add_documents(collection_name, chunks, metas, ids=ids, embeddings=embs)
-    return len(chunks), ids
+    if res["updated"] or res["removed"]:
+        # konteks JD/rubric yang di-cache untuk job ini sudah basi
+        invalidate_job_context(job_id, collection_name)
+    return res
 
 
 def ingest_jd_auto_sections(
@@ -95,33 +215,22 @@ def ingest_jd_auto_sections(
     job_id: str,
     collection_name: str = COLL_JOBS_CORPUS,
     mask_pii: bool = True,
-):
-    raw = load_text_from_file(file_path)
-    norm = normalize_text(raw, mask_pii_flag=mask_pii)
-
-    sections = split_by_headings(norm)  # -> [(section_key, text), ...]
-    total, all_ids = 0, []
+) -> Dict:
     sha = file_sha256(file_path)
+    res = _sync_file(
+        collection_name, file_path, job_id, "jd",
+        file_where(job_id, "jd", file_path), sha, ingest_signature(sha, mask_pii, auto_section=True),
+        lambda: file_sections(file_path, sha, mask_pii, auto_section=True),
+    )
+    if res["updated"] or res["removed"]:
+        invalidate_job_context(job_id, collection_name)
+    return res
 
-    for section_key, sec_text in sections:
-        chunks = chunk_by_words(sec_text, CHUNK_WORDS, CHUNK_OVERLAP_WORDS)
-        if not chunks:
-            continue
-        embs = embed_texts(chunks)
-        ids = [str(uuid.uuid4()) for _ in range(len(chunks))]
-        metas = build_metadatas(
-            job_id=job_id,
-            source_type="jd",
-            filename=file_path,
-            section=section_key,
-            chunk_count=len(chunks),
-            extra={"sha256": sha, "lang": "en"},
-        )
-        add_documents(collection_name, chunks, metas, ids=ids, embeddings=embs)
-        total += len(chunks)
-        all_ids.extend(ids)
-
-    return total, all_ids
+def merge_ingest_counts(total: Dict, res: Dict) -> Dict:
+    for k in ("chunks", "skipped", "updated", "removed", "embedded"):
+        total[k] = total.get(k, 0) + res.get(k, 0)
+    total.setdefault("ids", []).extend(res.get("ids", []))
+    return total
 
 def ingest_batch(
     paths: List[str],
@@ -131,10 +240,9 @@ def ingest_batch(
     collection_name: str = COLL_JOBS_CORPUS,
     mask_pii: bool = True,
 ):
-    total_chunks = 0
-    all_ids: List[str] = []
+    total = {"chunks": 0, "ids": [], "skipped": 0, "updated": 0, "removed": 0, "embedded": 0}
     for p in tqdm(paths, desc=f"Ingest {source_type}/{section or ''}"):
-        n, ids = ingest_single_file(
+        res = ingest_single_file(
             file_path=p,
             job_id=job_id,
             source_type=source_type,
@@ -142,6 +250,5 @@ def ingest_batch(
             collection_name=collection_name,
             mask_pii=mask_pii,
         )
-        total_chunks += n
-        all_ids.extend(ids)
-    return {"chunks": total_chunks, "ids": all_ids, "collection": collection_name}
+        merge_ingest_counts(total, res)
+    return {**total, "collection": collection_name}
@@ -0,0 +1,39 @@
+# src/pipeline/parse.py
+"""
+CPU side of ingest (load → normalize → chunk), kept free of model/Qdrant imports
+so spawned parse processes start fast.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import CHUNK_WORDS, CHUNK_OVERLAP_WORDS
+from src.io.loaders import iter_normalized_pages
+from src.processing.chunker import chunk_by_words, iter_chunks_by_words, split_by_headings
+
+
+def file_sections(
+    file_path: str,
+    sha: str,
+    mask_pii: bool,
+    section: Optional[str] = None,
+    auto_section: bool = False,
+) -> List[Tuple[Optional[str], List[str]]]:
+    """Parse + normalize + chunk one file → [(section, chunks)]. Pure CPU/IO, no Qdrant access."""
+    pages = iter_normalized_pages(file_path, mask_pii_flag=mask_pii, sha256=sha)
+    if not auto_section:
+        # halaman di-stream ke chunker (ekstraksi PDF besar jalan paralel di belakang)
+        return [(section, list(iter_chunks_by_words(pages, CHUNK_WORDS, CHUNK_OVERLAP_WORDS)))]
+    norm = "\n".join(pages)
+    return [
+        (section_key, chunk_by_words(sec_text, CHUNK_WORDS, CHUNK_OVERLAP_WORDS))
+        for section_key, sec_text in split_by_headings(norm)  # -> [(section_key, text), ...]
+    ]
+
+
+def init_parse_worker() -> None:
+    """Pool initializer: files are parsed in parallel already, so no nested PDF page pool."""
+    import src.io.loaders as loaders
+    loaders.PDF_WORKERS = 1
+
+
+def parse_task(task: Dict[str, Any], sha: str, mask_pii: bool) -> List[Tuple[Optional[str], List[str]]]:
+    return file_sections(task["path"], sha, mask_pii, section=task["section"], auto_section=task["auto_section"])
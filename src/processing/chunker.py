@@ -1,5 +1,5 @@
 import re
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Tuple
 
 def chunk_by_words(text: str, chunk_words: int, overlap_words: int) -> List[str]:
     words = text.split()
@@ -14,6 +14,23 @@ def chunk_by_words(text: str, chunk_words: int, overlap_words: int) -> List[str]
         i += step
     return chunks
 
+def iter_chunks_by_words(texts: Iterable[str], chunk_words: int, overlap_words: int) -> Iterator[str]:
+    """
+    Incremental `chunk_by_words` over a stream of text pieces (e.g. PDF pages).
+    Yields exactly the chunks `chunk_by_words(" ".join(texts), ...)` would return.
+    """
+    step = max(1, chunk_words - overlap_words)
+    buf: List[str] = []
+    for text in texts:
+        buf.extend(text.split())
+        while len(buf) >= chunk_words:
+            yield " ".join(buf[:chunk_words])
+            buf = buf[step:]
+    i = 0
+    while i < len(buf):
+        yield " ".join(buf[i:i+chunk_words])
+        i += step
+
 _HEADING_PATTERNS = [
     r"about the job",
     r"about you",
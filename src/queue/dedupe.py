@@ -0,0 +1,138 @@
+# src/queue/dedupe.py
+"""
+Request coalescing for identical evaluations.
+
+    dedupe:<fingerprint>  →  task id (TTL = RESULT_TTL) | "pending:<token>" while the owner enqueues
+
+fingerprint = sha256(tenant, job_id, CV / project content hashes, model + pipeline config,
+corpus version of the job — bumped by every ingest, see src.storage.corpus_version).
+The first request claims the key with SET NX (single flight); duplicates arriving while it is
+queued, running or finished attach to that task instead of enqueuing a second one. Failed or
+expired tasks are replaced atomically, so a retry after a failure runs again.
+"""
+import hashlib
+import os
+import time
+import uuid
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from rq.job import Job
+
+from src.config import COLL_JOBS_CORPUS, EMBEDDING_MODEL, CHUNK_WORDS, CHUNK_OVERLAP_WORDS
+from src.io.doc_cache import file_sha256
+from src.io.loaders import LOADER_VERSION
+from src.llm.groq_client import GROQ_MODEL
+from src.queue.results import RESULT_TTL, result_key
+from src.storage.corpus_version import corpus_version
+
+EVAL_DEDUPE = os.getenv("EVAL_DEDUPE", "1") == "1"
+DEDUPE_LOCK_MS = int(os.getenv("DEDUPE_LOCK_MS", "30000"))     # umur klaim "pending" kalau pemilik mati
+DEDUPE_WAIT_SEC = float(os.getenv("DEDUPE_WAIT_SEC", "5"))     # tunggu pemilik klaim selesai enqueue
+PENDING_PREFIX = "pending:"
+
+# RQ status → status API, untuk task yang hash result:<id>-nya sudah tidak ada
+_RQ_STATUS = {"queued": "queued", "deferred": "queued", "scheduled": "queued",
+              "started": "processing", "finished": "completed"}
+
+# ganti value hanya jika masih sama (compare-and-set)
+_CAS_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  if ARGV[2] == '' then return redis.call('DEL', KEYS[1]) end
+  redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+  return 1
+end
+return 0
+"""
+
+
+def dedupe_key(fingerprint: str) -> str:
+    return f"dedupe:{fingerprint}"
+
+
+def _hashes(paths: Iterable[str], known: Dict[str, str]) -> list:
+    # hash dari manifest upload; batch lama (tanpa manifest) di-hash langsung
+    return sorted(known.get(p) or file_sha256(p) for p in paths)
+
+def evaluation_fingerprint(
+    job_id: str,
+    cv_paths: Iterable[str],
+    project_paths: Iterable[str],
+    known_hashes: Optional[Dict[str, str]] = None,
+    tenant: Optional[str] = None,
+    redis_conn=None,
+) -> str:
+    known = known_hashes or {}
+    # berubah di setiap ingest yang mengubah JD/rubric job ini (counter Redis), dengan/tanpa snapshot
+    corpus = corpus_version(COLL_JOBS_CORPUS, job_id, redis_conn=redis_conn)
+    parts = [
+        f"tenant={tenant or ''}",       # hasil tidak dibagi antar tenant
+        f"job={job_id}",
+        "cv=" + ",".join(_hashes(cv_paths, known)),
+        "project=" + ",".join(_hashes(project_paths, known)),
+        f"llm={GROQ_MODEL}",
+        f"embed={EMBEDDING_MODEL}",
+        f"loader=v{LOADER_VERSION}|{CHUNK_WORDS}/{CHUNK_OVERLAP_WORDS}",
+        f"corpus={corpus or ''}",
+    ]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def task_status(redis_conn, task_id: str) -> Optional[str]:
+    """queued / processing / completed / failed, or None if the task is gone."""
+    pipe = redis_conn.pipeline(transaction=False)
+    pipe.hget(result_key(task_id), "status")
+    pipe.hget(Job.key_for(task_id), "status")
+    stored_raw, rq_raw = pipe.execute()
+    stored = stored_raw.decode() if stored_raw else None
+    rq_status = rq_raw.decode() if rq_raw else None
+    if rq_status in ("failed", "stopped", "canceled"):
+        return "failed"         # termasuk worker mati sebelum menulis status akhir
+    if stored is not None:
+        return stored
+    return _RQ_STATUS.get(rq_status)
+
+
+def single_flight(
+    redis_conn,
+    fingerprint: str,
+    create: Callable[[], str],
+    reuse_finished: bool = True,
+    wait: float = DEDUPE_WAIT_SEC,
+) -> Tuple[str, bool]:
+    """
+    Return (task id, created). Attaches to a queued / processing (/ completed if
+    `reuse_finished`) task with the same fingerprint, otherwise claims the key and runs
+    `create()` (which enqueues and returns the new task id).
+    """
+    key = dedupe_key(fingerprint)
+    cas = redis_conn.register_script(_CAS_LUA)
+    deadline = time.time() + wait
+    while True:
+        raw = redis_conn.get(key)
+        cur = raw.decode() if raw else None
+        if cur is not None and not cur.startswith(PENDING_PREFIX):
+            status = task_status(redis_conn, cur)
+            if status in ("queued", "processing") or (status == "completed" and reuse_finished):
+                return cur, False
+
+        token = f"{PENDING_PREFIX}{uuid.uuid4().hex}"
+        if cur is None:
+            claimed = bool(redis_conn.set(key, token, nx=True, px=DEDUPE_LOCK_MS))
+        elif not cur.startswith(PENDING_PREFIX):
+            # task lama gagal / hilang / bypass_cache: ganti hanya jika belum diganti request lain
+            claimed = bool(cas(keys=[key], args=[cur, token, DEDUPE_LOCK_MS]))
+        else:
+            claimed = False
+        if claimed:
+            try:
+                task_id = create()
+            except Exception:
+                cas(keys=[key], args=[token, "", 0])
+                raise
+            cas(keys=[key], args=[token, task_id, RESULT_TTL * 1000])
+            return task_id, True
+
+        if time.time() >= deadline:
+            # pemilik klaim terlalu lama: jangan blokir request, jalankan tanpa dedupe
+            return create(), True
+        time.sleep(0.05)
@@ -0,0 +1,75 @@
+# src/queue/events.py
+"""
+Progress / status events per task, pushed over Redis pub/sub.
+
+    events:<task_id>        pub/sub channel (live)
+    events:<task_id>:log    list of every event so far (replay for late subscribers, TTL)
+
+Event: {"seq": int, "type": "status" | "stage" | "candidate" | "result", "ts": float, ...}
+A "status" event with status completed/failed is terminal.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+EVENTS_TTL = int(os.getenv("EVENTS_TTL", str(24 * 3600)))
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def events_channel(task_id: str) -> str:
+    return f"events:{task_id}"
+
+def events_log_key(task_id: str) -> str:
+    return f"events:{task_id}:log"
+
+def is_terminal(event: Dict[str, Any]) -> bool:
+    return event.get("type") == "status" and event.get("status") in TERMINAL_STATUSES
+
+
+def _emit(redis_conn, task_id: str, event: Dict[str, Any]) -> bool:
+    raw = json.dumps(event, ensure_ascii=False)
+    try:
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.rpush(events_log_key(task_id), raw)
+        pipe.expire(events_log_key(task_id), EVENTS_TTL)
+        pipe.publish(events_channel(task_id), raw)
+        pipe.execute()
+        return True
+    except Exception as e:
+        print(f"[events] publish failed for {task_id}: {e}")
+        return False
+
+
+class EventPublisher:
+    """Publishes events for one task; best effort (Redis errors never fail the job)."""
+    def __init__(self, task_id: str, redis_conn):
+        self.task_id = task_id
+        self.redis = redis_conn
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, **data: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, "type": event_type, "ts": round(time.time(), 3), **data}
+            ok = _emit(self.redis, self.task_id, event)
+        return event if ok else None
+
+    def status(self, status: str, **data: Any) -> Optional[Dict[str, Any]]:
+        return self.publish("status", status=status, **data)
+
+    def stage_listener(self):
+        """StageTimer.on_event adapter → "stage" events."""
+        def _on_event(kind: str, name: str, ms: Optional[float]) -> None:
+            if kind == "start":
+                self.publish("stage", stage=name, state="started")
+            else:
+                self.publish("stage", stage=name, state="done", ms=ms)
+        return _on_event
+
+
+def publish_queued(redis_conn, task_id: str) -> None:
+    """Called by the API right after enqueue (seq 0, so the worker's own events sort after it)."""
+    _emit(redis_conn, task_id, {"seq": 0, "type": "status", "status": "queued", "ts": round(time.time(), 3)})
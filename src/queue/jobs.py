@@ -1,17 +1,73 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import os, shutil, sys, time
 
-from src.eval.evaluator import evaluate_candidate_from_files
+from src.eval.evaluator import evaluate_candidate_from_files, evaluate_candidates_bulk
 from src.storage.qdrant_store import close_client
-from src.config import UPLOAD_DIR
+from src.config import UPLOAD_DIR, QDRANT_KEEP_OPEN
+from src.queue.events import EventPublisher
+from src.queue.scheduler import note_started
+from src.queue.results import (
+    public_result_view, result_key, bulk_results_key,
+    set_status, store_result, store_failure, store_bulk_item,
+)
 
-def run_eval_upload_job(job_id: str, cv_paths: List[str], project_paths: List[str], batch_id: str) -> Dict[str, Any]:
+def cleanup_batch(batch_id: str) -> None:
+    try:
+        base = os.path.abspath(os.path.join(UPLOAD_DIR, batch_id))
+        print(f"[job] cleanup {base}")
+        if base.startswith(os.path.abspath(UPLOAD_DIR)) and os.path.isdir(base):
+            shutil.rmtree(base, ignore_errors=True)
+    except Exception as e:
+        print("[job] cleanup error:", e)
+
+def _task_context(redis_conn=None):
+    """
+    (task id, redis connection) of the running RQ job. Called directly (no RQ job), the
+    connection is whatever the caller passed; None means no status / events are written.
+    """
+    from rq import get_current_job
+
+    rq_job = get_current_job()
+    if rq_job is not None:
+        note_started(rq_job)
+        return rq_job.id, rq_job.connection
+    return f"local-{int(time.time())}", redis_conn
+
+def _record_failure(redis_conn, events: Optional[EventPublisher], task_id: str, err: Exception) -> None:
+    """Best effort: a Redis error here must not replace the job's own exception."""
+    if redis_conn is None:
+        return
+    try:
+        store_failure(redis_conn, task_id, err)
+    except Exception as e:
+        print(f"[job] could not record failure for {task_id}: {e}")
+    events.status("failed", error=str(err)[:2000])
+
+def run_eval_upload_job(
+    job_id: str,
+    cv_paths: List[str],
+    project_paths: List[str],
+    batch_id: str,
+    bypass_cache: bool = False,
+    *,
+    redis_conn=None,
+) -> Dict[str, Any]:
+    """
+    Single upload evaluation. Under RQ, status / events / result go to the job's Redis;
+    called directly, pass `redis_conn` for the same, or nothing to just get the result back.
+    """
     print(f"[job] start job_id={job_id} batch={batch_id}")
     print(f"[job] cv_paths={cv_paths}")
     print(f"[job] project_paths={project_paths}")
     sys.stdout.flush()
 
+    task_id, events = None, None
     try:
+        task_id, redis_conn = _task_context(redis_conn)
+        if redis_conn is not None:
+            events = EventPublisher(task_id, redis_conn)
+            set_status(redis_conn, task_id, "processing")
+            events.status("processing")
         t0 = time.time()
         print("[job] evaluating...")
         res = evaluate_candidate_from_files(
@@ -19,17 +75,91 @@ def run_eval_upload_job(job_id: str, cv_paths: List[str], project_paths: List[st
             cv_paths=cv_paths or [],
             project_paths=project_paths or [],
             candidate_id="upload",
+            bypass_cache=bypass_cache,
+            on_stage=events.stage_listener() if events is not None else None,
         )
         dt = time.time() - t0
         print(f"[job] done in {dt:.1f}s")
-        return {"status": "completed", "result": res}
+        if redis_conn is None:
+            return {"status": "completed", "result": res}
+        store_result(redis_conn, task_id, res)
+        events.status("completed", result=public_result_view(res))
+        # RQ hanya menyimpan pointer kecil; hasil lengkap ada di result:<id>(:details)
+        return {"status": "completed", "result_key": result_key(task_id)}
+    except Exception as e:
+        if task_id is not None:
+            _record_failure(redis_conn, events, task_id, e)
+        raise
+    finally:
+        cleanup_batch(batch_id)
+        if not QDRANT_KEEP_OPEN:
+            close_client()
+        sys.stdout.flush()
+
+def run_eval_bulk_job(
+    job_id: str,
+    candidates: List[Dict[str, Any]],
+    bypass_cache: bool = False,
+    *,
+    redis_conn=None,
+) -> Dict[str, Any]:
+    """
+    Bulk screening: candidates = [{"batch_id", "cv_paths", "project_paths"}, ...] for one job_id.
+    Each finished candidate is written to Redis hash `bulk:<rq job id>:results` (field = batch_id,
+    public view) as soon as it completes, so clients can read partial results while the rest are
+    running; full items go to `bulk:<rq job id>:details` (see src/queue/results.py).
+    Called directly without `redis_conn`, nothing is written and the items are returned instead.
+    """
+    print(f"[job] bulk start job_id={job_id} candidates={len(candidates)}")
+    sys.stdout.flush()
+
+    def _on_result(candidate_id: str, item: Dict[str, Any]) -> None:
+        print(f"[job] bulk {candidate_id} -> {item.get('status')}")
+        sys.stdout.flush()
+        if redis_conn is None:
+            return
+        store_bulk_item(redis_conn, task_id, candidate_id, item)
+        events.publish(
+            "candidate", candidate_id=candidate_id, status=item.get("status"),
+            **({"result": public_result_view(item["result"])} if isinstance(item.get("result"), dict) else {}),
+        )
+
+    task_id, events = None, None
+    try:
+        task_id, redis_conn = _task_context(redis_conn)
+        if redis_conn is not None:
+            events = EventPublisher(task_id, redis_conn)
+            set_status(redis_conn, task_id, "processing", candidates=len(candidates))
+            events.status("processing", candidates=len(candidates))
+        t0 = time.time()
+        results = evaluate_candidates_bulk(
+            job_id,
+            [
+                {
+                    "candidate_id": c["batch_id"],
+                    "cv_paths": c.get("cv_paths") or [],
+                    "project_paths": c.get("project_paths") or [],
+                }
+                for c in candidates
+            ],
+            on_result=_on_result,
+            bypass_cache=bypass_cache,
+        )
+        dt = time.time() - t0
+        n_ok = sum(1 for r in results.values() if r.get("status") == "completed")
+        print(f"[job] bulk done in {dt:.1f}s ({n_ok}/{len(candidates)} completed)")
+        if redis_conn is None:
+            return {"status": "completed", "done": len(results), "ok": n_ok, "results": results}
+        set_status(redis_conn, task_id, "completed", candidates=len(candidates), done=len(results), ok=n_ok)
+        events.status("completed", done=len(results), ok=n_ok)
+        return {"status": "completed", "done": len(results), "ok": n_ok, "results_key": bulk_results_key(task_id)}
+    except Exception as e:
+        if task_id is not None:
+            _record_failure(redis_conn, events, task_id, e)
+        raise
     finally:
-        try:
-            base = os.path.abspath(os.path.join(UPLOAD_DIR, batch_id))
-            print(f"[job] cleanup {base}")
-            if base.startswith(os.path.abspath(UPLOAD_DIR)) and os.path.isdir(base):
-                shutil.rmtree(base, ignore_errors=True)
-        except Exception as e:
-            print("[job] cleanup error:", e)
-        close_client()
+        for c in candidates:
+            cleanup_batch(c["batch_id"])
+        if not QDRANT_KEEP_OPEN:
+            close_client()
         sys.stdout.flush()
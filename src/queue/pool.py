@@ -0,0 +1,299 @@
+# src/queue/pool.py
+"""
+Pooled worker supervisor (POSIX only).
+
+The parent loads the embedding model weights once (no inference before fork), then forks N
+job executors that share the weights copy-on-write. Each child runs an in-process RQ worker
+(SimpleWorker), so per-process caches (probe vectors, context cache, Qdrant handle) live
+across jobs. With EMBED_BATCHING=1 (default) one more child runs the micro-batching embed
+service behind a Unix socket; executors send their embeddings there, so jobs running at the
+same time on different executors share model batches (fill ratio / latency in the pool stats).
+Crashed children are restarted; pool queue depth / utilization is logged and published to
+Redis key `pool:<hostname>:stats` (JSON).
+
+    python -m src.queue.pool --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+from redis import Redis
+from rq import Worker
+try:
+    from rq import SimpleWorker
+except Exception:
+    SimpleWorker = None
+
+from src.config import REDIS_URL, QUEUE_NAME, COLL_JOBS_CORPUS
+from src.queue.worker import _setup_hf_cache, load_model, warm_probes, make_worker, log_process_stats
+from src.queue.scheduler import LANES, lane_queues, dispatch, pending_count
+from src.utils.logs import setup_logging
+
+POOL_STATS_INTERVAL = float(os.getenv("POOL_STATS_INTERVAL", "15"))
+POOL_RESTART_BACKOFF_MAX = float(os.getenv("POOL_RESTART_BACKOFF_MAX", "60"))
+POOL_EMBED_SOCKET = os.getenv("POOL_EMBED_SOCKET", "")     # "" = <tmp>/embed-<hostname>-<pid>.sock
+EMBED_SLOT = -1                                            # slot child server embedding
+
+
+def pool_stats_key(hostname: str) -> str:
+    return f"pool:{hostname}:stats"
+
+
+def _embed_server_main(path: str) -> None:
+    """Body of the forked embed server: batches the embeddings of every executor's jobs."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # berhenti lewat SIGTERM dari parent, setelah executor
+    logger = setup_logging("pool.embed")
+    from src.models.embed_service import EmbedServer, start_embed_service
+    svc = start_embed_service()
+    server = EmbedServer(path, svc)
+    logger.info("[pool] embed server on %s (max_batch=%d, max_wait_ms=%.1f)",
+                path, svc.max_batch, svc.max_wait * 1000.0)
+    server.serve_forever()
+
+
+def _child_main(slot: int, prefix: str, n_workers: int, embed_socket: Optional[str] = None) -> None:
+    """Body of a forked executor: fresh Redis connection, embeddings via the pool's embed server, in-process jobs."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    logger = setup_logging(f"pool.{slot}")
+    try:
+        import torch
+        # bagi core CPU antar child supaya tidak oversubscribe
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // n_workers))
+    except Exception:
+        pass
+    if embed_socket:
+        from src.models.embed_service import connect_embed_server
+        connect_embed_server(embed_socket)
+    # inference pertama baru di child: thread pool torch/OpenMP dari parent tidak selamat lewat fork
+    warm_probes(logger)
+
+    redis_conn = Redis.from_url(REDIS_URL)
+    w = make_worker(lane_queues(redis_conn), redis_conn, worker_class=SimpleWorker or Worker, name=f"{prefix}-{slot}-{os.getpid()}")
+    try:
+        w.work(with_scheduler=False)
+    finally:
+        from src.storage.qdrant_store import close_client
+        close_client()
+        log_process_stats(logger)
+
+
+class WorkerPool:
+    def __init__(self, n_workers: int, logger):
+        self.n_workers = max(1, n_workers)
+        self.logger = logger
+        self.hostname = socket.gethostname()
+        self.prefix = f"{self.hostname}.pool"
+        self.children: Dict[int, int] = {}          # pid -> slot
+        self.restarts: Dict[int, int] = {}          # slot -> consecutive quick crashes
+        self.started_at: Dict[int, float] = {}      # slot -> start time
+        self.pending: Dict[int, float] = {}         # slot -> restart time (backoff)
+        self.stopping = False
+        self.redis = Redis.from_url(REDIS_URL)
+        self.queues = lane_queues(self.redis)
+        self.embed_socket: Optional[str] = None
+        self.embed_client = None
+        if os.getenv("EMBED_BATCHING", "1") == "1":
+            from src.models.embed_service import EmbedClient
+            self.embed_socket = POOL_EMBED_SOCKET or os.path.join(
+                tempfile.gettempdir(), f"embed-{self.hostname}-{os.getpid()}.sock")
+            self.embed_client = EmbedClient(self.embed_socket)     # hanya untuk stats
+
+    # ---------- children ----------
+    @staticmethod
+    def _label(slot: int) -> str:
+        return "embed server" if slot == EMBED_SLOT else f"executor slot={slot}"
+
+    def spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                if slot == EMBED_SLOT:
+                    _embed_server_main(self.embed_socket)
+                else:
+                    _child_main(slot, self.prefix, self.n_workers, self.embed_socket)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = slot
+        self.started_at[slot] = time.time()
+        self.logger.info("[pool] started %s pid=%d", self._label(slot), pid)
+
+    def reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot = self.children.pop(pid, None)
+            if slot is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                continue
+            uptime = time.time() - self.started_at.get(slot, 0)
+            self.restarts[slot] = self.restarts.get(slot, 0) + 1 if uptime < 30 else 0
+            delay = min(POOL_RESTART_BACKOFF_MAX, 2 ** self.restarts[slot] - 1)
+            self.logger.warning("[pool] %s pid=%d exited code=%s (uptime %.0fs); restart in %.0fs",
+                                self._label(slot), pid, code, uptime, delay)
+            self.pending[slot] = time.time() + delay
+
+    def restart_pending(self) -> None:
+        now = time.time()
+        for slot, at in list(self.pending.items()):
+            if at <= now:
+                del self.pending[slot]
+                self.spawn(slot)
+
+    # ---------- stats ----------
+    def stats(self) -> Dict[str, object]:
+        busy = 0
+        alive = 0
+        for w in Worker.all(connection=self.redis):
+            if not w.name.startswith(self.prefix):
+                continue
+            alive += 1
+            if w.get_state() == "busy":
+                busy += 1
+        return {
+            "workers": self.n_workers,
+            "alive": alive,
+            "busy": busy,
+            "utilization": round(busy / self.n_workers, 3),
+            "queues": [q.name for q in self.queues],
+            "queue_depth": sum(q.count for q in self.queues),
+            "pending": sum(pending_count(self.redis, lane) for lane in LANES),   # belum di-dispatch
+            "embed": self.embed_client.stats() if self.embed_client is not None else None,
+            "ts": time.time(),
+        }
+
+    def publish_stats(self) -> None:
+        try:
+            st = self.stats()
+            self.redis.set(pool_stats_key(self.hostname), json.dumps(st), ex=int(POOL_STATS_INTERVAL * 4) + 1)
+            self.logger.info("[pool] depth=%s pending=%s busy=%s/%s utilization=%.0f%%",
+                             st["queue_depth"], st["pending"], st["busy"], st["workers"], st["utilization"] * 100)
+            if st["embed"]:
+                self.logger.info("[pool] embed batches=%s avg_fill=%.0f%% avg_latency=%.1fms",
+                                 st["embed"]["batches"], st["embed"]["avg_fill_ratio"] * 100,
+                                 st["embed"]["avg_batch_latency_ms"])
+        except Exception as e:
+            self.logger.warning("[pool] stats failed: %s", e)
+
+    # ---------- lifecycle ----------
+    def _on_signal(self, signum, frame):
+        self.stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        if self.embed_socket:
+            self.spawn(EMBED_SLOT)
+        for slot in range(self.n_workers):
+            self.spawn(slot)
+        next_stats = time.time()
+        while not self.stopping:
+            self.reap()
+            self.restart_pending()
+            try:
+                dispatch(self.redis)
+            except Exception as e:
+                self.logger.warning("[pool] dispatch failed: %s", e)
+            if time.time() >= next_stats:
+                self.publish_stats()
+                next_stats = time.time() + POOL_STATS_INTERVAL
+            time.sleep(1.0)
+        self.shutdown()
+
+    def _stop(self, pids, timeout: float) -> None:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)   # RQ: warm shutdown (selesaikan job yang berjalan)
+            except ProcessLookupError:
+                pass
+        deadline = time.time() + timeout
+        while any(pid in self.children for pid in pids) and time.time() < deadline:
+            self.reap()
+            time.sleep(0.5)
+        for pid in pids:
+            if pid in self.children:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def shutdown(self, timeout: float = 60.0) -> None:
+        executors = [pid for pid, slot in self.children.items() if slot != EMBED_SLOT]
+        self.logger.info("[pool] stopping %d executors...", len(executors))
+        self._stop(executors, timeout)
+        # server embedding terakhir: job yang sedang diselesaikan executor masih memakainya
+        self._stop([pid for pid, slot in self.children.items() if slot == EMBED_SLOT], 5.0)
+        if self.embed_socket and os.path.exists(self.embed_socket):
+            os.unlink(self.embed_socket)
+        self.redis.delete(pool_stats_key(self.hostname))
+        self.logger.info("[pool] stopped")
+
+
+def _snapshot_ready(logger) -> bool:
+    """
+    True when executors can read jobs_corpus from the mmap snapshot instead of the embedded
+    Qdrant store (which only one process may open). Exports the snapshot here, before forking,
+    if none has been published yet.
+    """
+    if os.getenv("CORPUS_SNAPSHOT", "auto") == "0":
+        logger.warning("[pool] CORPUS_SNAPSHOT=0: executors read jobs_corpus from Qdrant directly")
+        return False
+    from src.storage.corpus_snapshot import export_snapshot, get_snapshot
+    if get_snapshot(COLL_JOBS_CORPUS) is not None:
+        return True
+    from src.storage.qdrant_store import close_client
+    try:
+        info = export_snapshot(COLL_JOBS_CORPUS)
+        logger.info("[pool] no jobs_corpus snapshot found; exported one before forking: %s", info)
+        return True
+    except Exception as e:
+        logger.warning("[pool] no jobs_corpus snapshot and export failed: %s", e)
+        return False
+    finally:
+        close_client()   # lock Qdrant tidak boleh ikut ter-fork ke executor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RQ worker pool sharing one preloaded embedding model.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("POOL_WORKERS", str(os.cpu_count() or 2))))
+    args = parser.parse_args()
+
+    logger = setup_logging("pool")
+    if not hasattr(os, "fork"):
+        logger.warning("[pool] fork not available (Windows); falling back to a single worker")
+        from src.queue.worker import main as worker_main
+        return worker_main()
+
+    _setup_hf_cache(logger)
+    logger.info("[pool] REDIS_URL=%s  QUEUE_NAME=%s  workers=%d", REDIS_URL, QUEUE_NAME, args.workers)
+
+    n_workers = args.workers
+    if n_workers > 1 and not _snapshot_ready(logger):
+        logger.warning("[pool] executors would contend for the embedded Qdrant lock; running 1 executor")
+        n_workers = 1
+
+    # Muat bobot model sekali di parent (tanpa inference); child berbagi bobot lewat copy-on-write
+    load_model(logger)
+    sys.stdout.flush()
+
+    WorkerPool(n_workers, logger).run()
+
+
+if __name__ == "__main__":
+    main()
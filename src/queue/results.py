@@ -0,0 +1,156 @@
+# src/queue/results.py
+"""
+Compact result storage in Redis (orjson), split so that cheap reads stay cheap.
+
+    result:<task_id>            hash {status, summary, error, ts}   (public view only, small)
+    result:<task_id>:details    zlib(orjson(full result))           (dimensions, evidence, meta, ...)
+    bulk:<task_id>:results      hash candidate_id → orjson({status, result: public view, error})
+    bulk:<task_id>:details      hash candidate_id → zlib(orjson(full item))
+
+Status lookups are a single HGET; `/result` reads only the small hash; details are
+loaded only when explicitly asked for. All keys expire after RESULT_TTL seconds. The RQ
+job itself returns a small pointer, so RQ no longer pickles the full result.
+"""
+import os
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+import orjson
+
+RESULT_TTL = int(os.getenv("RESULT_TTL", str(24 * 3600)))
+RESULT_ZLIB_LEVEL = int(os.getenv("RESULT_ZLIB_LEVEL", "3"))
+
+# field hasil yang boleh keluar lewat API
+PUBLIC_RESULT_KEYS = [
+    "cv_match_rate", "cv_feedback",
+    "project_score", "project_feedback",
+    "overall_summary",
+]
+
+def public_result_view(res: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: res.get(k) for k in PUBLIC_RESULT_KEYS if k in res}
+
+
+def result_key(task_id: str) -> str:
+    return f"result:{task_id}"
+
+def result_details_key(task_id: str) -> str:
+    return f"result:{task_id}:details"
+
+def bulk_results_key(task_id: str) -> str:
+    return f"bulk:{task_id}:results"
+
+def bulk_details_key(task_id: str) -> str:
+    return f"bulk:{task_id}:details"
+
+
+# =======================
+# Encoding
+# =======================
+
+def _default(obj: Any) -> Any:
+    # numpy scalar / array yang lolos dari evaluator
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+def loads(raw: Optional[bytes]) -> Any:
+    return None if raw is None else orjson.loads(raw)
+
+def _pack(obj: Any) -> bytes:
+    return zlib.compress(dumps(obj), RESULT_ZLIB_LEVEL)
+
+def _unpack(raw: Optional[bytes]) -> Any:
+    return None if raw is None else orjson.loads(zlib.decompress(raw))
+
+def _text(raw: Optional[bytes]) -> Optional[str]:
+    return raw.decode() if isinstance(raw, bytes) else raw
+
+
+# =======================
+# Writers (API + worker)
+# =======================
+
+def set_status(redis_conn, task_id: str, status: str, ttl: int = RESULT_TTL, if_missing: bool = False, **fields: Any) -> None:
+    """
+    Status only (queued / processing); extra fields are stored as orjson. `if_missing` keeps a
+    status the worker already wrote (the API marks "queued" after the job may have started).
+    """
+    key = result_key(task_id)
+    mapping = {"ts": round(time.time(), 3), **{k: dumps(v) for k, v in fields.items()}}
+    pipe = redis_conn.pipeline(transaction=False)
+    if if_missing:
+        pipe.hsetnx(key, "status", status)
+    else:
+        mapping["status"] = status
+    pipe.hset(key, mapping=mapping)
+    pipe.expire(key, ttl)
+    pipe.execute()
+
+def store_result(redis_conn, task_id: str, res: Dict[str, Any], ttl: int = RESULT_TTL) -> None:
+    """Completed single evaluation: public summary in the hash, full result in the details key."""
+    key = result_key(task_id)
+    pipe = redis_conn.pipeline(transaction=True)
+    pipe.set(result_details_key(task_id), _pack(res), ex=ttl)
+    pipe.delete(key)        # buang field sisa (mis. error dari percobaan sebelumnya)
+    pipe.hset(key, mapping={"status": "completed", "ts": round(time.time(), 3),
+                            "summary": dumps(public_result_view(res))})
+    pipe.expire(key, ttl)
+    pipe.execute()
+
+def store_failure(redis_conn, task_id: str, error: str, ttl: int = RESULT_TTL) -> None:
+    redis_conn.hdel(result_key(task_id), "summary")
+    set_status(redis_conn, task_id, "failed", ttl=ttl, error=str(error)[:2000])
+
+def store_bulk_item(redis_conn, task_id: str, candidate_id: str, item: Dict[str, Any], ttl: int = RESULT_TTL) -> None:
+    """One finished bulk candidate: {status, result?, error?} → public item + packed details."""
+    public = {k: v for k, v in item.items() if k != "result"}
+    if isinstance(item.get("result"), dict):
+        public["result"] = public_result_view(item["result"])
+    pipe = redis_conn.pipeline(transaction=False)
+    pipe.hset(bulk_results_key(task_id), candidate_id, dumps(public))
+    pipe.hset(bulk_details_key(task_id), candidate_id, _pack(item))
+    pipe.expire(bulk_results_key(task_id), ttl)
+    pipe.expire(bulk_details_key(task_id), ttl)
+    pipe.execute()
+
+
+# =======================
+# Readers (API)
+# =======================
+
+def get_status(redis_conn, task_id: str) -> Optional[str]:
+    """Stored status without touching any payload; None if nothing was stored (or expired)."""
+    return _text(redis_conn.hget(result_key(task_id), "status"))
+
+def summary_from_hash(data: Optional[Dict[Any, bytes]]) -> Optional[Dict[str, Any]]:
+    """Decode a `result:<task_id>` HGETALL reply → {"status", "result"?, "error"?, ...extra fields}."""
+    if not data:
+        return None
+    data = {_text(k): v for k, v in data.items()}
+    out: Dict[str, Any] = {"status": _text(data.pop("status", None)) or "unknown"}
+    data.pop("ts", None)
+    summary = data.pop("summary", None)
+    if summary is not None:
+        out["result"] = loads(summary)
+    for k, v in data.items():
+        out[k] = loads(v)
+    return out
+
+def get_summary(redis_conn, task_id: str) -> Optional[Dict[str, Any]]:
+    """Public view + status from the small hash only (details are never loaded)."""
+    return summary_from_hash(redis_conn.hgetall(result_key(task_id)))
+
+def get_details(redis_conn, task_id: str) -> Optional[Dict[str, Any]]:
+    """Full stored result (including `details`), or None."""
+    return _unpack(redis_conn.get(result_details_key(task_id)))
+
+def get_bulk_items(redis_conn, task_id: str) -> Dict[str, Dict[str, Any]]:
+    return {_text(cid): loads(raw) for cid, raw in (redis_conn.hgetall(bulk_results_key(task_id)) or {}).items()}
+
+def get_bulk_details(redis_conn, task_id: str, candidate_id: str) -> Optional[Dict[str, Any]]:
+    return _unpack(redis_conn.hget(bulk_details_key(task_id), candidate_id))
@@ -0,0 +1,366 @@
+# src/queue/scheduler.py
+"""
+Scheduling layer in front of the RQ queues: priority lanes, per-job_id fair share and
+per-tenant concurrency caps.
+
+Submitted tasks are created as RQ jobs but parked in Redis until the dispatcher releases them:
+
+    sched:<lane>:ring           zset job_id → turn of its last dispatch (lowest = next, round-robin)
+    sched:<lane>:q:<job_id>     list of pending tasks of that job_id (FIFO)
+    sched:running:<tenant>      set of dispatched, unfinished task ids
+    sched:waits:<lane>          recent time-to-start samples in ms (newest first)
+
+Lanes map to RQ queues (`<QUEUE_NAME>:high`, `<QUEUE_NAME>`, `<QUEUE_NAME>:low`) and workers
+listen in that order. The dispatcher keeps only as many jobs in RQ as there are worker slots
+(+ SCHED_READY_AHEAD), so the start order is decided here instead of by RQ's FIFO: each free
+slot goes to the highest lane with eligible work, within a lane to the least recently served
+job_id whose tenant is under its cap.
+
+Dispatch runs on submit, when a job finishes (RQ callback), from the worker / pool supervisor
+tick and from `python -m src.queue.scheduler` (standalone loop, also prints stats).
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import orjson
+from redis import Redis
+from redis.exceptions import LockError
+from rq import Callback, Queue, Worker
+from rq.job import Job
+from rq.registry import StartedJobRegistry
+
+from src.config import REDIS_URL, QUEUE_NAME
+
+SCHEDULER = os.getenv("SCHEDULER", "1") == "1"
+LANES = ("high", "normal", "low")
+DEFAULT_TENANT = "default"
+SCHED_SLOTS = int(os.getenv("SCHED_SLOTS", "0"))                     # 0 = jumlah worker RQ aktif
+SCHED_READY_AHEAD = int(os.getenv("SCHED_READY_AHEAD", "1"))         # job ekstra yang boleh antre di RQ
+SCHED_TENANT_MAX_RUNNING = int(os.getenv("SCHED_TENANT_MAX_RUNNING", "0"))   # 0 = tanpa batas
+SCHED_TICK_SEC = float(os.getenv("SCHED_TICK_SEC", "1"))
+SCHED_RECONCILE_SEC = float(os.getenv("SCHED_RECONCILE_SEC", "30"))
+SCHED_WAIT_SAMPLES = int(os.getenv("SCHED_WAIT_SAMPLES", "1000"))
+
+
+def _parse_caps(raw: str) -> Dict[str, int]:
+    """"acme=4,beta=1" → {"acme": 4, "beta": 1}"""
+    caps = {}
+    for part in raw.split(","):
+        if "=" in part:
+            name, n = part.split("=", 1)
+            caps[name.strip()] = int(n)
+    return caps
+
+SCHED_TENANT_CAPS = _parse_caps(os.getenv("SCHED_TENANT_CAPS", ""))
+
+DISPATCH_LOCK_KEY = "sched:dispatch:lock"
+TENANTS_KEY = "sched:tenants"
+
+def ring_key(lane: str) -> str:
+    return f"sched:{lane}:ring"
+
+def turn_key(lane: str) -> str:
+    return f"sched:{lane}:turn"
+
+def pending_key(lane: str, job_id: str) -> str:
+    return f"sched:{lane}:q:{job_id}"
+
+def running_key(tenant: str) -> str:
+    return f"sched:running:{tenant}"
+
+def waits_key(lane: str) -> str:
+    return f"sched:waits:{lane}"
+
+def lane_queue_name(lane: str) -> str:
+    return QUEUE_NAME if lane == "normal" else f"{QUEUE_NAME}:{lane}"
+
+def lane_queues(redis_conn) -> List[Queue]:
+    """RQ queues in priority order (pass this list to workers)."""
+    return [Queue(lane_queue_name(lane), connection=redis_conn) for lane in LANES]
+
+def tenant_cap(tenant: str) -> int:
+    return SCHED_TENANT_CAPS.get(tenant, SCHED_TENANT_MAX_RUNNING)
+
+def _text(raw) -> str:
+    return raw.decode() if isinstance(raw, bytes) else raw
+
+
+# push ke antrean job_id; job_id baru masuk ring di giliran saat ini (belakang putaran)
+_SUBMIT_LUA = """
+redis.call('RPUSH', KEYS[1], ARGV[2])
+local turn = redis.call('GET', KEYS[3]) or 0
+redis.call('ZADD', KEYS[2], 'NX', turn, ARGV[1])
+return 1
+"""
+
+# pop kepala antrean job_id; job_id keluar dari ring kalau kosong, kalau tidak pindah ke giliran berikutnya
+_POP_LUA = """
+local t = redis.call('LPOP', KEYS[1])
+if redis.call('LLEN', KEYS[1]) == 0 then
+  redis.call('ZREM', KEYS[2], ARGV[1])
+else
+  redis.call('ZADD', KEYS[2], redis.call('INCR', KEYS[3]), ARGV[1])
+end
+return t
+"""
+
+
+# =======================
+# Submit (API)
+# =======================
+
+def submit(
+    redis_conn,
+    func: Callable,
+    args: Sequence[Any],
+    *,
+    job_id: str,
+    tenant: Optional[str] = None,
+    priority: str = "normal",
+    job_timeout: Optional[int] = None,
+    result_ttl: Optional[int] = None,
+    failure_ttl: Optional[int] = None,
+) -> Job:
+    """Create the RQ job and park it in its lane (or enqueue directly when SCHEDULER=0)."""
+    if priority not in LANES:
+        raise ValueError(f"unknown priority {priority!r} (expected one of {', '.join(LANES)})")
+    tenant = tenant or DEFAULT_TENANT
+    q = Queue(lane_queue_name(priority), connection=redis_conn)
+    meta = {"sched_lane": priority, "sched_tenant": tenant, "sched_job_id": job_id,
+            "sched_submitted_at": time.time()}
+    if not SCHEDULER:
+        return q.enqueue(func, *args, job_timeout=job_timeout, result_ttl=result_ttl,
+                         failure_ttl=failure_ttl, meta=meta)
+
+    job = q.create_job(
+        func, args=tuple(args), timeout=job_timeout, result_ttl=result_ttl, failure_ttl=failure_ttl,
+        meta=meta, on_success=Callback(task_finished), on_failure=Callback(task_finished),
+    )
+    job.save()
+    entry = orjson.dumps({"id": job.id, "tenant": tenant})
+    redis_conn.register_script(_SUBMIT_LUA)(
+        keys=[pending_key(priority, job_id), ring_key(priority), turn_key(priority)],
+        args=[job_id, entry],
+    )
+    dispatch(redis_conn, blocking_timeout=0.5)
+    return job
+
+
+# =======================
+# Dispatch
+# =======================
+
+_last_reconcile = 0.0
+
+def _free_slots(redis_conn, queues: List[Queue]) -> int:
+    workers = SCHED_SLOTS or max(Worker.count(connection=redis_conn, queue=q) for q in queues)
+    busy = sum(q.count + StartedJobRegistry(queue=q).get_job_count() for q in queues)
+    # minimal 1 slot: tanpa worker terdaftar pun satu job tetap siap di RQ
+    return max(1, workers) + SCHED_READY_AHEAD - busy
+
+def _reconcile_running(redis_conn) -> None:
+    """Drop tasks from the per-tenant running sets whose RQ job is gone or no longer active."""
+    for tenant in redis_conn.smembers(TENANTS_KEY):
+        key = running_key(_text(tenant))
+        ids = [_text(x) for x in redis_conn.smembers(key)]
+        if not ids:
+            redis_conn.srem(TENANTS_KEY, tenant)
+            continue
+        pipe = redis_conn.pipeline(transaction=False)
+        for tid in ids:
+            pipe.hget(Job.key_for(tid), "status")
+        stale = [tid for tid, st in zip(ids, pipe.execute()) if _text(st) not in ("queued", "started")]
+        if stale:
+            redis_conn.srem(key, *stale)
+
+def _next_task(redis_conn, running: Dict[str, int]):
+    """(lane, job_id, entry) of the next task to start, or None if nothing is eligible."""
+    pop = redis_conn.register_script(_POP_LUA)
+    for lane in LANES:
+        for jid in redis_conn.zrange(ring_key(lane), 0, -1):
+            jid = _text(jid)
+            keys = [pending_key(lane, jid), ring_key(lane), turn_key(lane)]
+            head = redis_conn.lindex(keys[0], 0)
+            if head is None:
+                pop(keys=keys, args=[jid])          # bersihkan job_id tanpa antrean
+                continue
+            entry = orjson.loads(head)
+            tenant = entry["tenant"]
+            if tenant not in running:
+                running[tenant] = redis_conn.scard(running_key(tenant))
+            cap = tenant_cap(tenant)
+            if cap and running[tenant] >= cap:
+                continue
+            pop(keys=keys, args=[jid])
+            return lane, jid, entry
+    return None
+
+def dispatch(redis_conn, blocking_timeout: float = 0.0, finishing: int = 0) -> int:
+    """
+    Move as many parked tasks into RQ as there are free worker slots. Returns the count.
+    `finishing` = jobs that still sit in the started registry but are done (RQ callbacks).
+    """
+    global _last_reconcile
+    if not SCHEDULER:
+        return 0
+    lock = redis_conn.lock(DISPATCH_LOCK_KEY, timeout=30)
+    if not lock.acquire(blocking=blocking_timeout > 0, blocking_timeout=blocking_timeout or None):
+        return 0                # dispatcher lain sedang jalan
+    n = 0
+    try:
+        if time.time() - _last_reconcile >= SCHED_RECONCILE_SEC:
+            _reconcile_running(redis_conn)
+            _last_reconcile = time.time()
+        queues = {lane: q for lane, q in zip(LANES, lane_queues(redis_conn))}
+        free = _free_slots(redis_conn, list(queues.values())) + finishing
+        running: Dict[str, int] = {}
+        while free > 0:
+            nxt = _next_task(redis_conn, running)
+            if nxt is None:
+                break
+            lane, jid, entry = nxt
+            try:
+                job = Job.fetch(entry["id"], connection=redis_conn)
+            except Exception:
+                continue            # job sudah dihapus / kedaluwarsa
+            with redis_conn.pipeline() as pipe:
+                queues[lane].enqueue_job(job, pipeline=pipe)     # enqueue_job memanggil MULTI sendiri
+                pipe.sadd(running_key(entry["tenant"]), job.id)
+                pipe.sadd(TENANTS_KEY, entry["tenant"])
+                pipe.execute()
+            running[entry["tenant"]] += 1
+            free -= 1
+            n += 1
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            pass
+    return n
+
+
+def task_finished(job, connection, *args, **kwargs) -> None:
+    """RQ on_success / on_failure callback: free the tenant slot and start the next task."""
+    tenant = (job.meta or {}).get("sched_tenant")
+    if tenant:
+        connection.srem(running_key(tenant), job.id)
+    dispatch(connection, blocking_timeout=1.0, finishing=1)
+
+
+def start_dispatch_thread(logger=None, interval: float = SCHED_TICK_SEC) -> Optional[threading.Thread]:
+    """Periodic dispatch in a daemon thread (own Redis client); covers crashed workers and new slots."""
+    if not SCHEDULER:
+        return None
+
+    def _loop():
+        conn = Redis.from_url(REDIS_URL)
+        while True:
+            try:
+                dispatch(conn)
+            except Exception as e:
+                if logger is not None:
+                    logger.warning("[sched] dispatch failed: %s", e)
+            time.sleep(interval)
+
+    t = threading.Thread(target=_loop, name="sched-dispatch", daemon=True)
+    t.start()
+    return t
+
+
+# =======================
+# Metrics
+# =======================
+
+def note_started(rq_job) -> None:
+    """Record time-to-start (submit → job body starts) for the job's lane; called by the job."""
+    meta = rq_job.meta or {}
+    submitted = meta.get("sched_submitted_at")
+    if submitted is None and rq_job.enqueued_at is not None:
+        # job di luar scheduler: pakai enqueued_at RQ (UTC, bisa naive)
+        at = rq_job.enqueued_at
+        submitted = (at if at.tzinfo else at.replace(tzinfo=timezone.utc)).timestamp()
+    if submitted is None:
+        return
+    lane = meta.get("sched_lane", "normal")
+    wait_ms = max(0.0, (time.time() - submitted) * 1000.0)
+    try:
+        pipe = rq_job.connection.pipeline(transaction=False)
+        pipe.lpush(waits_key(lane), round(wait_ms, 1))
+        pipe.ltrim(waits_key(lane), 0, SCHED_WAIT_SAMPLES - 1)
+        pipe.execute()
+    except Exception as e:
+        print(f"[sched] wait metric failed for {rq_job.id}: {e}")
+
+
+def _percentile(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+def _wait_summary(xs: List[float]) -> Dict[str, Any]:
+    if not xs:
+        return {"n": 0}
+    return {"n": len(xs), "p50": round(_percentile(xs, 50), 1), "p95": round(_percentile(xs, 95), 1),
+            "max": round(max(xs), 1)}
+
+def pending_count(redis_conn, lane: str) -> int:
+    jids = [_text(j) for j in redis_conn.zrange(ring_key(lane), 0, -1)]
+    pipe = redis_conn.pipeline(transaction=False)
+    for jid in jids:
+        pipe.llen(pending_key(lane, jid))
+    return sum(pipe.execute()) if jids else 0
+
+def scheduler_stats(redis_conn) -> Dict[str, Any]:
+    """Per lane: parked / in RQ / started counts and time-to-start (last SCHED_WAIT_SAMPLES)."""
+    lanes: Dict[str, Any] = {}
+    all_waits: List[float] = []
+    for lane, q in zip(LANES, lane_queues(redis_conn)):
+        waits = [float(x) for x in redis_conn.lrange(waits_key(lane), 0, -1)]
+        all_waits.extend(waits)
+        lanes[lane] = {
+            "queue": q.name,
+            "pending": pending_count(redis_conn, lane),
+            "job_ids": redis_conn.zcard(ring_key(lane)),
+            "ready": q.count,
+            "started": StartedJobRegistry(queue=q).get_job_count(),
+            "wait_ms": _wait_summary(waits),
+        }
+    tenants = {}
+    for t in sorted(_text(x) for x in redis_conn.smembers(TENANTS_KEY)):
+        tenants[t] = {"running": redis_conn.scard(running_key(t)), "cap": tenant_cap(t) or None}
+    return {"enabled": SCHEDULER, "lanes": lanes, "wait_ms": _wait_summary(all_waits), "tenants": tenants}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the evaluation dispatcher loop and print queue stats.")
+    parser.add_argument("--interval", type=float, default=SCHED_TICK_SEC)
+    parser.add_argument("--stats-every", type=float, default=15.0, help="seconds between stats lines (0 = never)")
+    parser.add_argument("--once", action="store_true", help="dispatch once, print stats and exit")
+    args = parser.parse_args()
+
+    redis_conn = Redis.from_url(REDIS_URL)
+    if args.once:
+        print(f"[sched] dispatched={dispatch(redis_conn, blocking_timeout=5.0)}")
+        print(orjson.dumps(scheduler_stats(redis_conn), option=orjson.OPT_INDENT_2).decode())
+        return
+    next_stats = time.time()
+    while True:
+        n = dispatch(redis_conn)
+        if n:
+            print(f"[sched] dispatched={n}")
+        if args.stats_every and time.time() >= next_stats:
+            st = scheduler_stats(redis_conn)
+            print("[sched] " + "  ".join(
+                f"{lane}: pending={v['pending']} ready={v['ready']} started={v['started']} "
+                f"p95_wait={v['wait_ms'].get('p95', '-')}ms"
+                for lane, v in st["lanes"].items()
+            ), flush=True)
+            next_stats = time.time() + args.stats_every
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
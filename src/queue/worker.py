@@ -2,9 +2,9 @@
 import os
 from pathlib import Path
 from redis import Redis
-from rq import Queue, Worker
+from rq import Worker
 try:
-    from rq import SimpleWorker  # prefer on Windows (no fork)
+    from rq import SimpleWorker  # job dijalankan in-process (tanpa fork per job)
 except Exception:
     SimpleWorker = None
 
@@ -16,11 +16,16 @@ except Exception:
     pass
 
 from src.config import REDIS_URL, QUEUE_NAME, HF_CACHE_DIR
+from src.queue.scheduler import lane_queues, start_dispatch_thread
 from src.utils.logs import setup_logging
 
 # Kurangi warning tokenizer
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 
+# 1 = RQ Worker klasik (fork work-horse per job: isolasi, tapi handle Qdrant / cache
+# per proses dibuang tiap job). Default 0: job jalan di proses worker (SimpleWorker).
+WORKER_FORK = os.getenv("WORKER_FORK", "0") == "1"
+
 
 def _setup_hf_cache(logger):
     """Ensure HuggingFace cache directories are set & exist."""
@@ -35,6 +40,68 @@ def _setup_hf_cache(logger):
         logger.info("[worker] HF_CACHE_DIR not set (using default HF cache).")
 
 
+def start_embed_batching(logger):
+    """Start the micro-batching embed service (must run in the process that executes jobs)."""
+    if os.getenv("EMBED_BATCHING", "1") == "1":
+        from src.models.embed_service import start_embed_service
+        svc = start_embed_service()
+        logger.info("[worker] embed service on (max_batch=%d, max_wait_ms=%.1f)",
+                    svc.max_batch, svc.max_wait * 1000.0)
+
+
+def load_model(logger):
+    """Load the embedding model weights only (no inference, safe to do before fork)."""
+    try:
+        logger.info("[worker] loading embedding model...")
+        from src.models.embedder import get_model
+        _ = get_model()
+    except Exception as e:
+        logger.exception("[worker] model load failed: %s", e)
+
+
+def warm_probes(logger):
+    """Load/embed the probe vectors (runs the model, so do it in the process that serves jobs)."""
+    try:
+        from src.retrieval.probes import warm_probe_vectors
+        n_new = warm_probe_vectors()
+        logger.info("[worker] warmup done (probe vectors embedded=%d)", n_new)
+    except Exception as e:
+        logger.exception("[worker] probe warmup failed: %s", e)
+
+
+def warmup(logger):
+    """Load the embedding model + batching thread + probe vectors (single-process worker)."""
+    load_model(logger)
+    start_embed_batching(logger)
+    warm_probes(logger)
+
+
+def log_process_stats(logger):
+    """Per-process counters worth keeping when a worker stops (the process is long-lived)."""
+    from src.llm.groq_client import get_groq_stats
+    from src.llm.json_repair import get_recovery_stats
+    logger.info("[worker] groq stats %s", get_groq_stats())
+    logger.info("[worker] LLM JSON recovery paths %s", get_recovery_stats())
+
+
+def make_worker(queues, redis_conn, worker_class=None, name=None):
+    """
+    In-process worker by default, so the Qdrant handle, model and per-process caches live
+    across jobs. WORKER_FORK=1 restores fork-per-job (POSIX only).
+    """
+    if worker_class is None:
+        use_fork = WORKER_FORK and os.name != "nt"
+        worker_class = Worker if (use_fork or SimpleWorker is None) else SimpleWorker
+    kwargs = {"name": name} if name else {}
+    return worker_class(
+        queues,
+        connection=redis_conn,
+        default_worker_ttl=3600,
+        job_monitoring_interval=60,
+        **kwargs,
+    )
+
+
 def main():
     logger = setup_logging("worker")
     logger.info("[worker] LOG_LEVEL=%s EVAL_LOG=%s LOG_LLM_RAW=%s",
@@ -50,31 +117,25 @@ def main():
     logger.info("[worker] redis ping=%s", redis_conn.ping())
 
     # Warm-up embedding model
-    try:
-        logger.info("[worker] warming up embedding model...")
-        from src.models.embedder import get_model
-        _ = get_model()
-        logger.info("[worker] warmup done")
-    except Exception as e:
-        logger.exception("[worker] warmup failed: %s", e)
-
-    q = Queue(QUEUE_NAME, connection=redis_conn)
-    logger.info("*** Listening on %s ...", q.name)
+    warmup(logger)
 
-    is_windows = os.name == "nt"
-    WorkerClass = SimpleWorker if (is_windows and SimpleWorker is not None) else Worker
+    # lane prioritas: high → normal (QUEUE_NAME) → low
+    queues = lane_queues(redis_conn)
+    logger.info("*** Listening on %s ...", ", ".join(q.name for q in queues))
+    start_dispatch_thread(logger)
 
-    w = WorkerClass(
-        [q],
-        connection=redis_conn,
-        default_worker_ttl=3600,
-        job_monitoring_interval=60,
-    )
+    w = make_worker(queues, redis_conn)
     try:
         w.work(with_scheduler=False)
     except Exception as e:
         logger.exception("[worker] fatal error: %s", e)
         raise
+    finally:
+        # client Qdrant dibiarkan terbuka antar job (QDRANT_KEEP_OPEN); tutup rapi saat worker berhenti
+        from src.storage.qdrant_store import close_client
+        close_client()
+        logger.info("[worker] storage closed")
+        log_process_stats(logger)
 
 
 if __name__ == "__main__":
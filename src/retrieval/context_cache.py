@@ -0,0 +1,136 @@
+# src/retrieval/context_cache.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.config import REDIS_URL
+from src.storage.corpus_snapshot import mark_snapshot_stale
+from src.storage.corpus_version import bump_corpus_version
+
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "128"))
+CONTEXT_CACHE_TTL = int(os.getenv("CONTEXT_CACHE_TTL", str(7 * 24 * 3600)))   # detik
+CONTEXT_CACHE_PREFIX = "jobctx:"
+
+# (job_id, collection, k_final, version)
+_Key = Tuple[str, str, int, str]
+
+
+def context_cache_key(job_id: str, collection: str, k_final: int, version: str) -> str:
+    digest = hashlib.sha256(version.encode("utf-8")).hexdigest()[:16]
+    return f"{CONTEXT_CACHE_PREFIX}{collection}:{job_id}:{k_final}:{digest}"
+
+
+class JobContextCache:
+    """
+    Cache konteks JD/rubric per job: LRU in-process di depan Redis (dibagi semua worker).
+
+    Kunci memuat versi korpus (lihat `src.storage.corpus_version`): ingest menaikkan
+    counter di Redis, jadi entri lama di semua proses otomatis tidak terpakai lagi.
+    """
+    def __init__(self, redis_url: str = REDIS_URL, ttl: int = CONTEXT_CACHE_TTL, maxsize: int = CONTEXT_CACHE_SIZE):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.maxsize = max(1, maxsize)
+        self._data: "OrderedDict[_Key, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_ok = True
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def _get_redis(self):
+        if self._redis is None and self._redis_ok:
+            try:
+                from redis import Redis
+                self._redis = Redis.from_url(self.redis_url)
+            except Exception:
+                self._redis_ok = False
+        return self._redis
+
+    def _local_put(self, key: _Key, value: Dict[str, Any]) -> None:
+        with self._lock:
+            # satu versi aktif per (job_id, collection, k_final): buang versi lama
+            for old in [k for k in self._data if k[:3] == key[:3] and k != key]:
+                del self._data[old]
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get(self, job_id: str, collection: str, k_final: int, version: str) -> Optional[Dict[str, Any]]:
+        key = (job_id, collection, k_final, version)
+        with self._lock:
+            val = self._data.get(key)
+            if val is not None:
+                self._data.move_to_end(key)
+                self.local_hits += 1
+                return val
+        r = self._get_redis()
+        if r is not None:
+            try:
+                raw = r.get(context_cache_key(*key))
+            except Exception:
+                raw = None   # Redis down → miss, konteks diambil ulang dari korpus
+            if raw is not None:
+                val = json.loads(raw)
+                self._local_put(key, val)
+                self.redis_hits += 1
+                return val
+        self.misses += 1
+        return None
+
+    def put(self, job_id: str, collection: str, k_final: int, version: str, value: Dict[str, Any]) -> None:
+        key = (job_id, collection, k_final, version)
+        self._local_put(key, value)
+        r = self._get_redis()
+        if r is not None:
+            try:
+                r.set(context_cache_key(*key), json.dumps(value, ensure_ascii=False), ex=self.ttl)
+            except Exception:
+                pass
+
+    def invalidate(self, job_id: Optional[str] = None, collection: Optional[str] = None) -> int:
+        """Hapus entri lokal untuk job_id/collection tertentu (None = semua). Return jumlah entri terhapus."""
+        with self._lock:
+            drop = [
+                k for k in self._data
+                if (job_id is None or k[0] == job_id) and (collection is None or k[1] == collection)
+            ]
+            for k in drop:
+                del self._data[k]
+            return len(drop)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.local_hits + self.redis_hits + self.misses
+            return {
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.local_hits + self.redis_hits) / total, 4) if total else 0.0,
+                "local_size": len(self._data),
+            }
+
+
+_cache: Optional[JobContextCache] = None
+
+def get_context_cache() -> JobContextCache:
+    global _cache
+    if _cache is None:
+        _cache = JobContextCache()
+    return _cache
+
+def invalidate_job_context(job_id: Optional[str], collection: str) -> int:
+    """
+    Called by ingest after points of `job_id` changed: bumps the shared corpus version (so every
+    worker misses from now on), marks the published snapshot stale until the next export, and
+    drops this process's local entries.
+    """
+    bump_corpus_version(collection, job_id)
+    mark_snapshot_stale(collection)
+    return get_context_cache().invalidate(job_id, collection)
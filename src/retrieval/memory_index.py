@@ -1,39 +1,84 @@
 # src/retrieval/memory_index.py
 from __future__ import annotations
+import time
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 import numpy as np
 
-from src.io.loaders import load_text_from_file
-from src.processing.normalizer import normalize_text
-from src.processing.chunker import chunk_by_words
-from src.models.embedder import embed_texts
-from src.config import CHUNK_WORDS, CHUNK_OVERLAP_WORDS
+from src.io.loaders import iter_normalized_pages
+from src.processing.chunker import iter_chunks_by_words
+from src.models.embedder import embed_chunks
+from src.retrieval.probes import embed_queries
+from src.config import CHUNK_WORDS, CHUNK_OVERLAP_WORDS, DOC_CACHE_CANDIDATES, EMBED_CACHE_CANDIDATE_TTL
+from src.utils.timing import StageTimer
 
 class MemoryIndex:
     """Simple in-memory vector index (cosine) for ephemeral use."""
-    def __init__(self, documents: List[str], metadatas: List[Dict[str, Any]]):
+    def __init__(
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Optional[np.ndarray] = None,
+    ):
         self.documents = documents
         self.metadatas = metadatas
-        if documents:
-            self.embeddings = np.array(embed_texts(documents), dtype=np.float32)
+        if embeddings is not None:
+            # matriks dari embed_array/embed_chunks dipakai langsung (tanpa copy jika sudah float32)
+            self.embeddings = np.asarray(embeddings, dtype=np.float32)
+        elif documents:
+            self.embeddings = embed_chunks(documents, ttl=EMBED_CACHE_CANDIDATE_TTL)
         else:
             self.embeddings = np.empty((0, 0), dtype=np.float32)
 
-    def search(self, query_text: str, k: int = 5):
+    def search(self, query_text: Optional[str] = None, k: int = 5, *, query_vector=None):
+        """Cosine top-k. Fixed probes come from the probe table; other query text is embedded per call."""
+        qv = None if query_vector is None else [query_vector]
+        return self.search_many([query_text], k=k, query_vectors=qv)[0]
+
+    def search_many(self, queries: List[Optional[str]], k: int = 5, *, query_vectors=None) -> List[Dict[str, Any]]:
+        """
+        Batched cosine top-k: one (n_chunks x n_queries) matmul + argpartition per query.
+        Returns one Chroma-style dict per query (same shape as `search`).
+        """
         if len(self.documents) == 0:
-            return {"documents":[[]], "metadatas":[[]], "distances":[[]], "ids":[[]]}
-        q = np.array(embed_texts([query_text])[0], dtype=np.float32)  # normalized
-        sims = self.embeddings @ q                                   # cosine similarity
-        topk = min(k, sims.shape[0])
-        idx = np.argsort(-sims)[:topk]
-        docs = [self.documents[i] for i in idx]
-        mds  = [self.metadatas[i] for i in idx]
-        dists = [1.0 - float(sims[i]) for i in idx]                  # distance ~ 1 - sim
-        ids  = [mds[i]["id"] for i in range(len(mds))]
-        return {"documents":[docs], "metadatas":[mds], "distances":[dists], "ids":[ids]}
+            return [{"documents":[[]], "metadatas":[[]], "distances":[[]], "ids":[[]]} for _ in queries]
+        if query_vectors is not None:
+            Q = np.asarray(query_vectors, dtype=np.float32).reshape(len(queries), -1)
+        else:
+            Q = embed_queries(queries)                           # normalized, float32
+        sims = self.embeddings @ Q.T                                 # (n_chunks, n_queries) cosine similarity
+        n = sims.shape[0]
+        topk = min(k, n)
+        out = []
+        for j in range(Q.shape[0]):
+            col = sims[:, j]
+            if topk < n:
+                idx = np.argpartition(-col, topk - 1)[:topk]         # O(n) selection
+            else:
+                idx = np.arange(n)
+            idx = idx[np.argsort(-col[idx], kind="stable")]         # sort only the k winners
+            docs = [self.documents[i] for i in idx]
+            mds  = [self.metadatas[i] for i in idx]
+            dists = [1.0 - float(col[i]) for i in idx]               # distance ~ 1 - sim
+            ids  = [md["id"] for md in mds]
+            out.append({"documents":[docs], "metadatas":[mds], "distances":[dists], "ids":[ids]})
+        return out
 
-def build_index_from_files(
+def _normalized_pages(path: str, spent: Dict[str, float]) -> Iterator[str]:
+    """
+    Stream normalized, PII-masked page texts of `path`, accumulating their load time (ms) into `spent`.
+    Only this masked text reaches the doc cache (expires after DOC_CACHE_TTL; DOC_CACHE_CANDIDATES=0 skips it).
+    """
+    pages = iter_normalized_pages(path, mask_pii_flag=True, cache=DOC_CACHE_CANDIDATES)
+    while True:
+        t0 = time.perf_counter()
+        page = next(pages, None)
+        spent["load"] += (time.perf_counter() - t0) * 1000.0
+        if page is None:
+            return
+        yield page
+
+def chunks_from_files(
     paths: List[str],
     job_id: str,
     candidate_id: str,
@@ -41,23 +86,47 @@ def build_index_from_files(
     lang_hint: Optional[str] = None,
     chunk_words: int = CHUNK_WORDS,
     overlap_words: int = CHUNK_OVERLAP_WORDS,
-) -> MemoryIndex:
+    timer: Optional[StageTimer] = None,
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Load + normalize + chunk files (no embedding). Returns (documents, metadatas)."""
     docs: List[str] = []
     metas: List[Dict[str, Any]] = []
 
     for p in paths:
-        raw = load_text_from_file(p)
-        norm = normalize_text(raw, mask_pii_flag=True)
-        chunks = chunk_by_words(norm, chunk_words, overlap_words)
+        # halaman PDF di-stream: chunking mulai selagi halaman berikutnya masih diekstrak
+        spent = {"load": 0.0}
+        t0 = time.perf_counter()
+        chunks = list(iter_chunks_by_words(_normalized_pages(p, spent), chunk_words, overlap_words))
+        if timer is not None:
+            total_ms = (time.perf_counter() - t0) * 1000.0
+            timer.add(f"load.{source_type}", spent["load"])        # extract + normalize (or doc cache hit)
+            timer.add(f"chunk.{source_type}", max(0.0, total_ms - spent["load"]))
+        fname = p.split("/")[-1].split("\\")[-1]
         for i, ch in enumerate(chunks):
             docs.append(ch)
             metas.append({
-                "id": str(uuid.uuid4()),
+                # deterministic id: same file content → same prompt → LLM response cache can hit
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source_type}|{fname}|{i}|{ch}")),
                 "job_id": job_id,
                 "candidate_id": candidate_id,
                 "source_type": source_type,
-                "filename": p.split("/")[-1].split("\\")[-1],
+                "filename": fname,
                 "chunk_idx": i,
                 **({"lang": lang_hint} if lang_hint else {})
             })
+    return docs, metas
+
+def build_index_from_files(
+    paths: List[str],
+    job_id: str,
+    candidate_id: str,
+    source_type: str,                         # "cv" | "project"
+    lang_hint: Optional[str] = None,
+    chunk_words: int = CHUNK_WORDS,
+    overlap_words: int = CHUNK_OVERLAP_WORDS,
+) -> MemoryIndex:
+    docs, metas = chunks_from_files(
+        paths, job_id, candidate_id, source_type,
+        lang_hint=lang_hint, chunk_words=chunk_words, overlap_words=overlap_words,
+    )
     return MemoryIndex(docs, metas)
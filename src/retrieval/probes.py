@@ -0,0 +1,121 @@
+# src/retrieval/probes.py
+from __future__ import annotations
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.config import EMBEDDING_MODEL, PROJECT_ROOT
+from src.models.embedder import embed_array
+
+# Query probe tetap yang dipakai `_retrieve` (konstan → cukup di-embed sekali)
+PROBE_JD = "backend responsibilities llm rag chaining async reliability safeguards"
+PROBE_RUBRIC_CV = "cv match technical skills experience achievements culture collaboration"
+PROBE_RUBRIC_PROJECT = "project correctness code quality resilience error handling documentation creativity"
+PROBE_CV = "skills experience backend databases apis cloud ai llm"
+PROBE_PROJECT = "prompt design chaining rag retrieval error handling retries randomness readme tests"
+
+ALL_PROBES = [PROBE_JD, PROBE_RUBRIC_CV, PROBE_RUBRIC_PROJECT, PROBE_CV, PROBE_PROJECT]
+
+PROBE_CACHE_DIR = Path(os.getenv("PROBE_CACHE_DIR", str(PROJECT_ROOT / "data" / "probe_cache")))
+
+_vectors: Dict[str, np.ndarray] = {}
+_loaded = False
+_lock = threading.Lock()
+
+
+def probe_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# hanya probe konstan yang masuk tabel / file; query lain tidak pernah disimpan
+_PROBE_KEYS = frozenset(probe_key(t) for t in ALL_PROBES)
+
+
+def is_probe(text: str) -> bool:
+    return probe_key(text) in _PROBE_KEYS
+
+
+def _probe_file() -> Path:
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", EMBEDDING_MODEL)
+    return PROBE_CACHE_DIR / f"{slug}.npz"
+
+
+def _load_from_disk() -> None:
+    global _loaded
+    _loaded = True
+    path = _probe_file()
+    if not path.exists():
+        return
+    try:
+        with np.load(path) as data:
+            keys = set(data.files)
+            for key in keys & _PROBE_KEYS:
+                _vectors.setdefault(key, np.asarray(data[key], dtype=np.float32))
+    except Exception:
+        # file rusak/versi lama → abaikan, nanti ditulis ulang
+        return
+    if keys - _PROBE_KEYS:
+        # file lama yang ikut menyimpan vektor query bebas: tulis ulang hanya dengan probe
+        try:
+            _save_to_disk()
+        except OSError:
+            pass
+
+
+def _save_to_disk() -> None:
+    path = _probe_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez(tmp, **_vectors)
+    os.replace(tmp, path)  # atomic swap, aman untuk beberapa worker
+
+
+def warm_probe_vectors(texts: Optional[Iterable[str]] = None) -> int:
+    """
+    Pastikan semua probe punya vektor (load dari disk, embed yang belum ada, simpan).
+    Dipanggil saat worker start. Teks yang bukan probe konstan diabaikan.
+    Return jumlah probe yang baru di-embed.
+    """
+    texts = [t for t in texts if is_probe(t)] if texts is not None else ALL_PROBES
+    with _lock:
+        if not _loaded:
+            _load_from_disk()
+        missing = [t for t in dict.fromkeys(texts) if probe_key(t) not in _vectors]
+        if missing:
+            embs = embed_array(missing)
+            for t, e in zip(missing, embs):
+                _vectors[probe_key(t)] = e
+            try:
+                _save_to_disk()
+            except OSError:
+                pass
+        return len(missing)
+
+
+def get_probe_vector(text: str) -> np.ndarray:
+    """
+    Vektor query (normalized, float32) untuk `text`. Probe konstan di-embed sekali lalu dipakai
+    ulang; teks lain di-embed langsung dan tidak disimpan.
+    """
+    if not is_probe(text):
+        return embed_array([text])[0]
+    vec = _vectors.get(probe_key(text))
+    if vec is None:
+        warm_probe_vectors([text])
+        vec = _vectors[probe_key(text)]
+    return vec
+
+
+def embed_queries(queries: List[str]) -> np.ndarray:
+    """(n, dim) query matrix: probes from the table, every other query embedded in one pass (not stored)."""
+    others = [i for i, q in enumerate(queries) if not is_probe(q)]
+    rows: List[Optional[np.ndarray]] = [None if i in others else get_probe_vector(q) for i, q in enumerate(queries)]
+    if others:
+        for i, vec in zip(others, embed_array([queries[i] for i in others])):
+            rows[i] = vec
+    return np.stack(rows)
@@ -0,0 +1,257 @@
+# src/storage/corpus_snapshot.py
+"""
+Read-only snapshot of a Qdrant collection (default: jobs_corpus) for lock-free reads.
+
+Layout (data/snapshots/<collection>/):
+    <version>/vectors.npy    float32 (n, dim), opened with mmap (shared page cache across processes)
+    <version>/payload.json   ids, documents, metadatas, per-field posting lists, per-job fingerprints
+    CURRENT                  name of the active version (swapped atomically with os.replace)
+    STALE                    present when points changed after the last export (e.g. --no-snapshot)
+
+Embedded Qdrant allows one process per storage folder; snapshots let any number of worker
+processes serve `_retrieve` without touching the Qdrant lock.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.config import PROJECT_ROOT, COLL_JOBS_CORPUS
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", str(PROJECT_ROOT / "data" / "snapshots"))
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "2"))          # versi lama yang disimpan
+INDEXED_FIELDS = ("job_id", "source_type", "section", "candidate_id")
+SNAPSHOT_LOAD_RETRIES = 3
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _collection_dir(collection: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, collection)
+
+
+def _stale_path(collection: str) -> str:
+    return os.path.join(_collection_dir(collection), "STALE")
+
+
+def mark_snapshot_stale(collection: str = COLL_JOBS_CORPUS) -> None:
+    """Record that Qdrant changed after the last export (no-op if no snapshot was ever published)."""
+    base = _collection_dir(collection)
+    if not os.path.isdir(base):
+        return
+    with open(_stale_path(collection), "w", encoding="utf-8") as f:
+        f.write(str(time.time()))
+
+
+def is_snapshot_stale(collection: str = COLL_JOBS_CORPUS) -> bool:
+    return os.path.exists(_stale_path(collection))
+
+
+def _fingerprints(metadatas: List[Dict[str, Any]], source_types=("jd", "rubric")) -> Dict[str, str]:
+    """Per job_id hash of the JD/rubric documents: (source_type, section, sha256, chunk count)."""
+    counts: Dict[str, Dict[tuple, int]] = {}
+    for md in metadatas:
+        if md.get("source_type") not in source_types:
+            continue
+        key = (md.get("source_type") or "", md.get("section") or "", md.get("sha256") or "")
+        per_job = counts.setdefault(str(md.get("job_id")), {})
+        per_job[key] = per_job.get(key, 0) + 1
+    out = {}
+    for job_id, c in counts.items():
+        h = hashlib.sha256()
+        for key in sorted(c):
+            h.update(("|".join(key) + f"|{c[key]}\n").encode("utf-8"))
+        out[job_id] = h.hexdigest()
+    return out
+
+
+# =======================
+# Export (writer: ingest script)
+# =======================
+
+def export_snapshot(collection: str = COLL_JOBS_CORPUS) -> Dict[str, Any]:
+    """Dump all points (vectors + payload) of `collection` and publish them as the CURRENT snapshot."""
+    from src.storage.qdrant_store import get_client, ensure_collection
+
+    dim = ensure_collection(collection)
+    client = get_client()
+    # hapus marker sebelum scroll: perubahan selama export menandai ulang snapshot baru sebagai basi
+    try:
+        os.remove(_stale_path(collection))
+    except FileNotFoundError:
+        pass
+    ids: List[str] = []
+    documents: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    vectors: List[np.ndarray] = []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection, limit=512, offset=offset,
+            with_payload=True, with_vectors=True,
+        )
+        for p in points:
+            payload = dict(p.payload or {})
+            ids.append(str(p.id))
+            documents.append(payload.pop("document", "") or "")
+            metadatas.append(payload)
+            vectors.append(np.asarray(p.vector, dtype=np.float32))
+        if offset is None:
+            break
+
+    postings: Dict[str, Dict[str, List[int]]] = {f: {} for f in INDEXED_FIELDS}
+    for row, md in enumerate(metadatas):
+        for f in INDEXED_FIELDS:
+            if f in md and md[f] is not None:
+                postings[f].setdefault(str(md[f]), []).append(row)
+
+    base = _collection_dir(collection)
+    version = f"v{int(time.time() * 1000)}-{os.getpid()}"
+    vdir = os.path.join(base, version)
+    os.makedirs(vdir, exist_ok=True)
+    mat = np.vstack(vectors) if vectors else np.empty((0, dim), dtype=np.float32)
+    np.save(os.path.join(vdir, "vectors.npy"), np.ascontiguousarray(mat, dtype=np.float32))
+    with open(os.path.join(vdir, "payload.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "collection": collection,
+            "dim": int(mat.shape[1]) if mat.ndim == 2 else dim,
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+            "postings": postings,
+            "fingerprints": _fingerprints(metadatas),
+        }, f, ensure_ascii=False)
+
+    # atomic publish: readers see either the old or the new version, never a partial one
+    tmp = os.path.join(base, f"CURRENT.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(base, "CURRENT"))
+
+    _prune_versions(base, keep=version)
+    return {"collection": collection, "version": version, "points": len(ids)}
+
+
+def _prune_versions(base: str, keep: str) -> None:
+    versions = sorted(d for d in os.listdir(base) if d.startswith("v") and os.path.isdir(os.path.join(base, d)))
+    others = [v for v in versions if v != keep]
+    n_keep = max(0, SNAPSHOT_KEEP - 1)        # versi lama yang tetap disimpan selain `keep`
+    for v in (others[:len(others) - n_keep] if n_keep else others):
+        # reader yang masih memegang mmap versi lama tetap aman di POSIX (file unlinked, data tetap)
+        shutil.rmtree(os.path.join(base, v), ignore_errors=True)
+
+
+# =======================
+# Reader (workers)
+# =======================
+
+class CorpusSnapshot:
+    def __init__(self, vdir: str, version: str):
+        self.version = version
+        self.vectors = np.load(os.path.join(vdir, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(vdir, "payload.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.ids: List[str] = data["ids"]
+        self.documents: List[str] = data["documents"]
+        self.metadatas: List[Dict[str, Any]] = data["metadatas"]
+        self.fingerprints: Dict[str, str] = data.get("fingerprints", {})
+        self.postings = {
+            f: {k: np.asarray(v, dtype=np.int64) for k, v in vals.items()}
+            for f, vals in data.get("postings", {}).items()
+        }
+
+    def _rows(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        rows: Optional[np.ndarray] = None
+        for k, v in (where or {}).items():
+            if k in self.postings:
+                cand = self.postings[k].get(str(v), np.empty(0, dtype=np.int64))
+            else:
+                cand = np.asarray([i for i, md in enumerate(self.metadatas) if md.get(k) == v], dtype=np.int64)
+            rows = cand if rows is None else np.intersect1d(rows, cand, assume_unique=True)
+            if rows.size == 0:
+                break
+        return np.arange(len(self.ids)) if rows is None else rows
+
+    def fingerprint(self, job_id: str) -> str:
+        return f"{self.version}:{self.fingerprints.get(str(job_id), '')}"
+
+    def query_topk(self, query_vector, where: Optional[Dict[str, Any]] = None, n_results: int = 5) -> Dict[str, Any]:
+        """Same return shape as qdrant_store.query_topk (Chroma-like)."""
+        rows = self._rows(where)
+        if rows.size == 0:
+            return {"documents": [[]], "metadatas": [[]], "distances": [[]], "ids": [[]]}
+        q = np.asarray(query_vector, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)          # cosine (vektor tersimpan sudah normalized)
+        sims = np.asarray(self.vectors[rows] @ q)
+        k = min(n_results, rows.size)
+        top = np.argpartition(-sims, k - 1)[:k] if k < rows.size else np.arange(rows.size)
+        top = top[np.argsort(-sims[top], kind="stable")]
+        sel = rows[top]
+        return {
+            "documents": [[self.documents[i] for i in sel]],
+            "metadatas": [[self.metadatas[i] for i in sel]],
+            "distances": [[1.0 - float(sims[j]) for j in top]],
+            "ids": [[self.ids[i] for i in sel]],
+        }
+
+
+_snapshots: Dict[str, CorpusSnapshot] = {}
+_lock = threading.Lock()
+
+def current_version(collection: str = COLL_JOBS_CORPUS) -> Optional[str]:
+    try:
+        with open(os.path.join(_collection_dir(collection), "CURRENT"), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+_warned_stale: Dict[str, float] = {}
+
+def _warn_if_stale(collection: str) -> None:
+    try:
+        marked = os.path.getmtime(_stale_path(collection))
+    except OSError:
+        return
+    if _warned_stale.get(collection) != marked:
+        _warned_stale[collection] = marked
+        LOGGER.warning("snapshot of %s is older than the Qdrant collection (ingest ran without "
+                       "export); re-run scripts.ingest_jd_rubric to publish a fresh one", collection)
+
+def get_snapshot(collection: str = COLL_JOBS_CORPUS) -> Optional[CorpusSnapshot]:
+    """
+    Active snapshot (reloaded automatically after a new one is published), or None if never exported.
+    Logs a warning (once per marker) while the snapshot is marked STALE.
+    """
+    version = current_version(collection)
+    if version is None:
+        return None
+    _warn_if_stale(collection)
+    snap = _snapshots.get(collection)
+    if snap is not None and snap.version == version:
+        return snap
+    with _lock:
+        for _ in range(SNAPSHOT_LOAD_RETRIES):
+            snap = _snapshots.get(collection)
+            if snap is not None and snap.version == version:
+                break
+            try:
+                snap = CorpusSnapshot(os.path.join(_collection_dir(collection), version), version)
+            except FileNotFoundError:
+                # versi ini baru saja di-prune oleh export lain: baca ulang CURRENT
+                version = current_version(collection)
+                if version is None:
+                    return None
+                continue
+            _snapshots[collection] = snap
+            break
+        else:
+            # terus kalah balapan dengan export: pakai versi yang sudah termuat (bila ada)
+            snap = _snapshots.get(collection)
+    return snap
@@ -0,0 +1,68 @@
+# src/storage/corpus_version.py
+"""
+Cheap, cross-process version stamp for a Qdrant collection.
+
+    corpus:version:<collection>   hash {job_id → counter, "*" → counter}
+
+Every ingest that changes points of a job bumps its counter (`bump_corpus_version`); reading
+the stamp is one HMGET, so callers (context cache, request dedupe) can key on it per request
+instead of scrolling Qdrant. The stamp also carries the active snapshot version, so publishing
+a new snapshot changes it as well.
+"""
+from __future__ import annotations
+import logging
+from typing import Optional
+
+from src.config import REDIS_URL, COLL_JOBS_CORPUS
+from src.storage.corpus_snapshot import current_version
+
+LOGGER = logging.getLogger(__name__)
+ALL_JOBS = "*"
+
+_redis = None
+_redis_ok = True
+
+
+def version_key(collection: str) -> str:
+    return f"corpus:version:{collection}"
+
+
+def _get_redis():
+    global _redis, _redis_ok
+    if _redis is None and _redis_ok:
+        try:
+            from redis import Redis
+            _redis = Redis.from_url(REDIS_URL)
+        except Exception:
+            _redis_ok = False
+    return _redis
+
+
+def bump_corpus_version(collection: str = COLL_JOBS_CORPUS, job_id: Optional[str] = None) -> bool:
+    """Mark `job_id` (None = every job) of `collection` as changed. False if Redis is unreachable."""
+    r = _get_redis()
+    if r is None:
+        return False
+    try:
+        r.hincrby(version_key(collection), ALL_JOBS if job_id is None else str(job_id), 1)
+        return True
+    except Exception as e:
+        # tanpa Redis, cache lintas proses tidak bisa di-invalidate → pembaca harus fallback
+        LOGGER.warning("corpus version bump failed collection=%s job_id=%s: %s", collection, job_id, e)
+        return False
+
+
+def corpus_version(collection: str = COLL_JOBS_CORPUS, job_id: Optional[str] = None, redis_conn=None) -> Optional[str]:
+    """
+    "<snapshot version>:<all-jobs counter>.<job counter>", or None if Redis is unreachable
+    (callers then must not trust any cached entry). Pass `redis_conn` to reuse a pooled connection.
+    """
+    r = redis_conn if redis_conn is not None else _get_redis()
+    if r is None:
+        return None
+    try:
+        fields = [ALL_JOBS] if job_id is None else [ALL_JOBS, str(job_id)]
+        counters = [int(v or 0) for v in r.hmget(version_key(collection), fields)]
+    except Exception:
+        return None
+    return f"{current_version(collection) or ''}:" + ".".join(str(c) for c in counters)
@@ -1,47 +1,92 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Union
 import os, uuid
 
+import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.http.models import (
     Distance, VectorParams, PointStruct,
-    Filter, FieldCondition, MatchValue,
+    Filter, FieldCondition, MatchValue, PointIdsList,
 )
 
+from src.config import QDRANT_PATH
 from src.models.embedder import get_model
 
 _client: Optional[QdrantClient] = None
+# metadata koleksi yang sudah dicek (name -> vector dim); hidup selama client terbuka
+_collections: Dict[str, int] = {}
+
+class QdrantLocked(RuntimeError):
+    """The embedded store folder is held by another process (e.g. a worker with QDRANT_KEEP_OPEN=1)."""
+
+
 def get_client() -> QdrantClient:
     global _client
     if _client is None:
-        db_path = os.path.abspath("data/qdrant")
+        db_path = os.path.abspath(QDRANT_PATH)
         os.makedirs(db_path, exist_ok=True)
         # Local mode: penyimpanan di folder, tanpa server/Docker
-        _client = QdrantClient(path=db_path)
+        try:
+            _client = QdrantClient(path=db_path)
+        except RuntimeError as e:
+            if "already accessed" not in str(e):
+                raise
+            raise QdrantLocked(
+                f"Qdrant storage {db_path} is locked by another process. A running worker / pool keeps "
+                "it open for its whole life (QDRANT_KEEP_OPEN=1): stop it before ingesting and start it "
+                "again afterwards, set QDRANT_KEEP_OPEN=0 on the workers, or use a Qdrant server."
+            ) from e
     return _client
 
-def ensure_collection(name: str):
+def ensure_collection(name: str, dim: Optional[int] = None) -> int:
+    """Create the collection if missing; returns its vector size. Checked once per client lifetime."""
+    known = _collections.get(name)
+    if known is not None:
+        return known
     client = get_client()
-    dim = get_model().get_sentence_embedding_dimension()
     try:
-        client.get_collection(name)
+        info = client.get_collection(name)
+        vectors = info.config.params.vectors
+        size = int(getattr(vectors, "size", 0) or 0)
     except Exception:
+        size = int(dim or get_model().get_sentence_embedding_dimension())
         client.recreate_collection(
             collection_name=name,
-            vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+            vectors_config=VectorParams(size=size, distance=Distance.COSINE),
         )
+    _collections[name] = size
+    return size
+
+def collection_dim(name: str) -> int:
+    return ensure_collection(name)
+
+def _as_vector(v) -> List[float]:
+    """Boundary konversi: ndarray → list float (format yang dikirim ke Qdrant)."""
+    if isinstance(v, np.ndarray):
+        return v.astype(np.float32, copy=False).tolist()
+    return list(v)
+
+def _where_filter(where: Optional[Dict[str, Any]]) -> Optional[Filter]:
+    if not where:
+        return None
+    # sederhana: semua kondisi exact match sebagai must
+    return Filter(must=[
+        FieldCondition(key=k, match=MatchValue(value=v))
+        for k, v in where.items()
+    ])
 
 def add_documents(
     collection_name: str,
     documents: List[str],
     metadatas: List[Dict[str, Any]],
     ids: Optional[List[str]] = None,
-    embeddings: Optional[List[List[float]]] = None,
+    embeddings: Optional[Union[np.ndarray, List[List[float]]]] = None,
 ):
-    ensure_collection(collection_name)
+    dim = len(embeddings[0]) if embeddings is not None and len(embeddings) else None
+    ensure_collection(collection_name, dim=dim)
     if ids is None:
         ids = [str(uuid.uuid4()) for _ in documents]
     points = [
-        PointStruct(id=ids[i], vector=embeddings[i], payload={
+        PointStruct(id=ids[i], vector=_as_vector(embeddings[i]), payload={
             **metadatas[i], "document": documents[i]
         })
         for i in range(len(documents))
@@ -52,22 +97,16 @@ def add_documents(
 
 def query_topk(
     collection_name: str,
-    query_vector: List[float],
+    query_vector: Union[np.ndarray, List[float]],
     where: Optional[Dict[str, Any]] = None,
     n_results: int = 5,
 ):
     ensure_collection(collection_name)
     client = get_client()
-    flt = None
-    if where:
-        # sederhana: semua kondisi exact match sebagai must
-        flt = Filter(must=[
-            FieldCondition(key=k, match=MatchValue(value=v))
-            for k, v in where.items()
-        ])
+    flt = _where_filter(where)
     hits = client.search(
         collection_name=collection_name,
-        query_vector=query_vector,
+        query_vector=_as_vector(query_vector),
         limit=n_results,
         query_filter=flt,
         with_payload=True,
@@ -79,9 +118,43 @@ def query_topk(
     ids = [[h.id for h in hits]]
     return {"documents": documents, "metadatas": metadatas, "distances": distances, "ids": ids}
 
+def scroll_points(
+    collection_name: str,
+    where: Optional[Dict[str, Any]] = None,
+    with_vectors: bool = False,
+    with_payload: Union[bool, List[str]] = True,
+) -> list:
+    """All points matching `where` (exact match), paged through scroll."""
+    ensure_collection(collection_name)
+    client = get_client()
+    flt = _where_filter(where)
+    out = []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=flt,
+            limit=256,
+            offset=offset,
+            with_payload=with_payload,
+            with_vectors=with_vectors,
+        )
+        out.extend(points)
+        if offset is None:
+            break
+    return out
+
+def delete_points(collection_name: str, ids: Sequence[str]) -> int:
+    if not ids:
+        return 0
+    ensure_collection(collection_name)
+    get_client().delete(collection_name=collection_name, points_selector=PointIdsList(points=list(ids)))
+    return len(ids)
+
 def close_client():
     """Close Qdrant local client gracefully (avoid shutdown noise on Windows)."""
     global _client
+    _collections.clear()
     if _client is not None:
         try:
             _client.close()  # releases portalocker
@@ -0,0 +1,49 @@
+# src/utils/timing.py
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# on_event(kind, stage name, ms): kind = "start" | "end"; ms None for "start"
+StageListener = Callable[[str, str, Optional[float]], None]
+
+
+class StageTimer:
+    """Thread-safe wall-clock timings per named stage (ms). Stages may run concurrently."""
+    def __init__(self, on_event: Optional[StageListener] = None):
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.on_event = on_event
+
+    def _notify(self, kind: str, name: str, ms: Optional[float]) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(kind, name, ms)
+        except Exception:
+            pass   # progress reporting must never break the pipeline
+
+    @contextmanager
+    def stage(self, name: str):
+        self._notify("start", name, None)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = (time.perf_counter() - t0) * 1000.0
+            with self._lock:
+                self.timings[name] = self.timings.get(name, 0.0) + dt
+            self._notify("end", name, round(dt, 1))
+
+    def add(self, name: str, ms: float) -> None:
+        """Record time measured elsewhere (e.g. interleaved stages of a streaming loop)."""
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + ms
+        self._notify("end", name, round(ms, 1))
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            out = {k: round(v, 1) for k, v in self.timings.items()}
+        out["total"] = round((time.perf_counter() - self._t0) * 1000.0, 1)
+        return out
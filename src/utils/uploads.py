@@ -1,9 +1,17 @@
 # src/utils/uploads.py
+import hashlib
+import json
 import os
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import uuid4
 from fastapi import UploadFile
-from src.config import UPLOAD_DIR
+from starlette.concurrency import run_in_threadpool
+from src.config import UPLOAD_DIR, UPLOAD_MAX_FILE_MB, UPLOAD_MAX_BATCH_MB, UPLOAD_CHUNK_BYTES
+
+MANIFEST_NAME = "manifest.json"
+
+class UploadTooLarge(Exception):
+    """A file or the whole batch exceeded the configured size cap."""
 
 def new_batch_id() -> str:
     return str(uuid4())
@@ -15,6 +23,7 @@ def save_uploads(files: List[UploadFile], batch_id: str, subdir: str) -> List[st
     """
     Simpan file ke: UPLOAD_DIR/<batch_id>/<subdir>/<filename>
     Return: list path absolut.
+    (Sinkron; dari endpoint async pakai `save_uploads_streaming`.)
     """
     base = _abs(UPLOAD_DIR, batch_id, subdir)
     os.makedirs(base, exist_ok=True)
@@ -23,10 +32,107 @@ def save_uploads(files: List[UploadFile], batch_id: str, subdir: str) -> List[st
         name = os.path.basename(f.filename or "upload.bin")
         dst = _abs(base, name)
         with open(dst, "wb") as out:
-            out.write(f.file.read())
+            while True:
+                chunk = f.file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                out.write(chunk)
         paths.append(dst)
     return paths
 
+
+class UploadBudget:
+    """Per-file and per-batch byte caps shared by every file of one upload request."""
+    def __init__(self, max_file_bytes: int = int(UPLOAD_MAX_FILE_MB * 1024 * 1024),
+                 max_batch_bytes: int = int(UPLOAD_MAX_BATCH_MB * 1024 * 1024)):
+        self.max_file_bytes = max_file_bytes
+        self.max_batch_bytes = max_batch_bytes
+        self.used = 0
+
+    def take(self, name: str, file_bytes: int, n: int) -> None:
+        self.used += n
+        if file_bytes > self.max_file_bytes:
+            raise UploadTooLarge(f"{name} exceeds the {self.max_file_bytes / (1024 * 1024):g} MB per-file limit")
+        if self.used > self.max_batch_bytes:
+            raise UploadTooLarge(f"upload exceeds the {self.max_batch_bytes / (1024 * 1024):g} MB per-batch limit")
+
+
+async def _stream_one(f: UploadFile, dst: str, budget: UploadBudget) -> Dict[str, Any]:
+    """Copy one upload to `dst` in chunks; disk I/O runs in the threadpool, sha256 is computed on the way."""
+    h = hashlib.sha256()
+    size = 0
+    tmp = f"{dst}.part"
+    out = await run_in_threadpool(open, tmp, "wb")
+    try:
+        while True:
+            chunk = await f.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            budget.take(os.path.basename(dst), size, len(chunk))
+            h.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+        await run_in_threadpool(out.close)
+        await run_in_threadpool(os.replace, tmp, dst)
+    except BaseException:
+        out.close()
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return {"path": dst, "sha256": h.hexdigest(), "bytes": size}
+
+
+async def save_uploads_streaming(
+    files: List[UploadFile],
+    batch_id: str,
+    subdir: str,
+    budget: Optional[UploadBudget] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Async variant of `save_uploads` for the API: chunked writes off the event loop,
+    size caps (UploadTooLarge), and content hashes recorded in the batch manifest.
+    Starlette has already spooled each part (SpooledTemporaryFile) by the time this runs;
+    only the copy from that spool into UPLOAD_DIR is streamed here.
+    Return: [{"path", "sha256", "bytes"}, ...]
+    """
+    budget = budget or UploadBudget()
+    base = _abs(UPLOAD_DIR, batch_id, subdir)
+    await run_in_threadpool(os.makedirs, base, exist_ok=True)
+    saved: List[Dict[str, Any]] = []
+    for f in files:
+        name = os.path.basename(f.filename or "upload.bin")
+        saved.append(await _stream_one(f, _abs(base, name), budget))
+    await run_in_threadpool(_update_manifest, batch_id, saved)
+    return saved
+
+
+def _update_manifest(batch_id: str, saved: List[Dict[str, Any]]) -> None:
+    path = _abs(UPLOAD_DIR, batch_id, MANIFEST_NAME)
+    data = _read_manifest(path)
+    for item in saved:
+        data[item["path"]] = {"sha256": item["sha256"], "bytes": item["bytes"]}
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+
+def _read_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def batch_file_hashes(batch_id: str) -> Dict[str, str]:
+    """path → sha256 recorded while the batch was uploaded (empty for older batches)."""
+    data = _read_manifest(_abs(UPLOAD_DIR, batch_id, MANIFEST_NAME))
+    return {p: v.get("sha256") for p, v in data.items() if v.get("sha256")}
+
+
 def list_batch_paths(batch_id: str) -> Tuple[List[str], List[str]]:
     """
     Ambil semua file yang sudah di-upload untuk batch tertentu.
@@ -38,6 +144,6 @@ def list_batch_paths(batch_id: str) -> Tuple[List[str], List[str]]:
     def _ls(d: str) -> List[str]:
         if not os.path.isdir(d):
             return []
-        return [_abs(d, f) for f in os.listdir(d) if os.path.isfile(_abs(d, f))]
+        return [_abs(d, f) for f in os.listdir(d) if os.path.isfile(_abs(d, f)) and not f.endswith(".part")]
 
     return _ls(cv_dir), _ls(pr_dir)
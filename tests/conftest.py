@@ -0,0 +1,28 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+# modul diimpor sebagai `src.*` dari root repo
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+# db terpisah supaya test tidak menyentuh antrean / cache di db REDIS_URL
+TEST_REDIS_URL = "redis://localhost:6379/15"
+
+
+@pytest.fixture
+def redis_conn():
+    """Empty Redis db for one test; skipped when no server is reachable."""
+    from redis import Redis
+    from redis.exceptions import ConnectionError as RedisConnectionError
+
+    conn = Redis.from_url(TEST_REDIS_URL)
+    try:
+        conn.ping()
+    except RedisConnectionError:
+        pytest.skip(f"no Redis at {TEST_REDIS_URL}")
+    conn.flushdb()
+    yield conn
+    conn.flushdb()
+    conn.close()
@@ -0,0 +1,99 @@
+# tests/test_caches.py
+"""SQLite embedding / document caches: trigger-kept byte totals, LRU eviction and expiry."""
+import time
+
+import numpy as np
+import pytest
+
+from src.io.doc_cache import DocumentCache
+from src.models.embedding_cache import EmbeddingCache
+
+DIM = 4
+VEC_BYTES = DIM * 4
+
+
+def _vec(i):
+    return np.full(DIM, float(i), dtype=np.float32)
+
+
+def _real_total(conn, table):
+    return conn.execute(f"SELECT COALESCE(SUM(nbytes), 0) FROM {table}").fetchone()[0]
+
+
+@pytest.fixture
+def emb(tmp_path):
+    c = EmbeddingCache(path=str(tmp_path / "emb.sqlite"), max_bytes=10 * VEC_BYTES, touch_sec=0)
+    yield c
+    c.close()
+
+
+@pytest.fixture
+def docs(tmp_path):
+    c = DocumentCache(path=str(tmp_path / "docs.sqlite"), max_bytes=1000, ttl=3600)
+    yield c
+    c.close()
+
+
+def test_embedding_cache_evicts_least_recently_used(emb):
+    for i in range(5):
+        emb.put_many({f"k{i}": _vec(i)})
+        time.sleep(0.002)
+    assert set(emb.get_many(["k0"])) == {"k0"}         # touch: k0 jadi paling baru
+    time.sleep(0.002)
+    for i in range(5, 12):
+        emb.put_many({f"k{i}": _vec(i)})
+        time.sleep(0.002)
+    found = emb.get_many([f"k{i}" for i in range(12)])
+    assert "k0" in found and "k1" not in found
+    assert emb._total_bytes() == _real_total(emb._conn, "emb") <= 10 * VEC_BYTES
+    np.testing.assert_array_equal(found["k11"], _vec(11))
+
+
+def test_embedding_cache_expired_rows_miss_and_are_purged(emb):
+    emb.put_many({"keep": _vec(1)})
+    emb.put_many({"tmp": _vec(2)}, ttl=60)
+    emb._conn.execute("UPDATE emb SET expires=? WHERE key='tmp'", (time.time() - 1,))
+    assert set(emb.get_many(["keep", "tmp"])) == {"keep"}
+    emb.put_many({"other": _vec(3)})                   # put membersihkan baris kedaluwarsa
+    assert emb._conn.execute("SELECT COUNT(*) FROM emb WHERE key='tmp'").fetchone()[0] == 0
+    assert emb._total_bytes() == _real_total(emb._conn, "emb") == 2 * VEC_BYTES
+
+
+def test_embedding_cache_permanent_put_clears_expiry(emb):
+    emb.put_many({"k": _vec(1)}, ttl=60)
+    emb.put_many({"k": _vec(1)})
+    assert emb._conn.execute("SELECT expires FROM emb WHERE key='k'").fetchone()[0] is None
+    assert emb._total_bytes() == VEC_BYTES
+
+
+def test_doc_cache_replace_keeps_total_exact(docs):
+    docs.put("a", ["x" * 100])
+    docs.put("a", ["x" * 300])                         # upsert: ukuran baru menggantikan yang lama
+    docs.put("b", ["y" * 50])
+    assert docs.get("a") == ["x" * 300]
+    assert docs._total_bytes() == _real_total(docs._conn, "docs") == docs.stats()["bytes"]
+
+
+def test_doc_cache_evicts_least_recently_used(docs):
+    for key in "abcd":
+        docs.put(key, ["x" * 200])
+        time.sleep(0.002)
+    assert docs.get("a") is not None                   # a jadi paling baru
+    time.sleep(0.002)
+    docs.put("e", ["x" * 200])                         # > 1000 byte: buang LRU sampai ~90%
+    assert docs.get("b") is None and docs.get("a") is not None
+    assert docs._total_bytes() == _real_total(docs._conn, "docs") <= 900
+
+
+def test_doc_cache_entries_expire_after_ttl(docs):
+    docs.put("old", ["text"])
+    docs.put("new", ["text"])
+    docs._conn.execute("UPDATE docs SET created=created-7200 WHERE key='old'")
+    assert docs.get("old") is None
+    assert docs.get("new") == ["text"]
+    assert docs._total_bytes() == _real_total(docs._conn, "docs")
+
+
+def test_doc_cache_skips_oversized_pages(docs):
+    docs.put("big", ["x" * 2000])
+    assert docs.get("big") is None and docs._total_bytes() == 0
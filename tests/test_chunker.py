@@ -0,0 +1,34 @@
+# tests/test_chunker.py
+"""Streaming chunker must match chunk_by_words on the joined text, whatever the page split."""
+import random
+
+import pytest
+
+from src.processing.chunker import chunk_by_words, iter_chunks_by_words
+
+
+def _pages(n_words, n_pages, seed):
+    rnd = random.Random(seed)
+    words = [f"w{i}" for i in range(n_words)]
+    cuts = sorted(rnd.choices(range(n_words + 1), k=n_pages - 1))
+    bounds = [0, *cuts, n_words]
+    # halaman boleh kosong / hanya spasi
+    return [" ".join(words[a:b]) + rnd.choice(["", " ", "\n"]) for a, b in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("chunk_words, overlap", [(5, 2), (10, 0), (7, 6), (4, 4), (3, 10)])
+@pytest.mark.parametrize("n_words", [0, 1, 4, 5, 23, 100])
+def test_streaming_matches_batch(chunk_words, overlap, n_words):
+    for seed in range(5):
+        pages = _pages(n_words, n_pages=1 + seed, seed=seed)
+        expected = chunk_by_words(" ".join(pages), chunk_words, overlap)
+        assert list(iter_chunks_by_words(pages, chunk_words, overlap)) == expected
+
+
+def test_streaming_is_lazy():
+    def pages():
+        yield "a b c d e f"
+        raise AssertionError("read past the first chunk")
+
+    it = iter_chunks_by_words(pages(), 3, 1)
+    assert next(it) == "a b c"
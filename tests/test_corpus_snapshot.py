@@ -0,0 +1,95 @@
+# tests/test_corpus_snapshot.py
+"""Snapshot publish / swap: readers follow CURRENT, survive a prune race, keep SNAPSHOT_KEEP versions."""
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import src.storage.corpus_snapshot as cs
+import src.storage.qdrant_store as qdrant_store
+
+COLL = "jobs_corpus_test"
+DIM = 4
+
+
+class FakeClient:
+    """Qdrant `scroll` over an in-memory point list (two pages)."""
+    def __init__(self, points):
+        self.points = points
+
+    def scroll(self, collection_name, limit, offset=None, with_payload=True, with_vectors=True):
+        start = offset or 0
+        page = self.points[start:start + 2]
+        nxt = start + 2 if start + 2 < len(self.points) else None
+        return page, nxt
+
+
+def _point(i, job_id, section):
+    vec = np.zeros(DIM, dtype=np.float32)
+    vec[i % DIM] = 1.0
+    payload = {"document": f"doc {i}", "job_id": job_id, "source_type": "rubric",
+               "section": section, "sha256": f"sha{job_id}"}
+    return SimpleNamespace(id=f"p{i}", payload=payload, vector=vec.tolist())
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """Point export_snapshot at a fake Qdrant and SNAPSHOT_DIR at tmp_path; returns the point list."""
+    points = [_point(0, "j1", "rubric_cv"), _point(1, "j1", "rubric_project"), _point(2, "j2", "rubric_cv")]
+    monkeypatch.setattr(cs, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(cs, "_snapshots", {})
+    monkeypatch.setattr(cs, "_warned_stale", {})
+    monkeypatch.setattr(qdrant_store, "ensure_collection", lambda name: DIM)
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: FakeClient(points))
+    return points
+
+
+def _versions(tmp_path):
+    return sorted(d for d in os.listdir(tmp_path / COLL) if d.startswith("v"))
+
+
+def test_export_publishes_and_reader_filters(corpus):
+    info = cs.export_snapshot(COLL)
+    snap = cs.get_snapshot(COLL)
+    assert snap.version == info["version"] and info["points"] == 3
+    hits = snap.query_topk([0, 1, 0, 0], where={"job_id": "j1", "section": "rubric_project"}, n_results=5)
+    assert hits["ids"] == [["p1"]] and hits["documents"] == [["doc 1"]]
+    assert snap.query_topk([1, 0, 0, 0], where={"job_id": "nope"})["ids"] == [[]]
+
+
+def test_reader_swaps_to_new_version_and_fingerprint_changes(corpus, tmp_path):
+    cs.export_snapshot(COLL)
+    old = cs.get_snapshot(COLL)
+    assert cs.get_snapshot(COLL) is old                 # versi sama: tidak dimuat ulang
+    corpus.append(_point(3, "j1", "rubric_cv"))
+    cs.export_snapshot(COLL)
+    new = cs.get_snapshot(COLL)
+    assert new is not old and new.version == cs.current_version(COLL)
+    assert new.fingerprint("j1") != old.fingerprint("j1")
+    assert len(old.ids) == 3 and len(new.ids) == 4      # reader lama tetap utuh (mmap)
+
+
+def test_prune_keeps_snapshot_keep_versions(corpus, tmp_path, monkeypatch):
+    monkeypatch.setattr(cs, "SNAPSHOT_KEEP", 2)
+    published = [cs.export_snapshot(COLL)["version"] for _ in range(4)]
+    assert _versions(tmp_path) == sorted(published[-2:])
+    assert cs.current_version(COLL) == published[-1]
+
+
+def test_pruned_version_falls_back_to_current(corpus, monkeypatch):
+    latest = cs.export_snapshot(COLL)["version"]
+    # CURRENT pertama menunjuk versi yang baru saja di-prune oleh export lain
+    reads = iter(["v0-gone", latest])
+    monkeypatch.setattr(cs, "current_version", lambda collection=COLL: next(reads))
+    assert cs.get_snapshot(COLL).version == latest
+
+
+def test_stale_marker_round_trip(corpus):
+    cs.mark_snapshot_stale(COLL)                        # belum pernah export: no-op
+    assert not cs.is_snapshot_stale(COLL)
+    cs.export_snapshot(COLL)
+    cs.mark_snapshot_stale(COLL)
+    assert cs.is_snapshot_stale(COLL)
+    cs.export_snapshot(COLL)
+    assert not cs.is_snapshot_stale(COLL)
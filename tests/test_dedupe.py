@@ -0,0 +1,111 @@
+# tests/test_dedupe.py
+"""single_flight: one owner per fingerprint, CAS replacement of failed tasks, timeout fallback."""
+import threading
+import time
+
+import pytest
+
+import src.queue.dedupe as dedupe
+from src.queue.results import result_key
+
+FP = "f" * 64
+
+
+def _set_status(conn, task_id, status):
+    conn.hset(result_key(task_id), "status", status)
+
+
+class Creator:
+    """create() stand-in: returns t1, t2, ... and marks the task queued (what enqueue does)."""
+    def __init__(self, conn, delay=0.0):
+        self.conn, self.delay, self.ids = conn, delay, []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        time.sleep(self.delay)
+        with self._lock:
+            task_id = f"t{len(self.ids) + 1}"
+            self.ids.append(task_id)
+        _set_status(self.conn, task_id, "queued")
+        return task_id
+
+
+def test_duplicates_attach_to_the_first_task(redis_conn):
+    create = Creator(redis_conn)
+    assert dedupe.single_flight(redis_conn, FP, create) == ("t1", True)
+    assert dedupe.single_flight(redis_conn, FP, create) == ("t1", False)
+    assert redis_conn.get(dedupe.dedupe_key(FP)) == b"t1"
+
+
+def test_concurrent_requests_create_once(redis_conn):
+    create = Creator(redis_conn, delay=0.1)
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(dedupe.single_flight(redis_conn, FP, create)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert create.ids == ["t1"]
+    assert sorted(out) == [("t1", False)] * 7 + [("t1", True)]
+
+
+def test_failed_task_is_replaced(redis_conn):
+    create = Creator(redis_conn)
+    dedupe.single_flight(redis_conn, FP, create)
+    _set_status(redis_conn, "t1", "failed")
+    assert dedupe.single_flight(redis_conn, FP, create) == ("t2", True)
+    assert redis_conn.get(dedupe.dedupe_key(FP)) == b"t2"
+
+
+def test_completed_task_rerun_when_not_reused(redis_conn):
+    create = Creator(redis_conn)
+    dedupe.single_flight(redis_conn, FP, create)
+    _set_status(redis_conn, "t1", "completed")
+    assert dedupe.single_flight(redis_conn, FP, create) == ("t1", False)
+    assert dedupe.single_flight(redis_conn, FP, create, reuse_finished=False) == ("t2", True)
+
+
+def test_cas_does_not_overwrite_a_newer_value(redis_conn):
+    key = dedupe.dedupe_key(FP)
+    redis_conn.set(key, "t9")
+    cas = redis_conn.register_script(dedupe._CAS_LUA)
+    assert cas(keys=[key], args=["t1", "pending:x", 1000]) == 0
+    assert redis_conn.get(key) == b"t9"
+    assert cas(keys=[key], args=["t9", "", 0]) == 1
+    assert redis_conn.get(key) is None
+
+
+def test_create_error_releases_the_claim(redis_conn):
+    def boom():
+        raise RuntimeError("enqueue failed")
+
+    with pytest.raises(RuntimeError):
+        dedupe.single_flight(redis_conn, FP, boom)
+    assert redis_conn.get(dedupe.dedupe_key(FP)) is None
+    assert dedupe.single_flight(redis_conn, FP, Creator(redis_conn)) == ("t1", True)
+
+
+def test_stuck_claim_times_out_and_runs_without_dedupe(redis_conn):
+    key = dedupe.dedupe_key(FP)
+    redis_conn.set(key, "pending:other-owner", px=60_000)
+    create = Creator(redis_conn)
+    t0 = time.time()
+    assert dedupe.single_flight(redis_conn, FP, create, wait=0.2) == ("t1", True)
+    assert 0.2 <= time.time() - t0 < 2
+    assert redis_conn.get(key) == b"pending:other-owner"      # klaim pemilik lain tidak disentuh
+
+
+def test_claim_published_while_waiting_is_attached(redis_conn):
+    key = dedupe.dedupe_key(FP)
+    redis_conn.set(key, "pending:owner", px=60_000)
+
+    def owner_finishes():
+        time.sleep(0.1)
+        _set_status(redis_conn, "t7", "queued")
+        redis_conn.set(key, "t7")
+
+    threading.Thread(target=owner_finishes).start()
+    create = Creator(redis_conn)
+    assert dedupe.single_flight(redis_conn, FP, create, wait=2.0) == ("t7", False)
+    assert create.ids == []
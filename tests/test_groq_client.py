@@ -0,0 +1,195 @@
+# tests/test_groq_client.py
+"""Retry / backoff / concurrency policy of call_groq / acall_groq against a local mock server."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import src.llm.groq_client as gc
+
+OK_BODY = {
+    "choices": [{"message": {"content": "ok"}}],
+    "usage": {"prompt_tokens": 3, "completion_tokens": 1},
+}
+
+
+class MockGroq:
+    """Serves a scripted list of (status, headers) replies, then 200; tracks concurrency."""
+    def __init__(self, script=(), delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def handle(self, handler: BaseHTTPRequestHandler) -> None:
+        handler.rfile.read(int(handler.headers.get("Content-Length") or 0))
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            status, headers = self.script.pop(0) if self.script else (200, {})
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            body = json.dumps(OK_BODY if status == 200 else {"error": "mock"}).encode()
+            handler.send_response(status)
+            for k, v in headers.items():
+                handler.send_header(k, v)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def mock_groq(monkeypatch):
+    servers = []
+
+    def start(script=(), delay=0.0):
+        mock = MockGroq(script, delay)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                mock.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setattr(gc, "GROQ_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+        return mock
+
+    monkeypatch.setattr(gc, "GROQ_API_KEY", "test-key")
+    monkeypatch.setattr(gc, "GROQ_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(gc, "GROQ_MAX_RETRIES", 3)
+    monkeypatch.setattr(gc, "_stats", gc.GroqStats())
+    gc.close_groq()
+    yield start
+    gc.close_groq()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    """Record every backoff delay call_groq sleeps for."""
+    seen = []
+    original = gc._backoff_delay
+
+    def recording(attempt, retry_after=None):
+        d = original(attempt, retry_after)
+        seen.append((attempt, retry_after, d))
+        return d
+
+    monkeypatch.setattr(gc, "_backoff_delay", recording)
+    return seen
+
+
+def _msgs():
+    return [{"role": "user", "content": "hi"}]
+
+
+def _acall(messages):
+    async def run():
+        try:
+            return await gc.acall_groq(messages)
+        finally:
+            await gc.aclose_groq()
+    return asyncio.run(run())
+
+
+@pytest.fixture(params=["sync", "async"])
+def call(request):
+    """call_groq or acall_groq (run on a fresh event loop); both share one retry policy."""
+    return gc.call_groq if request.param == "sync" else _acall
+
+
+def test_429_honors_retry_after(mock_groq, delays, call):
+    mock = mock_groq(script=[(429, {"Retry-After": "1"})])
+    t0 = time.perf_counter()
+    assert call(_msgs()) == "ok"
+    assert time.perf_counter() - t0 >= 0.95         # backoff base 10 ms, server asked for 1 s
+    assert mock.requests == 2
+    assert delays[0][1] == "1" and delays[0][2] >= 1.0
+    stats = gc.get_groq_stats()
+    assert stats["calls"] == 1 and stats["retries"] == 1 and stats["errors"] == 0
+
+
+def test_5xx_retries_with_exponential_backoff(mock_groq, delays, monkeypatch, call):
+    monkeypatch.setattr(gc.random, "uniform", lambda lo, hi: hi)    # jitter → batas atas
+    mock = mock_groq(script=[(503, {}), (502, {}), (500, {})])
+    assert call(_msgs()) == "ok"
+    assert mock.requests == 4
+    assert [round(d, 3) for _, _, d in delays] == [0.01, 0.02, 0.04]
+    assert gc.get_groq_stats()["retries"] == 3
+
+
+def test_backoff_capped_at_max(monkeypatch):
+    monkeypatch.setattr(gc, "GROQ_BACKOFF_MAX", 2.0)
+    monkeypatch.setattr(gc.random, "uniform", lambda lo, hi: hi)
+    assert gc._backoff_delay(10) == 2.0
+    assert gc._backoff_delay(0, "3600") == 2.0       # Retry-After juga dibatasi GROQ_BACKOFF_MAX
+
+
+def test_gives_up_after_max_retries(mock_groq, delays, call):
+    mock = mock_groq(script=[(500, {})] * 10)
+    with pytest.raises(RuntimeError, match="Groq error 500"):
+        call(_msgs())
+    assert mock.requests == gc.GROQ_MAX_RETRIES + 1
+    assert len(delays) == gc.GROQ_MAX_RETRIES
+    stats = gc.get_groq_stats()
+    assert stats["errors"] == 1 and stats["retries"] == gc.GROQ_MAX_RETRIES
+
+
+def test_non_retryable_status_fails_fast(mock_groq, delays, call):
+    mock = mock_groq(script=[(400, {})])
+    with pytest.raises(RuntimeError, match="Groq error 400"):
+        call(_msgs())
+    assert mock.requests == 1 and delays == []
+
+
+def test_semaphore_bounds_concurrent_calls(mock_groq, monkeypatch):
+    monkeypatch.setattr(gc, "_sync_limiter", threading.BoundedSemaphore(2))
+    mock = mock_groq(delay=0.2)
+    errors = []
+
+    def worker():
+        try:
+            gc.call_groq(_msgs())
+        except Exception as e:      # pragma: no cover - dilaporkan lewat assert di bawah
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert errors == []
+    assert mock.requests == 6
+    assert mock.max_in_flight == 2
+
+
+def test_async_semaphore_bounds_concurrent_calls(mock_groq, monkeypatch):
+    monkeypatch.setattr(gc, "GROQ_MAX_CONCURRENCY", 2)
+    mock = mock_groq(delay=0.2)
+
+    async def run():
+        try:
+            return await asyncio.gather(*(gc.acall_groq(_msgs()) for _ in range(6)))
+        finally:
+            await gc.aclose_groq()
+
+    assert asyncio.run(run()) == ["ok"] * 6
+    assert mock.requests == 6
+    assert mock.max_in_flight == 2
@@ -0,0 +1,61 @@
+# tests/test_jobs.py
+"""Job bodies called outside RQ: no Redis required, and Redis errors never skip cleanup."""
+import pytest
+
+import src.queue.jobs as jobs
+
+
+class BrokenRedis:
+    """Every Redis call fails (server gone mid-job)."""
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("redis down")
+        return fail
+
+
+@pytest.fixture
+def batch_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "UPLOAD_DIR", str(tmp_path))
+    d = tmp_path / "b1"
+    d.mkdir()
+    (d / "cv.txt").write_text("cv")
+    return d
+
+
+@pytest.fixture
+def fake_eval(monkeypatch):
+    calls = []
+
+    def evaluate(**kwargs):
+        calls.append(kwargs)
+        return {"cv_match_rate": 0.8, "meta": {}}
+
+    monkeypatch.setattr(jobs, "evaluate_candidate_from_files", evaluate)
+    return calls
+
+
+def test_direct_call_without_redis_returns_result(batch_dir, fake_eval):
+    out = jobs.run_eval_upload_job("job", [str(batch_dir / "cv.txt")], [], "b1")
+    assert out == {"status": "completed", "result": {"cv_match_rate": 0.8, "meta": {}}}
+    assert fake_eval[0]["on_stage"] is None
+    assert not batch_dir.exists()
+
+
+def test_redis_error_on_status_still_cleans_up(batch_dir, fake_eval):
+    with pytest.raises(ConnectionError):
+        jobs.run_eval_upload_job("job", [str(batch_dir / "cv.txt")], [], "b1", redis_conn=BrokenRedis())
+    assert fake_eval == []               # gagal sebelum evaluasi, tapi batch tetap dibersihkan
+    assert not batch_dir.exists()
+
+
+def test_bulk_direct_call_without_redis(batch_dir, monkeypatch):
+    def bulk(job_id, candidates, on_result=None, bypass_cache=False):
+        items = {c["candidate_id"]: {"status": "completed", "result": {"meta": {}}} for c in candidates}
+        for cid, item in items.items():
+            on_result(cid, item)
+        return items
+
+    monkeypatch.setattr(jobs, "evaluate_candidates_bulk", bulk)
+    out = jobs.run_eval_bulk_job("job", [{"batch_id": "b1", "cv_paths": [], "project_paths": []}])
+    assert out["done"] == 1 and out["ok"] == 1 and "b1" in out["results"]
+    assert not batch_dir.exists()
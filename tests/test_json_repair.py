@@ -0,0 +1,79 @@
+# tests/test_json_repair.py
+"""Local recovery of LLM JSON: truncation repair and field coercion onto the right scale."""
+from typing import Any, Dict, List
+
+import pytest
+from pydantic import BaseModel
+
+from src.llm.json_repair import coerce_llm_payload, extract_json_object, recover_model, repair_json
+
+
+class Result(BaseModel):
+    # bentuk yang sama dengan evaluator.LLMResult, tanpa mengimpor pipeline evaluasi
+    cv: Dict[str, Any] = {}
+    overall_summary: str
+    risks: List[str] = []
+
+
+def _dims(payload, section="cv"):
+    return {d["name"]: d for d in coerce_llm_payload(payload)[section]["dimensions"]}
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("40%", 2.0),          # persen → skala 1..5, bukan 0.4
+    ("4/5", 4.0),
+    ("8/10", 4.0),
+    ("score: 3.5", 3.5),
+    ("4", 4.0),
+    (3, 3.0),
+])
+def test_dimension_score_lands_on_the_rubric_scale(raw, expected):
+    dims = _dims({"cv": {"dimensions": [{"name": "Skills", "weight": "40%", "score": raw}]}})
+    assert dims["Skills"]["score"] == pytest.approx(expected)
+    assert dims["Skills"]["weight"] == pytest.approx(0.4)
+
+
+@pytest.mark.parametrize("raw, expected", [("40%", 0.4), ("4/5", 0.8), ("0.75", 0.75)])
+def test_match_rate_stays_on_zero_one(raw, expected):
+    assert coerce_llm_payload({"cv": {"match_rate": raw}})["cv"]["match_rate"] == pytest.approx(expected)
+
+
+def test_dict_dimensions_and_string_risks_are_normalized():
+    out = coerce_llm_payload({
+        "project": {"dimensions": {"Correctness": {"score": "4", "weight": 0.3, "evidence": "retry loop"}}},
+        "risks": "no tests",
+        "overall_summary": {"text": "ok"},
+    })
+    dim = out["project"]["dimensions"][0]
+    assert dim["name"] == "Correctness" and dim["score"] == 4.0
+    assert dim["evidence"] == [{"snippet": "retry loop"}]
+    assert out["risks"] == ["no tests"]
+    assert isinstance(out["overall_summary"], str)
+
+
+def test_unparseable_score_is_left_for_validation():
+    dims = _dims({"cv": {"dimensions": [{"name": "Skills", "score": "n/a"}]}})
+    assert dims["Skills"]["score"] == "n/a"
+
+
+def test_truncated_object_is_closed():
+    raw = 'Here you go:\n```json\n{"cv": {"match_rate": 0.7, "dimensions": [{"name": "Skills", "score": 4'
+    candidate = extract_json_object(raw)
+    assert candidate.startswith('{"cv"')
+    fixed = repair_json(candidate)
+    assert fixed.endswith("}]}}")
+
+
+def test_dangling_key_and_trailing_comma_are_dropped():
+    assert repair_json('{"a": 1, "b": [1, 2,], "c"') == '{"a": 1, "b": [1, 2]}'
+    assert repair_json('{"a": 1, "b":') == '{"a": 1, "b": null}'
+
+
+def test_recover_model_reports_the_path():
+    obj, path = recover_model('{"cv": {"match_rate": "40%"}, "overall_summary": "ok"}', Result)
+    assert path == "coerced" and obj.cv["match_rate"] == pytest.approx(0.4)
+    obj, path = recover_model('Sure! {"cv": {"match_rate": 0.5}, "overall_summary": "ok"} hope it helps', Result)
+    assert path == "extracted" and obj.cv["match_rate"] == 0.5
+    obj, path = recover_model('{"cv": {"match_rate": 0.5}, "overall_summary": "ok", "risks": ["a",', Result)
+    assert path == "repaired" and obj.risks == ["a"]
+    assert recover_model("no json here", Result) == (None, "failed")
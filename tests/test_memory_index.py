@@ -0,0 +1,56 @@
+# tests/test_memory_index.py
+"""Batched argpartition top-k must agree with a full sort of the cosine scores."""
+import numpy as np
+import pytest
+
+from src.retrieval.memory_index import MemoryIndex
+
+
+def _unit(rows):
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture
+def index():
+    rng = np.random.default_rng(0)
+    emb = _unit(rng.normal(size=(200, 16)))
+    docs = [f"chunk {i}" for i in range(len(emb))]
+    return MemoryIndex(docs, [{"id": f"c{i}"} for i in range(len(emb))], embeddings=emb)
+
+
+def _full_sort(index, q, k):
+    sims = index.embeddings @ q
+    order = np.argsort(-sims, kind="stable")[:k]
+    return [f"c{i}" for i in order], [1.0 - float(sims[i]) for i in order]
+
+
+@pytest.mark.parametrize("k", [1, 5, 37, 200, 500])
+def test_search_many_matches_full_sort(index, k):
+    rng = np.random.default_rng(k)
+    Q = _unit(rng.normal(size=(6, 16)))
+    results = index.search_many([None] * len(Q), k=k, query_vectors=Q)
+    assert len(results) == len(Q)
+    for q, res in zip(Q, results):
+        ids, dists = _full_sort(index, q, k)
+        assert res["ids"][0] == ids
+        np.testing.assert_allclose(res["distances"][0], dists, rtol=0, atol=1e-6)
+        assert res["documents"][0] == [f"chunk {i[1:]}" for i in ids]
+
+
+def test_equal_scores_keep_index_order():
+    emb = _unit(np.eye(4, 8) + 0.1)
+    emb[3] = emb[1]
+    idx = MemoryIndex([str(i) for i in range(4)], [{"id": f"c{i}"} for i in range(4)], embeddings=emb)
+    assert idx.search_many([None], k=2, query_vectors=[emb[1]])[0]["ids"][0] == ["c1", "c3"]
+
+
+def test_search_is_search_many_of_one(index):
+    q = index.embeddings[3]
+    one = index.search(k=4, query_vector=q)
+    assert one == index.search_many([None], k=4, query_vectors=[q])[0]
+    assert one["ids"][0][0] == "c3"
+
+
+def test_empty_index_returns_empty_hits():
+    idx = MemoryIndex([], [], embeddings=np.empty((0, 16), dtype=np.float32))
+    assert idx.search_many(["a", "b"], k=3) == [{"documents": [[]], "metadatas": [[]], "distances": [[]], "ids": [[]]}] * 2
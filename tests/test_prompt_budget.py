@@ -0,0 +1,53 @@
+# tests/test_prompt_budget.py
+"""Evidence dedup on real-sized chunks (CHUNK_WORDS / CHUNK_OVERLAP_WORDS from config)."""
+from src.config import CHUNK_WORDS, CHUNK_OVERLAP_WORDS
+from src.eval.prompt_budget import EVIDENCE_SNIPPET_CHARS, dedupe_evidence
+from src.processing.chunker import chunk_by_words
+
+
+def _doc(n_words: int) -> str:
+    return " ".join(f"word{i:04d}" for i in range(n_words))
+
+
+def _evidence(chunks, scores):
+    # bentuk yang sama dengan evaluator._hits_to_evidence
+    return [
+        {"chunk_id": f"c{i}", "filename": "cv.pdf", "snippet": c[:EVIDENCE_SNIPPET_CHARS], "text": c, "score": s}
+        for i, (c, s) in enumerate(zip(chunks, scores))
+    ]
+
+
+def test_sliding_window_overlap_is_trimmed_on_full_chunks():
+    chunks = chunk_by_words(_doc(3 * CHUNK_WORDS), CHUNK_WORDS, CHUNK_OVERLAP_WORDS)
+    assert len(chunks) >= 3
+    step = CHUNK_WORDS - CHUNK_OVERLAP_WORDS
+    kept = dedupe_evidence(_evidence(chunks[:2], [0.9, 0.5]))
+    assert [ev["chunk_id"] for ev in kept] == ["c0", "c1"]
+    # c1 mulai dengan CHUNK_OVERLAP_WORDS kata terakhir c0: snippet-nya harus mulai setelah overlap
+    tail = chunks[1].split()[CHUNK_OVERLAP_WORDS:]
+    assert tail[0] == f"word{CHUNK_WORDS:04d}"
+    assert kept[1]["snippet"] == " ".join(tail)[:EVIDENCE_SNIPPET_CHARS]
+    # overlap ada di ujung c0, jauh di luar snippet 400 char → tidak terlihat tanpa teks utuh
+    assert len(chunks[0][:EVIDENCE_SNIPPET_CHARS].split()) < step
+
+
+def test_no_word_repeats_across_kept_evidence():
+    chunks = chunk_by_words(_doc(5 * CHUNK_WORDS), CHUNK_WORDS, CHUNK_OVERLAP_WORDS)
+    kept = dedupe_evidence(_evidence(chunks, [0.9 - 0.1 * i for i in range(len(chunks))]), snippet_chars=10**6)
+    words = [w for ev in kept for w in ev["snippet"].split()]
+    assert len(words) == len(set(words)) == 5 * CHUNK_WORDS
+
+
+def test_duplicates_dropped_and_snippets_bounded():
+    chunks = chunk_by_words(_doc(2 * CHUNK_WORDS), CHUNK_WORDS, CHUNK_OVERLAP_WORDS)
+    items = _evidence([chunks[0], chunks[0], chunks[1]], [0.8, 0.7, 0.6])
+    kept = dedupe_evidence(items)
+    assert [ev["chunk_id"] for ev in kept] == ["c0", "c2"]
+    for ev in kept:
+        assert "text" not in ev                   # teks utuh tidak ikut ke prompt
+        assert len(ev["snippet"]) <= EVIDENCE_SNIPPET_CHARS
+
+
+def test_falls_back_to_snippet_without_text():
+    kept = dedupe_evidence([{"snippet": "a b c", "score": 0.2}, {"snippet": "a b c", "score": 0.1}])
+    assert kept == [{"snippet": "a b c", "score": 0.2}]
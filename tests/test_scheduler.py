@@ -0,0 +1,100 @@
+# tests/test_scheduler.py
+"""Dispatcher against a real Redis: lane priority, round-robin per job_id, per-tenant caps."""
+import pytest
+from rq.job import Job
+
+import src.queue.scheduler as sched
+
+
+def noop(*args):
+    """Job body placeholder; the tests never run a worker."""
+
+
+@pytest.fixture
+def scheduler(redis_conn, monkeypatch):
+    """Fixed slot count, no ready-ahead, and submits that only park (dispatch is called explicitly)."""
+    monkeypatch.setattr(sched, "SCHEDULER", True)
+    monkeypatch.setattr(sched, "SCHED_SLOTS", 2)
+    monkeypatch.setattr(sched, "SCHED_READY_AHEAD", 0)
+    monkeypatch.setattr(sched, "SCHED_TENANT_MAX_RUNNING", 0)
+    monkeypatch.setattr(sched, "SCHED_TENANT_CAPS", {})
+    monkeypatch.setattr(sched, "_last_reconcile", 0.0)
+    dispatch = sched.dispatch
+    monkeypatch.setattr(sched, "dispatch", lambda *a, **kw: 0)
+
+    def submit(job_id, tenant=None, priority="normal"):
+        return sched.submit(redis_conn, noop, (), job_id=job_id, tenant=tenant, priority=priority)
+
+    return submit, lambda **kw: dispatch(redis_conn, **kw)
+
+
+def _ready(redis_conn):
+    """job ids now in RQ, per lane."""
+    return {lane: q.job_ids for lane, q in zip(sched.LANES, sched.lane_queues(redis_conn))}
+
+
+def _jid(redis_conn, task_id):
+    return Job.fetch(task_id, connection=redis_conn).meta["sched_job_id"]
+
+
+def test_higher_lane_dispatches_first(redis_conn, scheduler):
+    submit, dispatch = scheduler
+    low = submit("a", priority="low")
+    normal = submit("b")
+    high = submit("c", priority="high")
+    assert dispatch() == 2
+    assert _ready(redis_conn) == {"high": [high.id], "normal": [normal.id], "low": []}
+    assert sched.pending_count(redis_conn, "low") == 1
+    redis_conn.delete(sched.lane_queues(redis_conn)[0].key)      # slot high selesai
+    assert dispatch() == 1
+    assert _ready(redis_conn)["low"] == [low.id]
+
+
+def test_job_ids_share_a_lane_round_robin(redis_conn, scheduler, monkeypatch):
+    submit, dispatch = scheduler
+    monkeypatch.setattr(sched, "SCHED_SLOTS", 4)
+    for _ in range(3):
+        submit("big")
+    submit("small")
+    assert dispatch() == 4
+    order = [_jid(redis_conn, t) for t in _ready(redis_conn)["normal"]]
+    assert order == ["big", "small", "big", "big"]                 # small tidak menunggu seluruh big
+
+
+def test_tenant_cap_holds_back_and_finish_releases(redis_conn, scheduler, monkeypatch):
+    submit, dispatch = scheduler
+    monkeypatch.setattr(sched, "SCHED_SLOTS", 3)
+    monkeypatch.setattr(sched, "SCHED_TENANT_CAPS", {"acme": 1})
+    first = submit("j1", tenant="acme")
+    second = submit("j2", tenant="acme")
+    other = submit("j3", tenant="beta")
+    assert dispatch() == 2
+    assert _ready(redis_conn)["normal"] == [first.id, other.id]
+    assert redis_conn.smembers(sched.running_key("acme")) == {first.id.encode()}
+    assert dispatch() == 0                                          # masih ada slot, tapi acme penuh
+
+    # worker selesai dengan `first`: callback membebaskan slot acme dan men-dispatch berikutnya
+    monkeypatch.setattr(sched, "dispatch", lambda conn, **kw: dispatch(**kw))
+    sched.lane_queues(redis_conn)[1].remove(first.id)
+    sched.task_finished(first, redis_conn)
+    assert _ready(redis_conn)["normal"] == [other.id, second.id]
+    assert redis_conn.smembers(sched.running_key("acme")) == {second.id.encode()}
+    assert sched.pending_count(redis_conn, "normal") == 0
+
+
+def test_default_cap_applies_to_every_tenant(redis_conn, scheduler, monkeypatch):
+    submit, dispatch = scheduler
+    monkeypatch.setattr(sched, "SCHED_SLOTS", 4)
+    monkeypatch.setattr(sched, "SCHED_TENANT_MAX_RUNNING", 1)
+    for jid in ("a", "b", "c"):
+        submit(jid)                                                 # tenant default
+    assert dispatch() == 1
+    stats = sched.scheduler_stats(redis_conn)
+    assert stats["tenants"]["default"] == {"running": 1, "cap": 1}
+    assert stats["lanes"]["normal"]["pending"] == 2
+
+
+def test_unknown_priority_is_rejected(redis_conn, scheduler):
+    submit, _ = scheduler
+    with pytest.raises(ValueError):
+        submit("a", priority="urgent")